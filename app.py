@@ -6,7 +6,6 @@ Giao diện web với Bootstrap với hệ thống xác thực
 
 from flask import Flask, render_template, request, jsonify, redirect, url_for, session
 import json
-import time
 import os
 import hashlib
 from datetime import datetime
@@ -312,9 +311,12 @@ def api_analyze_sell():
         timeframes = ['60m', '4h', '1d']
         trend_analysis = {}
         
+        # Tải klines một lần cho cả 3 khung thời gian
+        run_memo = crypto_app.create_run_memo([symbol], timeframes)
+        
         for tf in timeframes:
             # Chạy phân tích cho từng khung thời gian
-            result = crypto_app.analyze_single_pair_by_investment_type(symbol, tf)
+            result = crypto_app.analyze_single_pair_by_investment_type(symbol, tf, run_memo)
             
             if result:
                 current_price = result['current_price']
@@ -383,8 +385,6 @@ def api_analyze_sell():
                     'accuracy': "N/A",
                     'current_price': "N/A"
                 }
-            
-            time.sleep(1)  # Tránh spam API
         
         # Đưa ra khuyến nghị tổng hợp
         valid_analyses = [data for data in trend_analysis.values() if "Lỗi" not in data['direction']]
@@ -600,15 +600,12 @@ def api_pattern_comparison():
         timeframe = data.get('timeframe', '4h')
         days_back = int(data.get('days_back', 30))
         
-        comparison_results = {}
         patterns_to_test = ['default', 'bull_market', 'bear_market', 'sideways', 'high_volatility', 'low_volatility', 'breakout', 'scalping']
         
-        for pattern in patterns_to_test:
-            result = crypto_app.run_backtest(symbol, timeframe, days_back, pattern)
-            if result:
-                result['symbol'] = symbol  # Add symbol to each result
-                comparison_results[pattern] = result
-            time.sleep(0.5)  # Small delay between tests
+        # Dữ liệu và chỉ báo của mọi pattern được tính một lần
+        comparison_results = crypto_app.run_pattern_comparison(symbol, timeframe, days_back, patterns_to_test)
+        for result in comparison_results.values():
+            result['symbol'] = symbol  # Add symbol to each result
         
         return jsonify({
             'success': True,
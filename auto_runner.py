@@ -4,7 +4,6 @@ Auto Runner cho Crypto Prediction App
 Chạy phân tích tự động theo chu kỳ với xác thực đăng nhập
 """
 
-import time
 import schedule
 import json
 import os
@@ -40,7 +39,6 @@ class AutoRunner:
                 result = self.app.analyze_single_pair_by_investment_type(pair, investment_type)
                 if result:
                     results.append(result)
-                time.sleep(1)
             
             results.sort(key=lambda x: x['success_probability'], reverse=True)
             return results
@@ -50,6 +48,23 @@ class AutoRunner:
     
     def run_once(self):
         self.run_analysis_job()
+    
+    def start_stream_mode(self, investment_type='60m', base_currency='USDT', limit=10):
+        """Phân tích ngay khi nến khung chính đóng (WebSocket) thay vì chạy theo chu kỳ"""
+        from kline_stream import StreamAnalysisRunner
+        
+        coins = self.app.get_top_coins_by_base_currency(base_currency, limit)
+        symbols = [coin['symbol'] for coin in coins]
+        
+        def print_result(result):
+            print(f"[{datetime.now().strftime('%H:%M:%S')}] {result['symbol']} "
+                  f"{result['signal_type']} {result['success_probability']:.1%}")
+        
+        runner = StreamAnalysisRunner(self.app, symbols, investment_type, on_result=print_result)
+        try:
+            runner.run()
+        except KeyboardInterrupt:
+            pass
 
 def show_menu():
     """Hiển thị menu lựa chọn"""
@@ -81,14 +96,17 @@ def analyze_sell_trend(runner, symbol):
     timeframes = ['60m', '1h', '4h']
     trend_analysis = {}
     
+    # Tải klines một lần cho các kiểu đầu tư cần dùng
+    run_memo = runner.app.create_run_memo([symbol], ['60m', '4h'])
+    
     for tf in timeframes:
         #print(f"📊 Đang phân tích khung {tf}...")
         
         if tf == '1h':
             # Sử dụng khung 4h cho phân tích
-            result = runner.app.analyze_single_pair_by_investment_type(symbol, '4h')
+            result = runner.app.analyze_single_pair_by_investment_type(symbol, '4h', run_memo)
         else:
-            result = runner.app.analyze_single_pair_by_investment_type(symbol, tf)
+            result = runner.app.analyze_single_pair_by_investment_type(symbol, tf, run_memo)
         
         if result:
             current_price = result['current_price']
@@ -141,8 +159,6 @@ def analyze_sell_trend(runner, symbol):
                 'accuracy': 0,
                 'current_price': 0
             }
-        
-        time.sleep(1)
     
     # Hiển thị kết quả
     #print(f"\n📋 KẾT QUẢ PHÂN TÍCH: {symbol}")
@@ -255,6 +271,8 @@ def main():
             runner.start_auto_mode()
         elif sys.argv[1] == "--once":
             runner.run_once()
+        elif sys.argv[1] == "--stream":
+            runner.start_stream_mode()
         elif sys.argv[1] == "--multi":
             runner.run_multi_timeframe_analysis_job()
         elif sys.argv[1] in ["--60m", "--4h", "--1d"]:
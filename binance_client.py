@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+HTTP client dùng chung cho mọi request tới Binance
+Một requests.Session với connection pool keep-alive, gzip và retry/timeout
+lấy từ block `api_settings` trong config.json
+"""
+
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from http_fixtures import FIXTURE_MODES, FixtureRecorder, FixtureReplayer
+from rate_limiter import WeightRateLimiter
+
+DEFAULT_API_SETTINGS = {
+    "request_timeout": 30,
+    "rate_limit_delay": 1.0,
+    "retry_attempts": 3,
+    "pool_size": 20,
+    "weight_limit_per_minute": 6000,
+    "rate_limit_state_file": "data/rate_limit.json",
+    "fixture_mode": "off",
+    "fixture_file": "data/fixtures/binance.jsonl.gz",
+    "fixture_latency_scale": 0.0
+}
+
+# Các status code nên thử lại (lỗi phía server)
+# 429/418 không retry ở đây mà để rate limiter tạm dừng mọi worker
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+RATE_LIMITED_STATUS_CODES = (418, 429)
+
+
+class MeteredRetry(Retry):
+    """Retry của urllib3 gọi on_retry(response) trước mỗi lần thử lại để tính weight cho lần đó"""
+
+    def __init__(self, *args, on_retry=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.on_retry = on_retry
+
+    def new(self, **kwargs):
+        retry = super().new(**kwargs)
+        retry.on_retry = self.on_retry
+        return retry
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        # Raise MaxRetryError khi hết lượt -> không tính weight cho lần không được gửi
+        retry = super().increment(method, url, response, error, _pool, _stacktrace)
+        if self.on_retry is not None:
+            self.on_retry(response)
+        return retry
+
+
+class BinanceClient:
+    """Session HTTP pooled, keep-alive cho Binance REST API"""
+
+    def __init__(self, api_settings=None):
+        settings = dict(DEFAULT_API_SETTINGS)
+        settings.update(api_settings or {})
+        self.settings = settings
+
+        self.timeout = settings['request_timeout']
+        self.limiter = WeightRateLimiter(
+            weight_limit=settings['weight_limit_per_minute'],
+            state_file=settings['rate_limit_state_file']
+        )
+        # Weight của request đang chạy trên thread này (cho các lần retry bên trong urllib3)
+        self._request = threading.local()
+        self.session = self._build_session(settings)
+        
+        # Chế độ fixture: ghi lại response hoặc phát lại offline
+        mode = settings['fixture_mode']
+        if mode not in FIXTURE_MODES:
+            raise ValueError(f"Unknown fixture_mode: {mode}")
+        self.recorder = FixtureRecorder(settings['fixture_file']) if mode == 'record' else None
+        self.replayer = (FixtureReplayer(settings['fixture_file'], settings['fixture_latency_scale'])
+                         if mode == 'replay' else None)
+
+    def _build_session(self, settings):
+        """Tạo session với pool đủ lớn cho các request song song"""
+        retry = MeteredRetry(
+            on_retry=self._charge_retry,
+            total=settings['retry_attempts'],
+            backoff_factor=settings['rate_limit_delay'],
+            status_forcelist=RETRY_STATUS_CODES,
+            allowed_methods=frozenset(['GET']),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(
+            pool_connections=settings['pool_size'],
+            pool_maxsize=settings['pool_size'],
+            max_retries=retry
+        )
+
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({
+            'Accept': 'application/json',
+            'Accept-Encoding': 'gzip, deflate',
+            'Connection': 'keep-alive'
+        })
+        return session
+
+    def _charge_retry(self, response):
+        """Mỗi lần urllib3 thử lại cũng bị Binance tính weight -> trừ ngân sách như request mới"""
+        if response is not None:
+            self.limiter.update_from_headers(response.headers)
+        self.limiter.acquire(getattr(self._request, 'weight', 1))
+
+    def get(self, url, params=None, timeout=None, weight=1):
+        """GET với timeout mặc định và rate limit theo weight, raise HTTPError nếu status lỗi"""
+        if self.replayer is not None:
+            response = self.replayer.get(url, params)
+            response.raise_for_status()
+            return response
+        
+        self.limiter.acquire(weight)
+        self._request.weight = weight
+        started = time.perf_counter()
+        response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+        if self.recorder is not None:
+            self.recorder.record(url, params, response, time.perf_counter() - started)
+        self.limiter.update_from_headers(response.headers)
+
+        if response.status_code in RATE_LIMITED_STATUS_CODES:
+            try:
+                retry_after = float(response.headers.get('Retry-After', 60))
+            except ValueError:
+                retry_after = 60
+            self.limiter.block_for(retry_after)
+
+        response.raise_for_status()
+        return response
+
+    def get_json(self, url, params=None, timeout=None, weight=1):
+        """GET và decode JSON"""
+        return self.get(url, params=params, timeout=timeout, weight=weight).json()
+
+    def close(self):
+        self.session.close()
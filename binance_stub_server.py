@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+"""
+Server giả lập Binance REST (klines, ticker/24hr, exchangeInfo) để load/soak test
+mà không gọi Binance thật
+- Dữ liệu tổng hợp (xác định theo symbol + open time) hoặc phát lại file fixture đã ghi
+- Cấu hình độ trễ, tỉ lệ lỗi 5xx và weight header X-MBX-USED-WEIGHT-1M (429 khi vượt)
+
+Chạy: python binance_stub_server.py --port 8081 --latency-ms 50 --error-rate 0.01
+rồi đặt "api_root": "http://127.0.0.1:8081/api/v3" trong api_settings của config.json
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+import zlib
+
+import numpy as np
+from flask import Flask, Response, request
+
+from candle_store import INTERVAL_MS, MAX_KLINES_PER_REQUEST
+from http_fixtures import FixtureReplayer
+from rate_limiter import EXCHANGE_INFO_WEIGHT, TICKER_24HR_ALL_WEIGHT, USED_WEIGHT_HEADER, klines_weight
+
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+
+DEFAULT_STUB_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8081,
+    "latency_ms": 0,
+    "jitter_ms": 0,
+    "error_rate": 0.0,
+    "weight_limit_per_minute": 6000,
+    "fixture_file": None,
+    "base_assets": ["ETH", "BNB", "SOL", "XRP", "ADA", "DOGE", "AVAX", "LINK",
+                    "DOT", "LTC", "TRX", "JUP", "SUPER", "BTC"],
+    "quote_assets": ["USDT", "JPY"],
+    "seed": 0
+}
+
+TICKER_24HR_SINGLE_WEIGHT = 2
+
+# Khung gốc của thị trường tổng hợp - mọi khung khác gộp từ khung này
+BASE_INTERVAL = '1m'
+MAX_BASE_CANDLES_PER_CHUNK = 1_000_000
+
+
+def _load_stub_config(path=CONFIG_FILE):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('stub_server', {})
+    except Exception:
+        return {}
+
+
+def _unit_noise(keys):
+    """Nhiễu đều trong [-1, 1) xác định theo khóa số nguyên (hash splitmix64 vector hóa)"""
+    x = keys.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+    x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53) * 2 - 1
+
+
+class SyntheticMarket:
+    """Thị trường tổng hợp: giá mỗi nến chỉ phụ thuộc (symbol, open time)"""
+
+    def __init__(self, base_assets, quote_assets, seed=0):
+        self.seed = seed
+        self.symbols = {}
+        for quote in quote_assets:
+            for base in base_assets:
+                if base != quote:
+                    self.symbols[base + quote] = (base, quote)
+
+    def _symbol_seed(self, symbol):
+        return zlib.crc32(f"{self.seed}:{symbol}".encode())
+
+    def base_price(self, symbol):
+        # Giá gốc log-uniform trong khoảng 0.01 - 50000
+        u = (self._symbol_seed(symbol) % 10_000) / 10_000
+        price = 10 ** (-2 + u * 6.7)
+        if self.symbols[symbol][1] == 'JPY':
+            price *= 150
+        return price
+
+    def _base_candles(self, symbol, open_times):
+        """Nến 1m gốc: mảng (n, 5) open/high/low/close/volume chỉ phụ thuộc (symbol, open time)"""
+        step = INTERVAL_MS[BASE_INTERVAL]
+        sym_seed = self._symbol_seed(symbol)
+        t = open_times.astype(np.float64) / INTERVAL_MS['1h']
+
+        # Xu hướng chậm + chu kỳ + nhiễu theo từng nến
+        log_price = (0.08 * np.sin(t / 300 + sym_seed % 7) + 0.03 * np.sin(t / 40 + sym_seed % 3))
+        close = self.base_price(symbol) * np.exp(log_price)
+
+        key = open_times // step * 31 + sym_seed
+        scale = 0.002
+        open_ = close * (1 + scale * _unit_noise(key))
+        high = np.maximum(open_, close) * (1 + scale * np.abs(_unit_noise(key + 1)))
+        low = np.minimum(open_, close) * (1 - scale * np.abs(_unit_noise(key + 2)))
+        volume = 100 * (1.5 + _unit_noise(key + 3))
+        return np.column_stack([open_, high, low, close, volume])
+
+    def candles(self, symbol, interval, open_times, now_ms=None):
+        """
+        Trả về mảng (n, 5) open/high/low/close/volume cho các open time
+        Khung lớn được gộp từ nến 1m gốc nên mọi khung thời gian khớp nhau (như Binance thật),
+        nến đang chạy chỉ gộp các nến 1m đã mở tới now_ms
+        """
+        ratio = INTERVAL_MS[interval] // INTERVAL_MS[BASE_INTERVAL]
+        if ratio == 1:
+            return self._base_candles(symbol, open_times)
+
+        # Gộp theo từng đoạn để giới hạn bộ nhớ với khung 1d/1w
+        chunk = max(1, MAX_BASE_CANDLES_PER_CHUNK // ratio)
+        offsets = np.arange(ratio, dtype=np.int64) * INTERVAL_MS[BASE_INTERVAL]
+        parts = [np.empty((0, 5))]
+        for i in range(0, len(open_times), chunk):
+            starts = open_times[i:i + chunk]
+            base = self._base_candles(symbol, (starts[:, None] + offsets).ravel()).reshape(len(starts), ratio, 5)
+            opened = np.ones((len(starts), ratio), dtype=bool)
+            if now_ms is not None:
+                opened = starts[:, None] + offsets <= now_ms
+                opened[:, 0] = True
+            last = opened.sum(axis=1) - 1
+            parts.append(np.column_stack([
+                base[:, 0, 0],
+                np.where(opened, base[:, :, 1], -np.inf).max(axis=1),
+                np.where(opened, base[:, :, 2], np.inf).min(axis=1),
+                base[np.arange(len(starts)), last, 3],
+                np.where(opened, base[:, :, 4], 0).sum(axis=1)
+            ]))
+        return np.concatenate(parts)
+
+    def klines(self, symbol, interval, limit, start_time=None, end_time=None, now_ms=None):
+        step = INTERVAL_MS[interval]
+        now_ms = now_ms or int(time.time() * 1000)
+        last_open = now_ms - now_ms % step
+        if end_time is not None:
+            last_open = min(last_open, end_time - end_time % step)
+
+        if start_time is not None:
+            first_open = -(-start_time // step) * step
+            open_times = np.arange(first_open, last_open + 1, step, dtype=np.int64)[:limit]
+        else:
+            open_times = np.arange(last_open - (limit - 1) * step, last_open + 1, step, dtype=np.int64)
+        if len(open_times) == 0:
+            return []
+
+        values = self.candles(symbol, interval, open_times, now_ms)
+        trades = (values[:, 4] * 0.1).astype(np.int64) + 1
+        rows = []
+        for open_time, (o, h, l, c, v), n in zip(open_times.tolist(), values, trades.tolist()):
+            rows.append([
+                open_time, f"{o:.8f}", f"{h:.8f}", f"{l:.8f}", f"{c:.8f}", f"{v:.8f}",
+                open_time + step - 1, f"{v * c:.8f}", n, f"{v / 2:.8f}", f"{v * c / 2:.8f}", "0"
+            ])
+        return rows
+
+    def ticker_24hr(self, symbol, now_ms=None):
+        now_ms = now_ms or int(time.time() * 1000)
+        step = INTERVAL_MS['1h']
+        last_open = now_ms - now_ms % step
+        open_times = np.arange(last_open - 23 * step, last_open + 1, step, dtype=np.int64)
+        values = self.candles(symbol, '1h', open_times, now_ms)
+
+        open_price, last_price = values[0, 0], values[-1, 3]
+        volume = values[:, 4].sum()
+        return {
+            'symbol': symbol,
+            'priceChange': f"{last_price - open_price:.8f}",
+            'priceChangePercent': f"{(last_price / open_price - 1) * 100:.3f}",
+            'weightedAvgPrice': f"{values[:, 3].mean():.8f}",
+            'openPrice': f"{open_price:.8f}",
+            'highPrice': f"{values[:, 1].max():.8f}",
+            'lowPrice': f"{values[:, 2].min():.8f}",
+            'lastPrice': f"{last_price:.8f}",
+            'volume': f"{volume:.8f}",
+            'quoteVolume': f"{(values[:, 4] * values[:, 3]).sum():.8f}",
+            'openTime': int(open_times[0]),
+            'closeTime': now_ms,
+            'count': int(volume * 0.1)
+        }
+
+    def exchange_info(self):
+        symbols = []
+        for symbol, (base, quote) in self.symbols.items():
+            price = self.base_price(symbol)
+            tick = 10 ** min(0, int(np.floor(np.log10(price))) - 4)
+            symbols.append({
+                'symbol': symbol,
+                'status': 'TRADING',
+                'baseAsset': base,
+                'quoteAsset': quote,
+                'filters': [
+                    {'filterType': 'PRICE_FILTER', 'minPrice': f"{tick:.8f}",
+                     'maxPrice': '1000000.00000000', 'tickSize': f"{tick:.8f}"},
+                    {'filterType': 'LOT_SIZE', 'minQty': '0.00100000',
+                     'maxQty': '9000000.00000000', 'stepSize': '0.00100000'},
+                    {'filterType': 'NOTIONAL', 'minNotional': '5.00000000'}
+                ]
+            })
+        return {'timezone': 'UTC', 'serverTime': int(time.time() * 1000), 'symbols': symbols}
+
+
+class WeightCounter:
+    """Đếm weight theo cửa sổ phút cố định giống Binance"""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.minute = None
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def add(self, weight):
+        """Cộng weight, trả về (used, retry_after) - retry_after > 0 nếu vượt giới hạn"""
+        now = time.time()
+        minute = int(now // 60)
+        with self._lock:
+            if minute != self.minute:
+                self.minute, self.used = minute, 0
+            self.used += weight
+            if self.used > self.limit:
+                return self.used, 60 - now % 60
+            return self.used, 0
+
+
+def create_app(settings=None):
+    """Tạo Flask app giả lập; settings ghi đè block `stub_server` trong config.json"""
+    config = dict(DEFAULT_STUB_SETTINGS)
+    config.update(_load_stub_config())
+    config.update(settings or {})
+
+    market = SyntheticMarket(config['base_assets'], config['quote_assets'], config['seed'])
+    replayer = FixtureReplayer(config['fixture_file']) if config['fixture_file'] else None
+    weights = WeightCounter(config['weight_limit_per_minute'])
+
+    app = Flask(__name__)
+    app.config['STUB_SETTINGS'] = config
+
+    def respond(payload, weight, status=200):
+        used, retry_after = weights.add(weight)
+        headers = {USED_WEIGHT_HEADER: str(used)}
+
+        delay = config['latency_ms'] + random.uniform(0, config['jitter_ms'])
+        if delay:
+            time.sleep(delay / 1000)
+
+        if retry_after:
+            headers['Retry-After'] = str(int(retry_after) + 1)
+            payload, status = {'code': -1003, 'msg': 'Too many requests.'}, 429
+        elif config['error_rate'] and random.random() < config['error_rate']:
+            payload, status = {'code': -1001, 'msg': 'Internal error.'}, random.choice([500, 502, 503])
+
+        body = payload if isinstance(payload, str) else json.dumps(payload)
+        return Response(body, status=status, headers=headers, mimetype='application/json')
+
+    def replay(weight):
+        """Phục vụ từ fixture nếu có bản ghi, ngược lại trả None để dùng dữ liệu tổng hợp"""
+        if replayer is None:
+            return None
+        try:
+            recorded = replayer.get(request.path, request.args.to_dict())
+        except Exception:
+            return None
+        return respond(recorded.text, weight, recorded.status_code)
+
+    def error(code, msg, weight=1):
+        return respond({'code': code, 'msg': msg}, weight, 400)
+
+    @app.route('/api/v3/klines')
+    def klines():
+        try:
+            limit = min(int(request.args.get('limit', 500)), MAX_KLINES_PER_REQUEST)
+            start_time = request.args.get('startTime', type=int)
+            end_time = request.args.get('endTime', type=int)
+        except ValueError:
+            return error(-1100, 'Illegal characters found in parameter.')
+        weight = klines_weight(limit)
+
+        recorded = replay(weight)
+        if recorded is not None:
+            return recorded
+
+        symbol = request.args.get('symbol', '')
+        interval = request.args.get('interval', '')
+        if symbol not in market.symbols:
+            return error(-1121, 'Invalid symbol.', weight)
+        if interval not in INTERVAL_MS:
+            return error(-1120, 'Invalid interval.', weight)
+
+        return respond(market.klines(symbol, interval, limit, start_time, end_time), weight)
+
+    @app.route('/api/v3/ticker/24hr')
+    def ticker_24hr():
+        symbol = request.args.get('symbol')
+        weight = TICKER_24HR_SINGLE_WEIGHT if symbol else TICKER_24HR_ALL_WEIGHT
+
+        recorded = replay(weight)
+        if recorded is not None:
+            return recorded
+
+        if symbol:
+            if symbol not in market.symbols:
+                return error(-1121, 'Invalid symbol.', weight)
+            return respond(market.ticker_24hr(symbol), weight)
+        return respond([market.ticker_24hr(s) for s in market.symbols], weight)
+
+    @app.route('/api/v3/exchangeInfo')
+    def exchange_info():
+        recorded = replay(EXCHANGE_INFO_WEIGHT)
+        if recorded is not None:
+            return recorded
+        return respond(market.exchange_info(), EXCHANGE_INFO_WEIGHT)
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Binance REST stand-in for load testing')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--latency-ms', type=float, help='độ trễ cố định mỗi request')
+    parser.add_argument('--jitter-ms', type=float, help='độ trễ ngẫu nhiên thêm (0..jitter)')
+    parser.add_argument('--error-rate', type=float, help='tỉ lệ trả lỗi 5xx (0..1)')
+    parser.add_argument('--weight-limit', type=int, dest='weight_limit_per_minute')
+    parser.add_argument('--fixtures', dest='fixture_file', help='file .jsonl.gz đã ghi ở fixture_mode=record')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    settings = {k: v for k, v in vars(args).items() if v is not None}
+    app = create_app(settings)
+    config = app.config['STUB_SETTINGS']
+    print(f"🧪 Binance stub on http://{config['host']}:{config['port']}/api/v3")
+    app.run(host=config['host'], port=config['port'], threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,447 @@
+#!/usr/bin/env python3
+"""
+Kho lưu trữ nến OHLCV cục bộ trên đĩa
+Mỗi cặp (symbol, interval) được lưu thành một file .npz, lần gọi sau chỉ tải
+thêm các nến mới hơn nến cuối cùng đã lưu thay vì tải lại toàn bộ cửa sổ
+Timestamp được kiểm tra liên tục sau mỗi lần cập nhật, khoảng thiếu được tải bù
+File được ghi dưới khóa fcntl và ghép với bản trên đĩa nếu worker khác vừa ghi
+"""
+
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:  # Windows - chỉ khóa được giữa các thread
+    fcntl = None
+
+# Thứ tự cột trong payload /api/v3/klines của Binance
+KLINE_COLUMNS = [
+    'timestamp', 'open', 'high', 'low', 'close', 'volume',
+    'close_time', 'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
+]
+
+# Các cột được lưu lại (bỏ cột 'ignore')
+STORE_COLUMNS = KLINE_COLUMNS[:-1]
+
+INT_COLUMNS = ['timestamp', 'close_time', 'number_of_trades']
+
+# Các cột giá trị được đưa vào DataFrame trả về cho phần phân tích
+FRAME_COLUMNS = [
+    'open', 'high', 'low', 'close', 'volume',
+    'quote_asset_volume', 'number_of_trades',
+    'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume'
+]
+
+# Các cột cộng dồn khi gộp nến
+SUM_COLUMNS = ['volume'] + FRAME_COLUMNS[5:]
+
+# Số nến tối đa Binance trả về trong một request
+MAX_KLINES_PER_REQUEST = 1000
+
+INTERVAL_MS = {
+    '1m': 60_000,
+    '3m': 3 * 60_000,
+    '5m': 5 * 60_000,
+    '15m': 15 * 60_000,
+    '30m': 30 * 60_000,
+    '1h': 60 * 60_000,
+    '2h': 2 * 60 * 60_000,
+    '4h': 4 * 60 * 60_000,
+    '6h': 6 * 60 * 60_000,
+    '8h': 8 * 60 * 60_000,
+    '12h': 12 * 60 * 60_000,
+    '1d': 24 * 60 * 60_000,
+    '3d': 3 * 24 * 60 * 60_000,
+    '1w': 7 * 24 * 60 * 60_000,
+}
+
+
+# Tên khung thời gian nội bộ không phải interval hợp lệ của Binance
+INTERVAL_ALIASES = {
+    '60m': '1h',
+}
+
+
+def normalize_interval(interval):
+    """Đổi alias nội bộ (vd '60m') sang interval của Binance"""
+    return INTERVAL_ALIASES.get(interval, interval)
+
+
+def interval_to_ms(interval):
+    """Đổi interval của Binance (vd '15m', '4h') sang milliseconds"""
+    if interval not in INTERVAL_MS:
+        raise ValueError(f"Unsupported interval: {interval}")
+    return INTERVAL_MS[interval]
+
+
+def resample_ohlcv(df, interval, base_interval):
+    """
+    Gộp nến base_interval (vd 15m) thành nến interval lớn hơn (vd 1h, 4h, 1d)
+    Bucket căn theo mốc UTC giống Binance; df theo định dạng của get_kline_data
+    """
+    step = interval_to_ms(interval)
+    base_step = interval_to_ms(base_interval)
+    if step < base_step or step % base_step or INTERVAL_MS['1d'] % step:
+        raise ValueError(f"Cannot resample {base_interval} into {interval}")
+
+    if df is None or len(df) == 0:
+        return df
+
+    ts = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+    buckets = ts - ts % step
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(ts)] - 1
+
+    columns = {
+        'timestamp': pd.to_datetime(buckets[starts], unit='ms'),
+        'open': df['open'].to_numpy()[starts],
+        'high': np.maximum.reduceat(df['high'].to_numpy(), starts),
+        'low': np.minimum.reduceat(df['low'].to_numpy(), starts),
+        'close': df['close'].to_numpy()[ends],
+    }
+    for col in SUM_COLUMNS:
+        if col in df:
+            columns[col] = np.add.reduceat(df[col].to_numpy(), starts)
+
+    resampled = pd.DataFrame(columns)
+
+    # Bucket đầu tiên thiếu nến (dữ liệu bắt đầu giữa bucket) -> bỏ
+    if ts[0] != buckets[0]:
+        resampled = resampled.iloc[1:].reset_index(drop=True)
+
+    return resampled
+
+
+def parse_klines(raw):
+    """
+    Chuyển payload klines thô thành dict cột NumPy có kiểu (int64/float64)
+    Không qua DataFrame: chuyển vị list bằng zip rồi ép kiểu từng cột một lần
+    """
+    if not raw:
+        return empty_klines()
+    columns = list(zip(*raw))
+    return {
+        col: np.array(columns[i], dtype=np.int64 if col in INT_COLUMNS else np.float64)
+        for i, col in enumerate(STORE_COLUMNS)
+    }
+
+
+def empty_klines():
+    return {col: np.empty(0, dtype=np.int64 if col in INT_COLUMNS else np.float64)
+            for col in STORE_COLUMNS}
+
+
+def klines_length(klines):
+    return 0 if klines is None else len(klines['timestamp'])
+
+
+def tail_klines(klines, count):
+    """`count` nến cuối (view, không copy)"""
+    return {col: values[-count:] for col, values in klines.items()}
+
+
+def find_gaps(timestamps, step):
+    """
+    Tìm các khoảng thiếu nến bằng diff vector hóa
+    Trả về mảng (n, 2): open time của nến thiếu đầu tiên và cuối cùng trong mỗi khoảng
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if len(timestamps) < 2:
+        return np.empty((0, 2), dtype=np.int64)
+
+    diffs = np.diff(timestamps)
+    idx = np.flatnonzero(diffs > step)
+    return np.column_stack([timestamps[idx] + step, timestamps[idx + 1] - step])
+
+
+def gap_missing_counts(gaps, step):
+    """Số nến thiếu trong từng khoảng"""
+    return (gaps[:, 1] - gaps[:, 0]) // step + 1
+
+
+class CandleStore:
+    """Kho nến cục bộ theo (symbol, interval) với top-up tăng dần"""
+
+    def __init__(self, fetch_fn, cache_dir='data/candles', unfillable_ttl=6 * 3600,
+                 max_candles=20000, max_age_days=None):
+        """
+        fetch_fn(symbol, interval, limit, start_time=None, end_time=None) phải trả về
+        danh sách klines thô giống /api/v3/klines
+        unfillable_ttl: số giây bỏ qua một khoảng đã tải bù không được trước khi thử lại
+        max_candles / max_age_days: giới hạn số nến / tuổi nến giữ trong mỗi file (None = không giới hạn)
+        """
+        self.fetch_fn = fetch_fn
+        self.cache_dir = cache_dir
+        self.unfillable_ttl = unfillable_ttl
+        self.max_candles = max_candles
+        self.max_age_days = max_age_days
+        self._frames = {}
+        self._mtimes = {}  # {(symbol, interval): st_mtime_ns của file lúc đọc/ghi gần nhất}
+        self._gap_stats = {}
+        # {(symbol, interval): {open time đầu khoảng: thời điểm thử lần cuối}} - Binance không trả về nến
+        self._unfillable = {}
+        self._locks = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock_for(self, key):
+        with self._locks_guard:
+            if key not in self._locks:
+                self._locks[key] = threading.Lock()
+            return self._locks[key]
+
+    def _path(self, symbol, interval):
+        return os.path.join(self.cache_dir, f"{symbol}_{interval}.npz")
+
+    def _file_mtime(self, path):
+        try:
+            return os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _read_file(self, path):
+        try:
+            with np.load(path) as data:
+                return {col: data[col] for col in STORE_COLUMNS}
+        except Exception:
+            # File hỏng - bỏ qua và tải lại từ API
+            return None
+
+    def load(self, symbol, interval):
+        """Đọc nến đã lưu (ưu tiên bộ nhớ nếu file chưa bị worker khác ghi lại, sau đó tới đĩa)"""
+        key = (symbol, interval)
+        path = self._path(symbol, interval)
+        mtime = self._file_mtime(path)
+        if key in self._frames and (mtime is None or mtime == self._mtimes.get(key)):
+            return self._frames[key]
+        if mtime is None:
+            return None
+
+        klines = self._read_file(path)
+        if klines is not None:
+            self._frames[key] = klines
+            self._mtimes[key] = mtime
+        return klines
+
+    def trim(self, klines, keep=0):
+        """Bỏ nến cũ vượt max_candles / max_age_days, luôn giữ ít nhất `keep` nến cuối"""
+        count = klines_length(klines)
+        start = 0
+        if self.max_candles is not None:
+            start = max(start, count - self.max_candles)
+        if self.max_age_days is not None:
+            cutoff = int(time.time() * 1000) - int(self.max_age_days * INTERVAL_MS['1d'])
+            start = max(start, int(np.searchsorted(klines['timestamp'], cutoff)))
+        start = min(start, max(count - keep, 0))
+        if start == 0:
+            return klines
+        return {col: values[start:] for col, values in klines.items()}
+
+    def save(self, symbol, interval, klines, keep=0):
+        """
+        Ghi nến ra đĩa (ghi file tạm rồi replace để tránh file dở dang)
+        Dưới khóa file: nếu worker khác đã ghi file từ lần đọc trước thì ghép với bản trên đĩa
+        Trả về nến đã ghi (sau khi ghép và cắt bớt)
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        key = (symbol, interval)
+        path = self._path(symbol, interval)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        with open(f"{path}.lock", 'a+') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                mtime = self._file_mtime(path)
+                if mtime is not None and mtime != self._mtimes.get(key):
+                    on_disk = self._read_file(path)
+                    if on_disk is not None:
+                        klines = self.merge(on_disk, klines)
+                klines = self.trim(klines, keep)
+
+                with open(tmp_path, 'wb') as f:
+                    np.savez(f, **{col: klines[col] for col in STORE_COLUMNS})
+                os.replace(tmp_path, path)
+                self._mtimes[key] = self._file_mtime(path)
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self._frames[key] = klines
+        return klines
+
+    def merge(self, stored, fresh):
+        """Ghép nến mới vào nến đã lưu, nến mới ghi đè nến trùng timestamp"""
+        if klines_length(stored) == 0:
+            return fresh
+        if klines_length(fresh) == 0:
+            return stored
+
+        ts = np.concatenate([stored['timestamp'], fresh['timestamp']])
+        # Sắp ổn định: trong nhóm trùng timestamp nến của `fresh` đứng sau -> giữ phần tử cuối
+        order = np.argsort(ts, kind='stable')
+        sorted_ts = ts[order]
+        keep = order[np.r_[sorted_ts[1:] != sorted_ts[:-1], True]]
+
+        return {col: np.concatenate([stored[col], fresh[col]])[keep] for col in STORE_COLUMNS}
+
+    def get_klines(self, symbol, interval, limit=200):
+        """
+        Trả về `limit` nến gần nhất của (symbol, interval)
+        Chỉ gọi API cho phần nến còn thiếu kể từ nến cuối đã lưu
+        """
+        key = (symbol, interval)
+        step = interval_to_ms(interval)
+
+        with self._lock_for(key):
+            stored = self.load(symbol, interval)
+            now_ms = int(time.time() * 1000)
+
+            fresh = None
+            if klines_length(stored) >= limit:
+                # Nến cuối có thể chưa đóng -> tải lại từ open time của nến đó
+                last_open = int(stored['timestamp'][-1])
+                missing = (now_ms - last_open) // step + 1
+
+                if missing <= MAX_KLINES_PER_REQUEST:
+                    raw = self.fetch_fn(symbol, interval, min(int(missing) + 1, MAX_KLINES_PER_REQUEST),
+                                         start_time=last_open)
+                    if not raw:
+                        return None
+                    fresh = parse_klines(raw)
+
+            if fresh is None:
+                # Chưa có dữ liệu, thiếu quá nhiều nến, hoặc cửa sổ lưu quá ngắn
+                raw = self.fetch_fn(symbol, interval, limit)
+                if not raw:
+                    return None
+                fresh = parse_klines(raw)
+
+                # Nếu có khoảng trống giữa dữ liệu cũ và mới thì bỏ dữ liệu cũ
+                if (klines_length(stored) > 0 and
+                        int(fresh['timestamp'][0]) > int(stored['timestamp'][-1]) + step):
+                    stored = None
+
+            merged = self.backfill_gaps(symbol, interval, self.merge(stored, fresh))
+            merged = self.save(symbol, interval, merged, keep=limit)
+
+            return tail_klines(merged, limit)
+
+    def get_history(self, symbol, interval, count):
+        """
+        Trả về `count` nến gần nhất, kể cả khi vượt giới hạn 1000 nến/request
+        Phân trang ngược bằng endTime, ghép và loại trùng vào kho để lần sau đọc từ đĩa
+        """
+        recent = self.get_klines(symbol, interval, min(count, MAX_KLINES_PER_REQUEST))
+        if recent is None:
+            return None
+        if count <= MAX_KLINES_PER_REQUEST:
+            return recent
+
+        key = (symbol, interval)
+        with self._lock_for(key):
+            stored = self.load(symbol, interval)
+            changed = False
+
+            try:
+                while klines_length(stored) < count:
+                    first_open = int(stored['timestamp'][0])
+                    raw = self.fetch_fn(symbol, interval, MAX_KLINES_PER_REQUEST,
+                                        end_time=first_open - 1)
+                    if not raw:
+                        break  # Đã tới nến đầu tiên của symbol
+
+                    page = parse_klines(raw)
+                    if int(page['timestamp'][0]) >= first_open:
+                        break
+
+                    # Nến đã lưu được ưu tiên khi trùng timestamp
+                    stored = self.merge(page, stored)
+                    changed = True
+
+                if changed:
+                    stored = self.backfill_gaps(symbol, interval, stored)
+            finally:
+                if changed:
+                    stored = self.save(symbol, interval, stored, keep=count)
+
+            return tail_klines(stored, count)
+
+    def backfill_gaps(self, symbol, interval, klines):
+        """
+        Kiểm tra tính liên tục của timestamp và tải bù các khoảng thiếu bằng request theo khoảng
+        Khoảng Binance cũng không có nến (bảo trì...) được ghi nhớ và chỉ thử lại sau unfillable_ttl
+        Request lỗi không làm hỏng lần đọc: dừng tải bù và trả về dữ liệu đã ghép được
+        """
+        key = (symbol, interval)
+        step = interval_to_ms(interval)
+        now = time.time()
+        unfillable = self._unfillable.setdefault(key, {})
+
+        gaps = find_gaps(klines['timestamp'], step)
+        found = len(gaps)
+        missing = int(gap_missing_counts(gaps, step).sum()) if found else 0
+        largest = int(gap_missing_counts(gaps, step).max()) if found else 0
+        filled = 0
+        attempted = []  # các khoảng đã tải xong không lỗi
+
+        for gap_start, gap_end in gaps:
+            tried_at = unfillable.get(int(gap_start))
+            if tried_at is not None and now - tried_at < self.unfillable_ttl:
+                continue
+
+            start = int(gap_start)
+            try:
+                while start <= gap_end:
+                    count = min(int((gap_end - start) // step) + 1, MAX_KLINES_PER_REQUEST)
+                    raw = self.fetch_fn(symbol, interval, count, start_time=start,
+                                        end_time=int(gap_end) + step - 1)
+                    if not raw:
+                        break
+                    page = parse_klines(raw)
+                    page_end = int(page['timestamp'][-1])
+                    if page_end < start:
+                        break
+
+                    before = klines_length(klines)
+                    klines = self.merge(klines, page)
+                    filled += klines_length(klines) - before
+                    start = page_end + step
+            except Exception as e:
+                # Lỗi mạng / 429 - không đánh dấu khoảng này, lần đọc sau thử lại
+                #print(f"❌ Gap backfill error for {symbol} {interval}: {e}")
+                break
+            attempted.append((int(gap_start), int(gap_end)))
+
+        remaining = find_gaps(klines['timestamp'], step)
+        remaining_starts = {int(gap_start) for gap_start in remaining[:, 0]}
+        for gap_start in list(unfillable):
+            if gap_start not in remaining_starts:
+                del unfillable[gap_start]
+        for gap_start in remaining_starts:
+            if any(start <= gap_start <= end for start, end in attempted):
+                unfillable[gap_start] = now
+
+        self._gap_stats[key] = {
+            'candles': klines_length(klines),
+            'gaps_found': found,
+            'missing_found': missing,
+            'largest_gap': largest,
+            'backfilled': filled,
+            'unfilled_gaps': len(remaining),
+            'unfilled_missing': int(gap_missing_counts(remaining, step).sum()) if len(remaining) else 0,
+            'checked_at': time.time()
+        }
+        return klines
+
+    def gap_stats(self, symbol=None, interval=None):
+        """Thống kê gap của lần kiểm tra gần nhất, lọc theo symbol/interval nếu có"""
+        return {
+            key: dict(stats) for key, stats in self._gap_stats.items()
+            if (symbol is None or key[0] == symbol) and (interval is None or key[1] == interval)
+        }
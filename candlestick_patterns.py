@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Nhận diện mô hình nến vector hóa trên mảng OHLC (1 chiều hoặc panel symbols x time)
+
+Mọi mô hình được tính trong một lượt từ các đại lượng dùng chung (thân nến, bóng trên/dưới,
+nến trước) và gộp thành một cột bitmask số nguyên: bit i bật nếu mô hình thứ i xuất hiện.
+Thêm mô hình mới = viết một hàm nhận Candles và đăng ký bằng @pattern
+"""
+
+import numpy as np
+
+import indicator_kernels as k
+
+BULLISH = 'bullish'
+BEARISH = 'bearish'
+NEUTRAL = 'neutral'
+
+PATTERNS = []  # (name, direction, fn) theo thứ tự bit
+
+
+def pattern(name, direction):
+    """Đăng ký một mô hình - bit tiếp theo được cấp theo thứ tự khai báo"""
+    def register(fn):
+        PATTERNS.append((name, direction, fn))
+        return fn
+    return register
+
+
+class Candles:
+    """Các đại lượng dùng chung cho mọi mô hình (nến trước có NaN ở đầu chuỗi -> so sánh là False)"""
+
+    def __init__(self, open_, high, low, close):
+        self.open = np.asarray(open_, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+
+        self.body = np.abs(self.close - self.open)
+        self.body_top = np.maximum(self.close, self.open)
+        self.body_bottom = np.minimum(self.close, self.open)
+        self.upper_shadow = self.high - self.body_top
+        self.lower_shadow = self.body_bottom - self.low
+        self.range = self.high - self.low
+        self.bullish = self.close > self.open
+        self.bearish = self.close < self.open
+
+        self.prev_open = k.shift(self.open, 1)
+        self.prev_close = k.shift(self.close, 1)
+        self.prev2_open = k.shift(self.open, 2)
+        self.prev2_close = k.shift(self.close, 2)
+
+
+# ---------- Nến đơn ----------
+
+@pattern('hammer', BULLISH)
+def _hammer(c):
+    return (c.lower_shadow > 2 * c.body) & (c.upper_shadow < c.body)
+
+
+@pattern('hanging_man', BEARISH)
+def _hanging_man(c):
+    return (c.lower_shadow > 2 * c.body) & (c.upper_shadow < c.body) & c.bearish
+
+
+@pattern('doji', NEUTRAL)
+def _doji(c):
+    return c.body < (c.range * 0.1)
+
+
+# ---------- Hai nến ----------
+
+@pattern('engulfing_bullish', BULLISH)
+def _engulfing_bullish(c):
+    return ((c.prev_close < c.prev_open) & c.bullish &
+            (c.open < c.prev_close) & (c.close > c.prev_open))
+
+
+@pattern('harami_bullish', BULLISH)
+def _harami_bullish(c):
+    # Nến tăng nhỏ nằm trong thân nến giảm trước đó
+    return ((c.prev_close < c.prev_open) & c.bullish &
+            (c.open > c.prev_close) & (c.close < c.prev_open))
+
+
+@pattern('harami_bearish', BEARISH)
+def _harami_bearish(c):
+    return ((c.prev_close > c.prev_open) & c.bearish &
+            (c.open < c.prev_close) & (c.close > c.prev_open))
+
+
+# ---------- Ba nến ----------
+
+@pattern('morning_star', BULLISH)
+def _morning_star(c):
+    # Đơn giản hóa
+    return (c.prev2_close > c.prev_close) & (c.close > c.prev_close) & c.bullish
+
+
+@pattern('evening_star', BEARISH)
+def _evening_star(c):
+    # Đơn giản hóa
+    return (c.prev2_close < c.prev_close) & (c.close < c.prev_close) & c.bearish
+
+
+@pattern('three_white_soldiers', BULLISH)
+def _three_white_soldiers(c):
+    # Ba nến tăng liên tiếp, mỗi nến mở cửa trong thân nến trước và đóng cửa cao hơn
+    return (c.bullish & (c.prev_close > c.prev_open) & (c.prev2_close > c.prev2_open) &
+            (c.close > c.prev_close) & (c.prev_close > c.prev2_close) &
+            (c.open > c.prev_open) & (c.open < c.prev_close) &
+            (c.prev_open > c.prev2_open) & (c.prev_open < c.prev2_close))
+
+
+@pattern('three_black_crows', BEARISH)
+def _three_black_crows(c):
+    return (c.bearish & (c.prev_close < c.prev_open) & (c.prev2_close < c.prev2_open) &
+            (c.close < c.prev_close) & (c.prev_close < c.prev2_close) &
+            (c.open < c.prev_open) & (c.open > c.prev_close) &
+            (c.prev_open < c.prev2_open) & (c.prev_open > c.prev2_close))
+
+
+PATTERN_BITS = {name: 1 << bit for bit, (name, _, _) in enumerate(PATTERNS)}
+PATTERN_DIRECTIONS = {name: direction for name, direction, _ in PATTERNS}
+
+
+def detect_patterns(open_, high, low, close):
+    """Bitmask mô hình nến cho từng nến (int32, cùng shape với close)"""
+    candles = Candles(open_, high, low, close)
+    mask = np.zeros(candles.close.shape, dtype=np.int32)
+    with np.errstate(invalid='ignore'):
+        for name, _, fn in PATTERNS:
+            mask[fn(candles)] |= PATTERN_BITS[name]
+    return mask
+
+
+def pattern_mask(*names):
+    """Bitmask gộp của các mô hình - dùng để kiểm tra 'có ít nhất một trong các mô hình'"""
+    mask = 0
+    for name in names:
+        mask |= PATTERN_BITS[name]
+    return mask
+
+
+def has_pattern(mask, name):
+    """mask: giá trị bitmask của một nến (hoặc mảng bitmask)"""
+    return (mask & PATTERN_BITS[name]) != 0
+
+
+def pattern_names(mask):
+    """Tên các mô hình có trong bitmask của một nến"""
+    return [name for name, bit in PATTERN_BITS.items() if int(mask) & bit]
+
+
+def pattern_signal(mask, name):
+    """Cột kiểu TA-Lib cho một mô hình: 100 (tăng/trung tính), -100 (giảm), 0 nếu không có"""
+    strength = -100 if PATTERN_DIRECTIONS[name] == BEARISH else 100
+    return np.where(has_pattern(mask, name), strength, 0)
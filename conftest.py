@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Fixture dùng chung cho các test
+"""
+
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from binance_stub_server import create_app
+
+
+def _make_frame(n=220, seed=0, freq='1h', start='2024-01-01', exchange_columns=False):
+    """Chuỗi nến ngẫu nhiên (random walk) hợp lệ: low <= open/close <= high"""
+    rng = np.random.default_rng(seed)
+    close = 100 + np.cumsum(rng.normal(size=n))
+    open_ = close + rng.normal(scale=0.5, size=n)
+    df = pd.DataFrame({
+        'timestamp': pd.date_range(start, periods=n, freq=freq),
+        'open': open_,
+        'high': np.maximum(open_, close) + rng.random(n),
+        'low': np.minimum(open_, close) - rng.random(n),
+        'close': close,
+        'volume': rng.random(n) * 1000,
+    })
+    if exchange_columns:
+        # Cột phụ của klines Binance (bị bỏ trong frame compact)
+        df['quote_asset_volume'] = rng.random(n) * 1e5
+        df['number_of_trades'] = rng.integers(1, 500, size=n)
+    return df
+
+
+@pytest.fixture
+def make_frame():
+    """Factory: make_frame(n, seed, freq, start, exchange_columns) -> DataFrame nến OHLCV"""
+    return _make_frame
+
+
+class StubServer:
+    """
+    binance_stub_server chạy trên một cổng ngẫu nhiên, ghi lại từng request nhận được
+    Server dev của werkzeug luôn đóng kết nối sau mỗi response nên app Flask được gọi qua
+    test client phía sau một http.server HTTP/1.1 giữ kết nối như Binance thật
+    """
+
+    def __init__(self, settings):
+        self.app = create_app(dict({'latency_ms': 0, 'jitter_ms': 0, 'error_rate': 0.0,
+                                    'fixture_file': None}, **settings))
+        self.settings = self.app.config['STUB_SETTINGS']
+        self.requests = []  # [(path, params, client port)]
+        self._lock = threading.Lock()
+        stub = self
+
+        class KeepAliveHandler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                url = urlsplit(self.path)
+                with stub._lock:
+                    stub.requests.append((url.path, dict(parse_qsl(url.query)), self.client_address[1]))
+                response = stub.app.test_client().get(self.path)
+                body = response.get_data()
+                self.send_response(response.status_code)
+                for name, value in response.headers.items():
+                    if name.lower() != 'content-length':
+                        self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), KeepAliveHandler)
+        self.server.daemon_threads = True
+        self.api_root = f"http://127.0.0.1:{self.server.server_port}/api/v3"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def requests_for(self, path):
+        return [params for p, params, _ in self.requests if p.endswith(path)]
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_server():
+    """Factory: stub_server(**settings) -> StubServer đang chạy (tự tắt sau test)"""
+    servers = []
+
+    def start(**settings):
+        server = StubServer(settings)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
@@ -6,7 +6,6 @@ Enhanced Crypto Analysis với logic sửa đổi và tracking kết quả
 import pandas as pd
 import numpy as np
 import requests
-import time
 from datetime import datetime, timedelta
 # Thay thế TA-Lib bằng các hàm tự viết
 import warnings
@@ -15,143 +14,68 @@ import json
 from tabulate import tabulate
 import colorama
 from colorama import Fore, Back, Style
+from candle_store import CandleStore, FRAME_COLUMNS, INTERVAL_MS, interval_to_ms, normalize_interval, resample_ohlcv
+from binance_client import BinanceClient
+from kline_fetcher import AsyncKlineFetcher
+from rate_limiter import klines_weight, TICKER_24HR_ALL_WEIGHT, EXCHANGE_INFO_WEIGHT
+from market_universe import SymbolIndex, TickerSnapshotCache
+import indicator_kernels
+import indicator_graph
+import candlestick_patterns
+import signal_scoring
+from indicator_cache import FIB_COLUMNS, IndicatorFrameCache, compact_frame, frame_row
+import panel_indicators
+from pattern_indicators import PatternIndicatorSet, pattern_params
+from price_levels import PriceLevelIndex, RESISTANCE_SOURCES, SUPPORT_SOURCES
 
 warnings.filterwarnings('ignore')
 colorama.init()
 
-# ================== THAY THẾ TA-LIB BẰNG CÁC HÀM TỰ VIẾT ==================
-
-def calculate_ema(data, window):
-    """Tính Exponential Moving Average"""
-    return data.ewm(span=window, adjust=False).mean()
-
-def calculate_sma(data, window):
-    """Tính Simple Moving Average"""
-    return data.rolling(window=window).mean()
-
-def calculate_rsi(data, window=14):
-    """Tính Relative Strength Index"""
-    delta = data.diff()
-    gain = (delta.where(delta > 0, 0)).rolling(window=window).mean()
-    loss = (-delta.where(delta < 0, 0)).rolling(window=window).mean()
-    rs = gain / loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
+CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
 
-def calculate_macd(data, fast=12, slow=26, signal=9):
-    """Tính MACD"""
-    ema_fast = calculate_ema(data, fast)
-    ema_slow = calculate_ema(data, slow)
-    macd = ema_fast - ema_slow
-    macd_signal = calculate_ema(macd, signal)
-    macd_hist = macd - macd_signal
-    return macd, macd_signal, macd_hist
-
-def calculate_bollinger_bands(data, window=20, num_std=2):
-    """Tính Bollinger Bands"""
-    sma = calculate_sma(data, window)
-    std = data.rolling(window=window).std()
-    upper = sma + (std * num_std)
-    lower = sma - (std * num_std)
-    return upper, sma, lower
-
-def calculate_atr(high, low, close, window=14):
-    """Tính Average True Range"""
-    tr1 = high - low
-    tr2 = abs(high - close.shift(1))
-    tr3 = abs(low - close.shift(1))
-    tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-    atr = tr.rolling(window=window).mean()
-    return atr
+def load_config(path=CONFIG_FILE):
+    """Đọc config.json, trả về dict rỗng nếu không có file hoặc file lỗi"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
 
-def calculate_stochastic(high, low, close, k_window=14, d_window=3):
-    """Tính Stochastic Oscillator"""
-    lowest_low = low.rolling(window=k_window).min()
-    highest_high = high.rolling(window=k_window).max()
-    k_percent = 100 * ((close - lowest_low) / (highest_high - lowest_low))
-    d_percent = calculate_sma(k_percent, d_window)
-    return k_percent, d_percent
+# ================== THAY THẾ TA-LIB BẰNG CÁC HÀM TỰ VIẾT ==================
 
-def calculate_obv(close, volume):
-    """Tính On-Balance Volume"""
-    obv = (np.sign(close.diff()) * volume).fillna(0).cumsum()
-    return obv
+def _as_series(values, like):
+    """Bọc kết quả kernel NumPy thành Series cùng index với đầu vào"""
+    return pd.Series(values, index=like.index, name=like.name)
 
-def calculate_adx(high, low, close, window=14):
-    """Tính Average Directional Index"""
-    tr = calculate_atr(high, low, close, 1)
-    
-    plus_dm = high.diff()
-    minus_dm = -low.diff()
-    
-    plus_dm = np.where((plus_dm > minus_dm) & (plus_dm > 0), plus_dm, 0)
-    minus_dm = np.where((minus_dm > plus_dm) & (minus_dm > 0), minus_dm, 0)
-    
-    plus_dm = pd.Series(plus_dm).rolling(window=window).mean()
-    minus_dm = pd.Series(minus_dm).rolling(window=window).mean()
-    tr_avg = tr.rolling(window=window).mean()
-    
-    plus_di = 100 * (plus_dm / tr_avg)
-    minus_di = 100 * (minus_dm / tr_avg)
-    
-    dx = 100 * abs(plus_di - minus_di) / (plus_di + minus_di)
-    adx = dx.rolling(window=window).mean()
-    
-    return adx, plus_di, minus_di
+def _candle_pattern(name, open_price, high, low, close):
+    """Cột một mô hình nến (100 / -100 với mô hình giảm / 0) từ bitmask của candlestick_patterns"""
+    mask = candlestick_patterns.detect_patterns(open_price.to_numpy(), high.to_numpy(),
+                                                low.to_numpy(), close.to_numpy())
+    return _as_series(candlestick_patterns.pattern_signal(mask, name), close)
 
 def is_hammer(open_price, high, low, close):
     """Kiểm tra nến Hammer"""
-    body = abs(close - open_price)
-    upper_shadow = high - max(close, open_price)
-    lower_shadow = min(close, open_price) - low
-    
-    is_hammer = (lower_shadow > 2 * body) & (upper_shadow < body)
-    return is_hammer.astype(int) * 100
+    return _candle_pattern('hammer', open_price, high, low, close)
 
 def is_doji(open_price, high, low, close):
     """Kiểm tra nến Doji"""
-    body = abs(close - open_price)
-    total_range = high - low
-    
-    is_doji = body < (total_range * 0.1)
-    return is_doji.astype(int) * 100
+    return _candle_pattern('doji', open_price, high, low, close)
 
 def is_engulfing_bullish(open_price, high, low, close):
     """Kiểm tra mô hình Bullish Engulfing"""
-    prev_open = open_price.shift(1)
-    prev_close = close.shift(1)
-    
-    is_bullish = (prev_close < prev_open) & (close > open_price) & \
-                 (open_price < prev_close) & (close > prev_open)
-    return is_bullish.astype(int) * 100
+    return _candle_pattern('engulfing_bullish', open_price, high, low, close)
 
 def is_morning_star(open_price, high, low, close):
     """Kiểm tra mô hình Morning Star (đơn giản hóa)"""
-    prev_close = close.shift(1)
-    prev2_close = close.shift(2)
-    
-    is_morning = (prev2_close > prev_close) & (close > prev_close) & \
-                 (close > open_price)
-    return is_morning.astype(int) * 100
+    return _candle_pattern('morning_star', open_price, high, low, close)
 
 def is_hanging_man(open_price, high, low, close):
     """Kiểm tra nến Hanging Man"""
-    body = abs(close - open_price)
-    upper_shadow = high - max(close, open_price)
-    lower_shadow = min(close, open_price) - low
-    
-    is_hanging = (lower_shadow > 2 * body) & (upper_shadow < body) & \
-                 (close < open_price)
-    return is_hanging.astype(int) * 100
+    return _candle_pattern('hanging_man', open_price, high, low, close)
 
 def is_evening_star(open_price, high, low, close):
     """Kiểm tra mô hình Evening Star (đơn giản hóa)"""
-    prev_close = close.shift(1)
-    prev2_close = close.shift(2)
-    
-    is_evening = (prev2_close < prev_close) & (close < prev_close) & \
-                 (close < open_price)
-    return is_evening.astype(int) * 100
+    return _candle_pattern('evening_star', open_price, high, low, close)
 
 class PredictionTracker:
     """Class để theo dõi và đánh giá kết quả dự đoán"""
@@ -289,17 +213,76 @@ class PredictionTracker:
             #print(f"❌ Error calculating accuracy: {e}")
             return 0.0
 
+# Khung phụ trong analyze_single_pair_by_investment_type chỉ đọc các cột này (và close)
+SECONDARY_TIMEFRAME_COLUMNS = ['EMA_10', 'EMA_20', 'volume_ratio']
+
+class AnalysisRunMemo:
+    """Memo cho một lượt phân tích: mỗi (symbol, interval) chỉ tải và tính chỉ báo một lần"""
+    
+    def __init__(self, klines=None):
+        self.klines = klines or {}  # {(symbol, interval): df thô}
+        self.frames = {}            # {(symbol, interval): df đã tính chỉ báo}
+        self.partial = set()        # key trong frames mới chỉ có một phần cột chỉ báo
+
 class EnhancedCryptoPredictionAppV2:
     def __init__(self):
+        self.config = load_config()
+        api_settings = self.config.get('api_settings', {})
+        
         # Removed fixed pairs - will be dynamic now
-        self.base_url = "https://api.binance.com/api/v3/klines"
-        self.exchange_info_url = "https://api.binance.com/api/v3/exchangeInfo"
-        self.ticker_24hr_url = "https://api.binance.com/api/v3/ticker/24hr"
+        # api_root có thể trỏ sang server giả lập (binance_stub_server.py) khi load test
+        api_root = api_settings.get('api_root', "https://api.binance.com/api/v3").rstrip('/')
+        self.base_url = api_settings.get('binance_base_url', f"{api_root}/klines")
+        self.exchange_info_url = f"{api_root}/exchangeInfo"
+        self.ticker_24hr_url = f"{api_root}/ticker/24hr"
         self.tracker = PredictionTracker()
         
+        # HTTP session dùng chung (keep-alive, gzip, retry) cho mọi request tới Binance
+        self.http = BinanceClient(api_settings)
+        
+        # Kho nến cục bộ - chỉ tải thêm nến mới thay vì tải lại cả cửa sổ
+        store_settings = self.config.get('candle_store', {})
+        self.candle_store = CandleStore(
+            self._request_klines,
+            cache_dir=store_settings.get('cache_dir', 'data/candles'),
+            max_candles=store_settings.get('max_candles', 20000),
+            max_age_days=store_settings.get('max_age_days')
+        )
+        
+        # Resample khung lớn (1h/4h/1d) từ chuỗi nến base thay vì tải riêng từng khung
+        resampling = self.config.get('resampling', {})
+        self.resample_enabled = resampling.get('enabled', True)
+        self.resample_base_intervals = resampling.get('base_intervals', ['15m', '4h'])
+        self.resample_base_limit = resampling.get('base_limit', 1000)
+        
+        # Cache frame chỉ báo giữa các request - chỉ dùng lại khi dữ liệu nến giống hệt
+        cache_settings = self.config.get('indicator_cache', {})
+        # Frame compact (float32, bỏ cột tạm, Fibonacci trong attrs) cho frame đầy đủ giữ trong bộ nhớ
+        self.compact_frames = cache_settings.get('compact_frames', True)
+        self.indicator_cache = None
+        if cache_settings.get('enabled', True):
+            self.indicator_cache = IndicatorFrameCache(int(cache_settings.get('max_mb', 64) * 1024 * 1024))
+        
+        # Tải klines song song cho nhiều symbol/khung thời gian
+        self.fetcher = AsyncKlineFetcher(self.get_kline_data, api_settings.get('max_concurrency', 8))
+        
         # Supported base currencies
         self.supported_base_currencies = ['JPY', 'USDT']
         
+        # Index metadata symbol từ exchangeInfo (quote asset, status, tick size), refresh định kỳ
+        self.symbol_index = SymbolIndex(
+            self._request_exchange_info,
+            ttl=api_settings.get('exchange_info_ttl', 3600)
+        )
+        
+        # Cache ticker 24h dùng chung, view theo base currency tính sẵn mỗi lần refresh
+        self.ticker_cache = TickerSnapshotCache(
+            self._request_ticker_24hr,
+            self._rank_coins_by_base_currency,
+            ttl=api_settings.get('ticker_cache_ttl', 60),
+            precompute=self.supported_base_currencies
+        )
+        
         # Market Patterns Configuration
         self.market_patterns = {
             "default": {
@@ -458,45 +441,82 @@ class EnhancedCryptoPredictionAppV2:
             '1d': {'timeframe': '4h', 'analysis_timeframes': ['4h', '1d'], 'hold_duration': '1 day'}
         }
 
+    def _request_ticker_24hr(self):
+        """Tải ticker 24h của toàn bộ symbol"""
+        return self.http.get_json(self.ticker_24hr_url, weight=TICKER_24HR_ALL_WEIGHT)
+
+    def _request_exchange_info(self):
+        """Tải exchangeInfo của toàn bộ symbol"""
+        return self.http.get_json(self.exchange_info_url, weight=EXCHANGE_INFO_WEIGHT)
+
+    def _is_tradable_base_coin(self, base_coin, symbol_data=None):
+        """Loại bỏ những coin có tên quá dài, leverage tokens, stablecoins và BTC"""
+        if len(base_coin) > 10 or base_coin in ['BUSD', 'TUSD', 'USDC', 'DAI', 'PAX', 'BTC']:
+            return False
+        if symbol_data is not None:
+            return not symbol_data.is_leveraged_token(base_coin)
+        return not any(x in base_coin for x in ['UP', 'DOWN', 'BEAR', 'BULL'])
+
+    def _rank_coins_by_base_currency(self, tickers, base_currency):
+        """Lọc các coin theo base currency và sắp xếp theo lượng tiền giao dịch giảm dần"""
+        try:
+            symbol_data = self.symbol_index.get()
+        except Exception:
+            # Không tải được exchangeInfo - lọc theo tên symbol như cũ
+            symbol_data = None
+        
+        filtered_coins = []
+        for ticker in tickers:
+            symbol = ticker['symbol']
+            if symbol_data is not None:
+                info = symbol_data.symbols.get(symbol)
+                if info is None or info['quoteAsset'] != base_currency or info['status'] != 'TRADING':
+                    continue
+                base_coin = info['baseAsset']
+            elif symbol.endswith(base_currency):
+                base_coin = symbol[:-len(base_currency)]
+            else:
+                continue
+            
+            if self._is_tradable_base_coin(base_coin, symbol_data):
+                price = float(ticker['lastPrice'])
+                volume = float(ticker['volume'])
+                money_traded = price * volume  # Tính lượng tiền giao dịch
+                
+                filtered_coins.append({
+                    'symbol': symbol,
+                    'baseAsset': base_coin,
+                    'volume': volume,
+                    'priceChange': float(ticker['priceChangePercent']),
+                    'price': price,
+                    'money_traded': money_traded
+                })
+        
+        # Sắp xếp theo lượng tiền giao dịch giảm dần
+        filtered_coins.sort(key=lambda x: x['money_traded'], reverse=True)
+        return filtered_coins
+
+    def round_to_tick(self, symbol, *prices):
+        """Làm tròn giá theo tick size của symbol (giữ nguyên nếu không có exchangeInfo)
+        
+        Tick size hiếm khi đổi: index đã hết hạn vẫn dùng ngay, tải lại ở thread nền
+        """
+        try:
+            symbol_data = self.symbol_index.get(background=True)
+            return tuple(symbol_data.round_price(symbol, price) for price in prices)
+        except Exception:
+            return prices
+
     def get_top_coins_by_base_currency(self, base_currency='USDT', limit=15):
         """
-        Lấy top coins theo base currency từ Binance API
+        Lấy top coins theo base currency từ snapshot ticker 24h (cache TTL)
         Sắp xếp theo lượng tiền giao dịch (price * volume) để có các coin hot nhất
         """
         try:
-            response = requests.get(self.ticker_24hr_url, timeout=30)
-            response.raise_for_status()
-            tickers = response.json()
-            
-            # Lọc các coin có base currency được chỉ định
-            filtered_coins = []
-            for ticker in tickers:
-                symbol = ticker['symbol']
-                if symbol.endswith(base_currency):
-                    # Loại bỏ những coin có tên quá dài hoặc là leverage tokens và BTC
-                    base_coin = symbol.replace(base_currency, '')
-                    if (len(base_coin) <= 10 and 
-                        not any(x in base_coin for x in ['UP', 'DOWN', 'BEAR', 'BULL']) and
-                        base_coin not in ['BUSD', 'TUSD', 'USDC', 'DAI', 'PAX', 'BTC']):  # Loại bỏ stablecoins và BTC
-                        
-                        price = float(ticker['lastPrice'])
-                        volume = float(ticker['volume'])
-                        money_traded = price * volume  # Tính lượng tiền giao dịch
-                        
-                        filtered_coins.append({
-                            'symbol': symbol,
-                            'baseAsset': base_coin,
-                            'volume': volume,
-                            'priceChange': float(ticker['priceChangePercent']),
-                            'price': price,
-                            'money_traded': money_traded
-                        })
-            
-            # Sắp xếp theo lượng tiền giao dịch giảm dần
-            filtered_coins.sort(key=lambda x: x['money_traded'], reverse=True)
+            ranked_coins = self.ticker_cache.get_view(base_currency)
             
-            # Lấy top coins
-            top_coins = filtered_coins[:limit]
+            # Lấy top coins (copy vì caller có thể thêm field vào từng coin)
+            top_coins = [dict(coin) for coin in ranked_coins[:limit]]
             
             #print(f"🔍 Found {len(top_coins)} top coins for {base_currency}")
             return top_coins
@@ -524,37 +544,35 @@ class EnhancedCryptoPredictionAppV2:
         return self.supported_base_currencies
         
 
+    def _request_klines(self, symbol, interval, limit, start_time=None, end_time=None):
+        """Gọi /api/v3/klines và trả về payload thô"""
+        params = {
+            'symbol': symbol,
+            'interval': interval,
+            'limit': limit
+        }
+        if start_time is not None:
+            params['startTime'] = start_time
+        if end_time is not None:
+            params['endTime'] = end_time
+        
+        return self.http.get_json(self.base_url, params=params, weight=klines_weight(limit))
+
+    def _to_kline_frame(self, klines):
+        """Tạo DataFrame cho phần phân tích từ các cột NumPy của kho nến"""
+        if klines is None or len(klines['timestamp']) == 0:
+            return None
+        
+        # Keep timestamp as a column, not index
+        columns = {'timestamp': pd.to_datetime(klines['timestamp'], unit='ms')}
+        columns.update((col, klines[col]) for col in FRAME_COLUMNS)
+        
+        return pd.DataFrame(columns)
+
     def get_kline_data(self, symbol, interval='15m', limit=200):
-        """Lấy dữ liệu giá từ Binance API với error handling tốt hơn"""
+        """Lấy dữ liệu giá từ kho nến cục bộ (top-up từ Binance API) với error handling tốt hơn"""
         try:
-            params = {
-                'symbol': symbol,
-                'interval': interval,
-                'limit': limit
-            }
-            
-            response = requests.get(self.base_url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            
-            if not data:
-                return None
-            
-            # Chuyển đổi thành DataFrame
-            df = pd.DataFrame(data, columns=[
-                'timestamp', 'open', 'high', 'low', 'close', 'volume',
-                'close_time', 'quote_asset_volume', 'number_of_trades',
-                'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume', 'ignore'
-            ])
-            
-            # Chuyển đổi kiểu dữ liệu
-            for col in ['open', 'high', 'low', 'close', 'volume']:
-                df[col] = pd.to_numeric(df[col])
-            
-            df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
-            # Keep timestamp as a column, not index
-            
-            return df[['timestamp', 'open', 'high', 'low', 'close', 'volume']]
+            return self._to_kline_frame(self.candle_store.get_klines(symbol, interval, limit))
             
         except requests.exceptions.RequestException as e:
             #print(f"{Fore.RED}❌ Network error for {symbol}: {e}{Style.RESET_ALL}")
@@ -562,224 +580,274 @@ class EnhancedCryptoPredictionAppV2:
         except Exception as e:
             #print(f"{Fore.RED}❌ Data error for {symbol}: {e}{Style.RESET_ALL}")
             return None
-    
-    def calculate_advanced_indicators(self, df):
-        """Tính toán các chỉ báo kỹ thuật nâng cao"""
-        if df is None or len(df) < 50:
-            return None
-            
+
+    def get_history_data(self, symbol, interval='4h', limit=1000):
+        """Lấy lịch sử dài (không giới hạn 1000 nến) cho backtest, phân trang qua kho nến"""
         try:
-            # Moving Averages
-            df['EMA_10'] = calculate_ema(df['close'], 10)
-            df['EMA_20'] = calculate_ema(df['close'], 20)
-            df['EMA_50'] = calculate_ema(df['close'], 50)
-            
-            # Momentum Indicators
-            df['RSI'] = calculate_rsi(df['close'], 14)
-            df['MACD'], df['MACD_signal'], df['MACD_hist'] = calculate_macd(df['close'])
-            
-            # Volatility Indicators
-            df['BB_upper'], df['BB_middle'], df['BB_lower'] = calculate_bollinger_bands(df['close'])
-            df['ATR'] = calculate_atr(df['high'], df['low'], df['close'], 14)
-            
-            # Volume Indicators
-            df['volume_sma'] = calculate_sma(df['volume'], 20)
-            df['volume_ratio'] = df['volume'] / df['volume_sma']
-            
-            # Enhanced Support/Resistance với multiple timeframes
-            df = self.calculate_dynamic_support_resistance(df)
-            
-            # === NEW ADVANCED INDICATORS ===
-            
-            # Ichimoku Cloud Components
-            high9 = df['high'].rolling(window=9).max()
-            low9 = df['low'].rolling(window=9).min()
-            df['tenkan_sen'] = (high9 + low9) / 2
-            
-            high26 = df['high'].rolling(window=26).max()
-            low26 = df['low'].rolling(window=26).min()
-            df['kijun_sen'] = (high26 + low26) / 2
-            
-            df['senkou_span_a'] = ((df['tenkan_sen'] + df['kijun_sen']) / 2).shift(26)
-            
-            high52 = df['high'].rolling(window=52).max()
-            low52 = df['low'].rolling(window=52).min()
-            df['senkou_span_b'] = ((high52 + low52) / 2).shift(26)
-            
-            df['chikou_span'] = df['close'].shift(-26)
-            
-            # Stochastic Oscillator
-            df['stoch_k'], df['stoch_d'] = calculate_stochastic(df['high'], df['low'], df['close'], 
-                                                               k_window=14, d_window=3)
-            
-            # On-Balance Volume (OBV)
-            df['OBV'] = calculate_obv(df['close'], df['volume'])
-            df['OBV_sma'] = calculate_sma(df['OBV'], 20)
-            
-            # Average Directional Index (ADX) - Đo sức mạnh xu hướng
-            df['ADX'], df['DI_plus'], df['DI_minus'] = calculate_adx(df['high'], df['low'], df['close'], 14)
-            
-            # Bollinger Band Width (để phát hiện thị trường sideway)
-            df['BB_width'] = (df['BB_upper'] - df['BB_lower']) / df['BB_middle']
-            df['BB_width_sma'] = df['BB_width'].rolling(window=20).mean()
-            
-            # Fibonacci Retracement Levels (tự động tính)
-            df = self.calculate_fibonacci_levels(df)
-            
-            # Candlestick Pattern Recognition
-            df = self.detect_candlestick_patterns(df)
-            
-            return df
+            interval = normalize_interval(interval)
+            return self._to_kline_frame(self.candle_store.get_history(symbol, interval, limit))
             
+        except requests.exceptions.RequestException as e:
+            return None
         except Exception as e:
-            #print(f"{Fore.RED}❌ Indicator calculation error: {e}{Style.RESET_ALL}")
             return None
 
-    def calculate_dynamic_support_resistance(self, df):
-        """Tính toán hỗ trợ/kháng cự động với nhiều phương pháp"""
-        try:
-            # 1. Traditional High/Low method (đã có)
-            df['resistance'] = df['high'].rolling(window=20).max()
-            df['support'] = df['low'].rolling(window=20).min()
-            
-            # 2. Pivot Points method
-            df = self.calculate_pivot_points(df)
-            
-            # 3. Volume-weighted support/resistance
-            df = self.calculate_volume_weighted_levels(df)
-            
-            # 4. Multiple timeframe resistance levels
-            df['resistance_strong'] = df['high'].rolling(window=50).max()  # Stronger resistance
-            df['resistance_weak'] = df['high'].rolling(window=10).max()    # Weaker resistance
-            
-            df['support_strong'] = df['low'].rolling(window=50).min()      # Stronger support
-            df['support_weak'] = df['low'].rolling(window=10).min()        # Weaker support
-            
-            # 5. EMA-based dynamic levels
-            df['ema_resistance'] = df[['EMA_20', 'EMA_50']].max(axis=1)
-            df['ema_support'] = df[['EMA_20', 'EMA_50']].min(axis=1)
-            
-            return df
-            
-        except Exception as e:
-            # Fallback to simple method
-            df['resistance'] = df['high'].rolling(window=20).max()
-            df['support'] = df['low'].rolling(window=20).min()
-            return df
+    def get_gap_stats(self, symbol=None, interval=None):
+        """Thống kê nến bị thiếu / đã tải bù theo (symbol, interval)"""
+        if interval is not None:
+            interval = normalize_interval(interval)
+        return self.candle_store.gap_stats(symbol, interval)
     
-    def calculate_pivot_points(self, df):
-        """Tính các mức pivot points"""
-        try:
-            # Sử dụng dữ liệu ngày trước để tính pivot
-            df['prev_high'] = df['high'].shift(1)
-            df['prev_low'] = df['low'].shift(1)
-            df['prev_close'] = df['close'].shift(1)
-            
-            # Pivot Point
-            df['pivot'] = (df['prev_high'] + df['prev_low'] + df['prev_close']) / 3
-            
-            # Resistance levels
-            df['r1'] = 2 * df['pivot'] - df['prev_low']
-            df['r2'] = df['pivot'] + (df['prev_high'] - df['prev_low'])
-            df['r3'] = df['prev_high'] + 2 * (df['pivot'] - df['prev_low'])
-            
-            # Support levels  
-            df['s1'] = 2 * df['pivot'] - df['prev_high']
-            df['s2'] = df['pivot'] - (df['prev_high'] - df['prev_low'])
-            df['s3'] = df['prev_low'] - 2 * (df['prev_high'] - df['pivot'])
-            
-            return df
-            
-        except Exception as e:
-            # Set default values if calculation fails
-            df['pivot'] = df['close']
-            df['r1'] = df['close'] * 1.01
-            df['r2'] = df['close'] * 1.02  
-            df['r3'] = df['close'] * 1.03
-            df['s1'] = df['close'] * 0.99
-            df['s2'] = df['close'] * 0.98
-            df['s3'] = df['close'] * 0.97
-            return df
+    def get_investment_type_jobs(self, pairs, investment_types=('60m', '4h', '1d')):
+        """Danh sách job (symbol, interval, limit) cần cho các kiểu đầu tư
+        
+        Mỗi (symbol, interval) chỉ xuất hiện một lần với limit lớn nhất cần dùng
+        """
+        limits = {}
+        for pair in pairs:
+            for investment_type in investment_types:
+                config = self.investment_types[investment_type]
+                key = (pair, config['timeframe'])
+                limits[key] = max(limits.get(key, 0), 200)
+                for tf in config['analysis_timeframes']:
+                    key = (pair, tf)
+                    limits[key] = max(limits.get(key, 0), 100)
+        return [(symbol, interval, limit) for (symbol, interval), limit in limits.items()]
+
+    def _pick_resample_base(self, interval, limit):
+        """Chọn base interval nhỏ nhất có thể resample ra `limit` nến interval, None nếu không có"""
+        if not self.resample_enabled:
+            return None
+        
+        step = interval_to_ms(interval)
+        for base in sorted(self.resample_base_intervals, key=interval_to_ms):
+            base_step = interval_to_ms(base)
+            if base == interval:
+                return base if self.resample_base_limit >= limit else None
+            if step % base_step or interval_to_ms('1d') % step:
+                continue
+            # Trừ 1 nến cho bucket đầu có thể bị thiếu
+            if self.resample_base_limit // (step // base_step) - 1 >= limit:
+                return base
+        return None
+
+    def prefetch_klines(self, pairs, investment_types=('60m', '4h', '1d')):
+        """Tải trước toàn bộ klines cần thiết trong một lượt song song
+        
+        Khung lớn được resample từ chuỗi base (vd 15m, 4h); chỉ tải trực tiếp
+        khi lịch sử base không đủ dài
+        """
+        jobs = self.get_investment_type_jobs(pairs, investment_types)
+        
+        plan = {}
+        fetch_jobs = []
+        for symbol, interval, limit in jobs:
+            base = self._pick_resample_base(interval, limit)
+            if base is None:
+                job = (symbol, interval, limit)
+            else:
+                job = (symbol, base, self.resample_base_limit)
+            plan[(symbol, interval)] = (job, limit)
+            fetch_jobs.append(job)
+        
+        frames = self.fetcher.fetch_all(fetch_jobs)
+        
+        result = {}
+        fallback_jobs = []
+        for (symbol, interval), (job, limit) in plan.items():
+            df = frames.get(job)
+            base = job[1]
+            if df is not None and base != interval:
+                df = resample_ohlcv(df, interval, base)
+            
+            if df is not None and len(df) >= limit:
+                result[(symbol, interval)] = df.iloc[-limit:].reset_index(drop=True)
+            elif job[1] != interval:
+                # Lịch sử base quá ngắn (coin mới niêm yết...) -> tải trực tiếp
+                # Giữ chỗ để kết quả vẫn theo thứ tự pairs
+                result[(symbol, interval)] = None
+                fallback_jobs.append((symbol, interval, limit))
+            else:
+                result[(symbol, interval)] = df
+        
+        if fallback_jobs:
+            for (symbol, interval, limit), df in self.fetcher.fetch_all(fallback_jobs).items():
+                result[(symbol, interval)] = df
+        
+        return result
+
+    def create_run_memo(self, pairs, investment_types=('60m', '4h', '1d')):
+        """Tạo memo cho một lượt phân tích với klines đã tải trước, chỉ báo tính sẵn theo panel"""
+        memo = AnalysisRunMemo(self.prefetch_klines(pairs, investment_types))
+        
+        # Khung chính cần đủ chỉ báo; khung chỉ dùng làm khung phụ chỉ cần vài cột
+        main_timeframes = {self.investment_types[t]['timeframe'] for t in investment_types}
+        
+        by_interval = {}
+        for (symbol, interval), df in memo.klines.items():
+            by_interval.setdefault(interval, {})[symbol] = df
+        for interval, frames in by_interval.items():
+            columns = None if interval in main_timeframes else SECONDARY_TIMEFRAME_COLUMNS
+            
+            # Frame đã có trong cache (cùng dữ liệu nến) không cần tính lại
+            results, keys = {}, {}
+            for symbol, df in frames.items():
+                results[symbol], keys[symbol] = self._lookup_indicator_frame(symbol, interval, df, columns)
+            pending = {symbol: df for symbol, df in frames.items() if results[symbol] is None}
+            
+            for symbol, df in self.calculate_panel_indicators(pending, columns, self.indicator_params()).items():
+                if columns is None and self.compact_frames:
+                    df = compact_frame(df)
+                results[symbol] = df
+                if self.indicator_cache is not None:
+                    self.indicator_cache.put(keys[symbol], df)
+            
+            for symbol, df in results.items():
+                if df is None:
+                    continue
+                memo.frames[(symbol, interval)] = df
+                if columns is not None:
+                    memo.partial.add((symbol, interval))
+        return memo
     
-    def calculate_volume_weighted_levels(self, df):
-        """Tính mức hỗ trợ/kháng cự theo volume"""
-        try:
-            # VWAP (Volume Weighted Average Price)
-            df['vwap'] = (df['close'] * df['volume']).cumsum() / df['volume'].cumsum()
-            
-            # Volume-weighted resistance (giá cao với volume cao)
-            df['volume_weighted_high'] = df['high'] * df['volume']
-            df['vw_resistance'] = df['volume_weighted_high'].rolling(window=20).sum() / df['volume'].rolling(window=20).sum()
-            
-            # Volume-weighted support (giá thấp với volume cao)
-            df['volume_weighted_low'] = df['low'] * df['volume']
-            df['vw_support'] = df['volume_weighted_low'].rolling(window=20).sum() / df['volume'].rolling(window=20).sum()
-            
-            return df
-            
-        except Exception as e:
-            # Fallback values
-            df['vwap'] = df['close']
-            df['vw_resistance'] = df['high']
-            df['vw_support'] = df['low']
-            return df
+    def indicator_params(self):
+        """Tham số chỉ báo (RSI, ATR, EMA MACD, Bollinger) của market pattern đang dùng"""
+        return pattern_params(self.market_patterns[self.active_pattern])
     
-    def calculate_fibonacci_levels(self, df):
-        """Tự động tính các mức Fibonacci Retracement"""
-        try:
-            # Tìm high và low trong 50 periods gần nhất
-            recent_high = df['high'].rolling(window=50).max().iloc[-1]
-            recent_low = df['low'].rolling(window=50).min().iloc[-1]
-            
-            if pd.isna(recent_high) or pd.isna(recent_low):
-                df['fib_236'] = df['close']
-                df['fib_382'] = df['close'] 
-                df['fib_500'] = df['close']
-                df['fib_618'] = df['close']
+    def _lookup_indicator_frame(self, symbol, interval, df, columns=None):
+        """Tra cache frame chỉ báo -> (frame hoặc None, key cache)"""
+        if self.indicator_cache is None:
+            return None, None
+        return self.indicator_cache.lookup(symbol, interval, df, columns, self.indicator_params())
+    
+    def _calculate_indicator_frame(self, symbol, interval, df, columns=None):
+        """Tính frame chỉ báo (đầy đủ hoặc chỉ `columns`) cho df nến thô, dùng lại cache nếu có"""
+        cached, key = self._lookup_indicator_frame(symbol, interval, df, columns)
+        if cached is not None:
+            return cached
+        
+        params = self.indicator_params()
+        if columns is None:
+            frame = self.calculate_advanced_indicators(df.copy() if df is not None else None, params)
+            if self.compact_frames:
+                frame = compact_frame(frame)
+        else:
+            frame = self.calculate_indicator_columns(df, columns, params)
+        if self.indicator_cache is not None:
+            self.indicator_cache.put(key, frame)
+        return frame
+    
+    def calculate_panel_indicators(self, frames, columns=None, params=None):
+        """Tính chỉ báo cho nhiều symbol cùng khung trong một lượt vector hóa (symbols x time)
+        
+        frames: {symbol: df}. Symbol có cùng chuỗi nến được xếp chung một panel; kết quả giống
+        calculate_advanced_indicators. Symbol không ghép được (frame ngắn, lệch nến) không có
+        trong kết quả và sẽ được tính riêng khi cần
+        columns: chỉ tính các cột này và phụ thuộc của chúng
+        params: tham số market pattern (mặc định: pattern "default")
+        """
+        result = {}
+        for symbols in panel_indicators.group_aligned(frames):
+            try:
+                panel = panel_indicators.build_panel(frames, symbols)
+                indicators = panel_indicators.compute_panel_indicators(panel, columns, params)
+                result.update(panel_indicators.panel_frames(frames, symbols, indicators))
+            except Exception as e:
+                #print(f"{Fore.RED}❌ Panel indicator error: {e}{Style.RESET_ALL}")
+                continue
+        return result
+
+    def _get_indicator_frame(self, symbol, interval, limit, run_memo=None, columns=None):
+        """Lấy DataFrame đã tính chỉ báo, dùng lại từ run_memo nếu có
+        
+        columns: chỉ cần các cột này - tính lười theo indicator_graph lần đầu được hỏi;
+        None = đầy đủ như calculate_advanced_indicators
+        """
+        if run_memo is None:
+            return self._calculate_indicator_frame(symbol, interval, self.get_kline_data(symbol, interval, limit), columns)
+        
+        key = (symbol, interval)
+        if key in run_memo.frames:
+            df = run_memo.frames[key]
+            if df is None:
+                return None
+            if key not in run_memo.partial:
                 return df
-            
-            # Tính các mức Fibonacci
-            diff = recent_high - recent_low
-            df['fib_236'] = recent_high - (diff * 0.236)
-            df['fib_382'] = recent_high - (diff * 0.382)
-            df['fib_500'] = recent_high - (diff * 0.500)
-            df['fib_618'] = recent_high - (diff * 0.618)
-            
-            return df
-        except Exception:
-            # Fallback values
-            df['fib_236'] = df['close']
-            df['fib_382'] = df['close']
-            df['fib_500'] = df['close'] 
-            df['fib_618'] = df['close']
-            return df
+            if columns is not None:
+                # Frame một phần: chỉ bổ sung các cột còn thiếu
+                if any(col not in df for col in columns):
+                    df = run_memo.frames[key] = self.calculate_indicator_columns(df, columns, self.indicator_params())
+                return df
+        
+        if key in run_memo.klines:
+            df = run_memo.klines[key]
+        else:
+            df = self.get_kline_data(symbol, interval, limit)
+        
+        run_memo.frames[key] = self._calculate_indicator_frame(symbol, interval, df, columns)
+        if columns is None:
+            run_memo.partial.discard(key)
+        else:
+            run_memo.partial.add(key)
+        return run_memo.frames[key]
     
-    def detect_candlestick_patterns(self, df):
-        """Phát hiện các mô hình nến quan trọng"""
+    def calculate_indicator_columns(self, df, columns, params=None):
+        """Chỉ tính các cột chỉ báo cần dùng và phụ thuộc của chúng (cùng công thức với
+        calculate_advanced_indicators), trả về bản sao df có thêm các cột đó
+        
+        params: tham số market pattern (mặc định: pattern "default")
+        """
+        if df is None or len(df) < 50:
+            return None
+        
         try:
-            # Bullish patterns
-            df['hammer'] = is_hammer(df['open'], df['high'], df['low'], df['close'])
-            df['engulfing_bullish'] = is_engulfing_bullish(df['open'], df['high'], df['low'], df['close'])
-            df['morning_star'] = is_morning_star(df['open'], df['high'], df['low'], df['close'])
-            
-            # Bearish patterns  
-            df['hanging_man'] = is_hanging_man(df['open'], df['high'], df['low'], df['close'])
-            df['evening_star'] = is_evening_star(df['open'], df['high'], df['low'], df['close'])
+            computed = indicator_graph.evaluate(df, columns, params)
+            if not computed:
+                return df
+            return pd.concat([df, pd.DataFrame(computed, index=df.index)], axis=1)
+        except Exception as e:
+            #print(f"{Fore.RED}❌ Indicator calculation error: {e}{Style.RESET_ALL}")
+            return None
+    
+    def calculate_advanced_indicators(self, df, params=None):
+        """Tính toán các chỉ báo kỹ thuật nâng cao
+        
+        Công thức nằm ở indicator_graph (dùng chung với calculate_indicator_columns và panel);
+        mọi cột được tính lại từ các cột nến, cột chỉ báo cũ trong df bị thay thế
+        params: tham số market pattern (mặc định: pattern "default", xem indicator_params)
+        """
+        if df is None or len(df) < 50:
+            return None
             
-            # Reversal patterns
-            df['doji'] = is_doji(df['open'], df['high'], df['low'], df['close'])
+        try:
+            computed = indicator_graph.evaluate(df[list(indicator_graph.CANDLE_COLUMNS)], params=params)
+            df = df.drop(columns=[col for col in computed if col in df])
+            return pd.concat([df, pd.DataFrame(computed, index=df.index)], axis=1)
             
-            return df
-        except Exception:
-            # Fallback - set all pattern columns to 0
-            pattern_cols = ['hammer', 'engulfing_bullish', 'morning_star', 'hanging_man', 'evening_star', 'doji']
-            for col in pattern_cols:
-                df[col] = 0
-            return df
-    
+        except Exception as e:
+            #print(f"{Fore.RED}❌ Indicator calculation error: {e}{Style.RESET_ALL}")
+            return None
 
-    def calculate_tp_sl_by_investment_type(self, entry_price, signal_type, atr_value, trend_strength, investment_type='60m', df_main=None):
-        """Tính toán TP/SL theo kiểu đầu tư với kháng cự, hỗ trợ và các chỉ số kỹ thuật chính xác hơn"""
+    def get_fibonacci_levels(self, df, latest=None):
+        """Các mức Fibonacci của frame: từ df.attrs với frame compact, nếu không thì từ nến cuối"""
+        levels = df.attrs.get('fibonacci')
+        if levels is not None:
+            return levels
+        if latest is None:
+            latest = frame_row(df, -1)
+        return {col: latest[col] for col in FIB_COLUMNS}
+    
+    def get_price_levels(self, df, latest=None):
+        """Index các mức hỗ trợ/kháng cự của nến cuối (dựng một lần, dùng cho nhiều giá entry)"""
+        if latest is None:
+            latest = frame_row(df, -1)
+        return PriceLevelIndex.from_row(latest, self.get_fibonacci_levels(df, latest))
+    
+    def calculate_tp_sl_by_investment_type(self, entry_price, signal_type, atr_value, trend_strength, investment_type='60m', df_main=None, levels=None):
+        """Tính toán TP/SL theo kiểu đầu tư với kháng cự, hỗ trợ và các chỉ số kỹ thuật chính xác hơn
+        
+        levels: PriceLevelIndex của df_main đã dựng sẵn (khi tính cho nhiều giá entry)
+        """
         
         # Base multipliers được điều chỉnh nhỏ hơn để gần thực tế hơn
         if investment_type == '60m':
@@ -824,34 +892,17 @@ class EnhancedCryptoPredictionAppV2:
         max_loss_pct = 0.015 if investment_type == '60m' else 0.025 if investment_type == '4h' else 0.04
         
         if df_main is not None and len(df_main) > 0 and signal_type == 'BUY':
-            latest = df_main.iloc[-1]
+            latest = frame_row(df_main, -1)
+            fib = self.get_fibonacci_levels(df_main, latest)
+            
+            if levels is None:
+                levels = self.get_price_levels(df_main, latest)
             
             # 1. MULTI-LEVEL RESISTANCE-BASED TP ADJUSTMENT (Chính xác hơn)
-            resistance_levels = []
-            
-            # Collect different resistance levels
-            if not pd.isna(latest['resistance']):
-                resistance_levels.append(('traditional', latest['resistance']))
-            if not pd.isna(latest['resistance_weak']):
-                resistance_levels.append(('weak', latest['resistance_weak']))
-            if not pd.isna(latest['resistance_strong']):
-                resistance_levels.append(('strong', latest['resistance_strong']))
-            if not pd.isna(latest['r1']):
-                resistance_levels.append(('pivot_r1', latest['r1']))
-            if not pd.isna(latest['r2']):
-                resistance_levels.append(('pivot_r2', latest['r2']))
-            if not pd.isna(latest['vw_resistance']):
-                resistance_levels.append(('volume_weighted', latest['vw_resistance']))
-            if not pd.isna(latest['ema_resistance']):
-                resistance_levels.append(('ema', latest['ema_resistance']))
-            
-            # Filter resistance levels above entry price
-            valid_resistances = [(name, level) for name, level in resistance_levels if level > entry_price * 1.005]
+            # Hai mức kháng cự gần nhất trên entry price
+            valid_resistances = levels.above(entry_price * 1.005, 2, RESISTANCE_SOURCES)
             
             if valid_resistances:
-                # Sort by distance from entry price
-                valid_resistances.sort(key=lambda x: x[1])
-                
                 # TP1: Target first significant resistance (75% of distance)
                 first_resistance = valid_resistances[0][1]
                 resistance_distance = first_resistance - entry_price
@@ -871,11 +922,7 @@ class EnhancedCryptoPredictionAppV2:
                     base_tp2 = min(base_tp2, resistance_tp2)
                 
                 # Check for resistance cluster (multiple resistances within 2%)
-                resistance_prices = [level for name, level in valid_resistances]
-                cluster_count = 0
-                for i, price in enumerate(resistance_prices):
-                    if price <= first_resistance * 1.02:  # Within 2% of first resistance
-                        cluster_count += 1
+                cluster_count = levels.count_within(first_resistance, first_resistance * 1.02, RESISTANCE_SOURCES)
                 
                 # If there's a resistance cluster, be more conservative
                 if cluster_count >= 3:
@@ -883,33 +930,10 @@ class EnhancedCryptoPredictionAppV2:
                     base_tp2 *= 0.9   # Reduce TP2 by 10%
             
             # 2. MULTI-LEVEL SUPPORT-BASED SL ADJUSTMENT (Chính xác hơn)
-            support_levels = []
-            
-            # Collect different support levels
-            if not pd.isna(latest['support']):
-                support_levels.append(('traditional', latest['support']))
-            if not pd.isna(latest['support_weak']):
-                support_levels.append(('weak', latest['support_weak']))
-            if not pd.isna(latest['support_strong']):
-                support_levels.append(('strong', latest['support_strong']))
-            if not pd.isna(latest['s1']):
-                support_levels.append(('pivot_s1', latest['s1']))
-            if not pd.isna(latest['s2']):
-                support_levels.append(('pivot_s2', latest['s2']))
-            if not pd.isna(latest['vw_support']):
-                support_levels.append(('volume_weighted', latest['vw_support']))
-            if not pd.isna(latest['ema_support']):
-                support_levels.append(('ema', latest['ema_support']))
-            if not pd.isna(latest['vwap']):
-                support_levels.append(('vwap', latest['vwap']))
-            
-            # Filter support levels below entry price
-            valid_supports = [(name, level) for name, level in support_levels if level < entry_price * 0.995]
+            # Mức hỗ trợ gần nhất dưới entry price (kể cả VWAP)
+            valid_supports = levels.below(entry_price * 0.995, 1, SUPPORT_SOURCES + ('vwap',))
             
             if valid_supports:
-                # Sort by distance from entry price (closest first)
-                valid_supports.sort(key=lambda x: x[1], reverse=True)
-                
                 # Use strongest support that's not too far
                 strongest_support = valid_supports[0][1]
                 
@@ -921,15 +945,15 @@ class EnhancedCryptoPredictionAppV2:
                     base_sl = max(base_sl, support_sl)
             
             # 3. FIBONACCI RETRACEMENT ADJUSTMENT
-            if not pd.isna(latest['fib_236']) and not pd.isna(latest['fib_618']):
+            if not pd.isna(fib['fib_236']) and not pd.isna(fib['fib_618']):
                 # TP1 tại Fibonacci 38.2% hoặc 50%
-                if not pd.isna(latest['fib_382']) and latest['fib_382'] > entry_price:
-                    fib_tp1 = latest['fib_382']
+                if not pd.isna(fib['fib_382']) and fib['fib_382'] > entry_price:
+                    fib_tp1 = fib['fib_382']
                     base_tp1 = min(base_tp1, fib_tp1)
                 
                 # TP2 tại Fibonacci 61.8% hoặc extension
-                if latest['fib_618'] > entry_price:
-                    fib_tp2 = latest['fib_618']
+                if fib['fib_618'] > entry_price:
+                    fib_tp2 = fib['fib_618']
                     base_tp2 = min(base_tp2, fib_tp2)
             
             # 4. BOLLINGER BANDS ADJUSTMENT
@@ -1017,8 +1041,11 @@ class EnhancedCryptoPredictionAppV2:
         
         return round(tp1, 6), round(tp2, 6), round(stop_loss, 6)
 
-    def calculate_tp_sl_for_sell_signal(self, entry_price, atr_value, trend_strength, investment_type='60m', df_main=None):
-        """Tính toán TP/SL cho tín hiệu SELL với kháng cự, hỗ trợ và các chỉ số kỹ thuật chính xác"""
+    def calculate_tp_sl_for_sell_signal(self, entry_price, atr_value, trend_strength, investment_type='60m', df_main=None, levels=None):
+        """Tính toán TP/SL cho tín hiệu SELL với kháng cự, hỗ trợ và các chỉ số kỹ thuật chính xác
+        
+        levels: PriceLevelIndex của df_main đã dựng sẵn (khi tính cho nhiều giá entry)
+        """
         
         # Base multipliers được điều chỉnh cho SELL (ngược lại với BUY)
         if investment_type == '60m':
@@ -1056,34 +1083,17 @@ class EnhancedCryptoPredictionAppV2:
         max_loss_pct = 0.015 if investment_type == '60m' else 0.025 if investment_type == '4h' else 0.04
         
         if df_main is not None and len(df_main) > 0:
-            latest = df_main.iloc[-1]
+            latest = frame_row(df_main, -1)
+            fib = self.get_fibonacci_levels(df_main, latest)
+            
+            if levels is None:
+                levels = self.get_price_levels(df_main, latest)
             
             # 1. MULTI-LEVEL SUPPORT-BASED TP ADJUSTMENT cho SELL
-            support_levels = []
-            
-            # Collect different support levels
-            if not pd.isna(latest['support']):
-                support_levels.append(('traditional', latest['support']))
-            if not pd.isna(latest['support_weak']):
-                support_levels.append(('weak', latest['support_weak']))
-            if not pd.isna(latest['support_strong']):
-                support_levels.append(('strong', latest['support_strong']))
-            if not pd.isna(latest['s1']):
-                support_levels.append(('pivot_s1', latest['s1']))
-            if not pd.isna(latest['s2']):
-                support_levels.append(('pivot_s2', latest['s2']))
-            if not pd.isna(latest['vw_support']):
-                support_levels.append(('volume_weighted', latest['vw_support']))
-            if not pd.isna(latest['ema_support']):
-                support_levels.append(('ema', latest['ema_support']))
-            
-            # Filter support levels below entry price
-            valid_supports = [(name, level) for name, level in support_levels if level < entry_price * 0.995]
+            # Hai mức hỗ trợ gần nhất dưới entry price
+            valid_supports = levels.below(entry_price * 0.995, 2, SUPPORT_SOURCES)
             
             if valid_supports:
-                # Sort by distance from entry price (closest first)
-                valid_supports.sort(key=lambda x: x[1], reverse=True)
-                
                 # TP1: Target first significant support (75% of distance)
                 first_support = valid_supports[0][1]
                 support_distance = entry_price - first_support
@@ -1103,11 +1113,7 @@ class EnhancedCryptoPredictionAppV2:
                     base_tp2 = max(base_tp2, support_tp2)
                 
                 # Check for support cluster (multiple supports within 2%)
-                support_prices = [level for name, level in valid_supports]
-                cluster_count = 0
-                for i, price in enumerate(support_prices):
-                    if price >= first_support * 0.98:  # Within 2% of first support
-                        cluster_count += 1
+                cluster_count = levels.count_within(first_support * 0.98, first_support, SUPPORT_SOURCES)
                 
                 # If there's a support cluster, be more conservative
                 if cluster_count >= 3:
@@ -1115,33 +1121,10 @@ class EnhancedCryptoPredictionAppV2:
                     base_tp2 *= 0.9   # Reduce TP2 by 10%
             
             # 2. MULTI-LEVEL RESISTANCE-BASED SL ADJUSTMENT cho SELL
-            resistance_levels = []
-            
-            # Collect different resistance levels
-            if not pd.isna(latest['resistance']):
-                resistance_levels.append(('traditional', latest['resistance']))
-            if not pd.isna(latest['resistance_weak']):
-                resistance_levels.append(('weak', latest['resistance_weak']))
-            if not pd.isna(latest['resistance_strong']):
-                resistance_levels.append(('strong', latest['resistance_strong']))
-            if not pd.isna(latest['r1']):
-                resistance_levels.append(('pivot_r1', latest['r1']))
-            if not pd.isna(latest['r2']):
-                resistance_levels.append(('pivot_r2', latest['r2']))
-            if not pd.isna(latest['vw_resistance']):
-                resistance_levels.append(('volume_weighted', latest['vw_resistance']))
-            if not pd.isna(latest['ema_resistance']):
-                resistance_levels.append(('ema', latest['ema_resistance']))
-            if not pd.isna(latest['vwap']):
-                resistance_levels.append(('vwap', latest['vwap']))
-            
-            # Filter resistance levels above entry price
-            valid_resistances = [(name, level) for name, level in resistance_levels if level > entry_price * 1.005]
+            # Mức kháng cự gần nhất trên entry price (kể cả VWAP)
+            valid_resistances = levels.above(entry_price * 1.005, 1, RESISTANCE_SOURCES + ('vwap',))
             
             if valid_resistances:
-                # Sort by distance from entry price (closest first)
-                valid_resistances.sort(key=lambda x: x[1])
-                
                 # Use closest resistance that's not too far
                 closest_resistance = valid_resistances[0][1]
                 
@@ -1153,15 +1136,15 @@ class EnhancedCryptoPredictionAppV2:
                     base_sl = min(base_sl, resistance_sl)
             
             # 3. FIBONACCI RETRACEMENT ADJUSTMENT cho SELL
-            if not pd.isna(latest['fib_236']) and not pd.isna(latest['fib_618']):
+            if not pd.isna(fib['fib_236']) and not pd.isna(fib['fib_618']):
                 # TP1 tại Fibonacci 38.2% hoặc 50% (support levels)
-                if not pd.isna(latest['fib_382']) and latest['fib_382'] < entry_price:
-                    fib_tp1 = latest['fib_382']
+                if not pd.isna(fib['fib_382']) and fib['fib_382'] < entry_price:
+                    fib_tp1 = fib['fib_382']
                     base_tp1 = max(base_tp1, fib_tp1)
                 
                 # TP2 tại Fibonacci 61.8% hoặc extension
-                if latest['fib_618'] < entry_price:
-                    fib_tp2 = latest['fib_618']
+                if fib['fib_618'] < entry_price:
+                    fib_tp2 = fib['fib_618']
                     base_tp2 = max(base_tp2, fib_tp2)
             
             # 4. BOLLINGER BANDS ADJUSTMENT cho SELL
@@ -1253,14 +1236,27 @@ class EnhancedCryptoPredictionAppV2:
         """Tính toán TP/SL cho SPOT TRADING (chỉ BUY) - backward compatibility với enhanced features"""
         return self.calculate_tp_sl_by_investment_type(entry_price, signal_type, atr_value, trend_strength, '60m', df_main)
     
+    def calculate_signal_score_history(self, df):
+        """calculate_enhanced_signal_score cho mọi nến của df trong một lượt vector hóa
+        
+        Trả về (buy_scores, sell_scores, signal_words): mảng theo từng nến; giá trị ở nến cuối
+        giống hệt calculate_enhanced_signal_score(df). signal_scoring.signal_dict(signal_words[i])
+        đổi bitmask của nến i thành dict signals
+        """
+        if df is None or len(df) < 3:
+            n = 0 if df is None else len(df)
+            return np.zeros(n), np.zeros(n), np.zeros((n, signal_scoring.SIGNAL_WORDS), dtype=np.uint64)
+        return signal_scoring.score_history(df)
+    
     def calculate_enhanced_signal_score(self, df):
         """Tính điểm tín hiệu nâng cao với trọng số thông minh - OPTIMIZED theo gợi ý"""
         if df is None or len(df) < 3:
             return 0, 0, {}
             
-        latest = df.iloc[-1]
-        prev = df.iloc[-2]
-        prev2 = df.iloc[-3]
+        latest = frame_row(df, -1)
+        prev = frame_row(df, -2)
+        prev2 = frame_row(df, -3)
+        fib = self.get_fibonacci_levels(df, latest)
         
         buy_score = 0
         sell_score = 0
@@ -1555,15 +1551,15 @@ class EnhancedCryptoPredictionAppV2:
         # === 7. FIBONACCI RETRACEMENT ANALYSIS ===
         fibonacci_signal_strength = 0
         
-        if (not pd.isna(latest['fib_236']) and not pd.isna(latest['fib_382']) and 
-            not pd.isna(latest['fib_500']) and not pd.isna(latest['fib_618'])):
+        if (not pd.isna(fib['fib_236']) and not pd.isna(fib['fib_382']) and 
+            not pd.isna(fib['fib_500']) and not pd.isna(fib['fib_618'])):
             
             current_price = latest['close']
             fib_levels = [
-                ('23.6%', latest['fib_236']),
-                ('38.2%', latest['fib_382']),
-                ('50.0%', latest['fib_500']),
-                ('61.8%', latest['fib_618'])
+                ('23.6%', fib['fib_236']),
+                ('38.2%', fib['fib_382']),
+                ('50.0%', fib['fib_500']),
+                ('61.8%', fib['fib_618'])
             ]
             
             # Check if price is near any Fibonacci level
@@ -1596,10 +1592,12 @@ class EnhancedCryptoPredictionAppV2:
         # === 8. ENHANCED CANDLESTICK PATTERN ANALYSIS ===
         candlestick_signal_strength = 0
         
+        candle_patterns = int(latest['candle_patterns']) if 'candle_patterns' in latest else 0
+        
         # Bullish patterns với context
         bullish_patterns = ['hammer', 'engulfing_bullish', 'morning_star']
         for pattern in bullish_patterns:
-            if pattern in latest and latest[pattern] > 0:
+            if candlestick_patterns.has_pattern(candle_patterns, pattern):
                 # Pattern strength dựa trên vị trí và volume
                 pattern_strength = 2.5
                 
@@ -1625,7 +1623,7 @@ class EnhancedCryptoPredictionAppV2:
         candlestick_signal_strength = 0
         
         for pattern in bearish_patterns:
-            if pattern in latest and latest[pattern] < 0:  # Bearish patterns are negative
+            if candlestick_patterns.has_pattern(candle_patterns, pattern):
                 pattern_strength = 2.5
                 
                 # Bonus nếu pattern xuất hiện ở resistance level
@@ -1645,7 +1643,7 @@ class EnhancedCryptoPredictionAppV2:
             sell_score += candlestick_signal_strength
         
         # Doji indecision penalty
-        if 'doji' in latest and latest['doji'] != 0:
+        if candlestick_patterns.has_pattern(candle_patterns, 'doji'):
             buy_score *= 0.7
             sell_score *= 0.7
             signals['doji_indecision'] = True
@@ -1778,9 +1776,9 @@ class EnhancedCryptoPredictionAppV2:
         fib_support_bounce = False
         fib_resistance_reject = False
         
-        if not pd.isna(latest['fib_382']) and not pd.isna(latest['fib_618']):
+        if not pd.isna(fib['fib_382']) and not pd.isna(fib['fib_618']):
             # Price near Fibonacci support levels
-            fib_levels = [latest['fib_236'], latest['fib_382'], latest['fib_500'], latest['fib_618']]
+            fib_levels = [fib['fib_236'], fib['fib_382'], fib['fib_500'], fib['fib_618']]
             for fib_level in fib_levels:
                 if abs(latest['close'] - fib_level) / latest['close'] < 0.01:  # Within 1%
                     if latest['close'] > prev['close']:  # Bouncing from support
@@ -1807,18 +1805,20 @@ class EnhancedCryptoPredictionAppV2:
         
         # === 5. CANDLESTICK PATTERNS ===
         
+        candle_patterns = int(latest['candle_patterns']) if 'candle_patterns' in latest else 0
+        
         # Bullish patterns
-        if latest['hammer'] > 0 or latest['engulfing_bullish'] > 0 or latest['morning_star'] > 0:
+        if candle_patterns & candlestick_patterns.pattern_mask('hammer', 'engulfing_bullish', 'morning_star'):
             buy_score += 2 * adx_strength
             signals['bullish_candlestick'] = True
         
         # Bearish patterns
-        if latest['hanging_man'] < 0 or latest['evening_star'] < 0:
+        if candle_patterns & candlestick_patterns.pattern_mask('hanging_man', 'evening_star'):
             sell_score += 2 * adx_strength
             signals['bearish_candlestick'] = True
         
         # Doji (indecision - reduce both scores)
-        if latest['doji'] != 0:
+        if candlestick_patterns.has_pattern(candle_patterns, 'doji'):
             buy_score *= 0.8
             sell_score *= 0.8
             signals['doji_indecision'] = True
@@ -1943,7 +1943,7 @@ class EnhancedCryptoPredictionAppV2:
         confirmation_bonus = 0
         
         if df_main is not None and len(df_main) > 0:
-            latest = df_main.iloc[-1]
+            latest = frame_row(df_main, -1)
             
             # ADX confirmation (xu hướng mạnh) - CHỈ CHO BUY
             if not pd.isna(latest['ADX']) and latest['ADX'] > 25:
@@ -2022,7 +2022,7 @@ class EnhancedCryptoPredictionAppV2:
         
         # Sideway market penalty
         if df_main is not None and len(df_main) > 0:
-            latest = df_main.iloc[-1]
+            latest = frame_row(df_main, -1)
             if not pd.isna(latest['BB_width']) and not pd.isna(latest['BB_width_sma']):
                 if latest['BB_width'] < latest['BB_width_sma'] * 0.7:  # Very narrow range
                     risk_penalty += 0.15
@@ -2041,18 +2041,17 @@ class EnhancedCryptoPredictionAppV2:
         
         return final_prob, signal_type, trend_strength
     
-    def analyze_single_pair_by_investment_type(self, symbol, investment_type='60m'):
-        """Phân tích một cặp coin theo kiểu đầu tư"""
+    def analyze_single_pair_by_investment_type(self, symbol, investment_type='60m', run_memo=None):
+        """Phân tích một cặp coin theo kiểu đầu tư
+        
+        run_memo: AnalysisRunMemo dùng chung giữa các kiểu đầu tư trong cùng một lượt (tùy chọn)
+        """
         investment_config = self.investment_types[investment_type]
         main_timeframe = investment_config['timeframe']
         analysis_timeframes = investment_config['analysis_timeframes']
         
         # Lấy dữ liệu khung thời gian chính
-        df_main = self.get_kline_data(symbol, main_timeframe, 200)
-        if df_main is None:
-            return None
-        
-        df_main = self.calculate_advanced_indicators(df_main)
+        df_main = self._get_indicator_frame(symbol, main_timeframe, 200, run_memo)
         if df_main is None:
             return None
         
@@ -2065,50 +2064,46 @@ class EnhancedCryptoPredictionAppV2:
         volume_analysis = {}
         
         for tf in analysis_timeframes:
-            df = self.get_kline_data(symbol, tf, 100)
-            if df is not None:
-                df = self.calculate_advanced_indicators(df)
-                if df is not None and len(df) > 0:
-                    latest = df.iloc[-1]
-                    prev = df.iloc[-2] if len(df) > 1 else latest
-                    
-                    # Phân tích xu hướng giá
-                    if not pd.isna(latest['EMA_10']) and not pd.isna(latest['EMA_20']):
-                        if latest['EMA_10'] > latest['EMA_20'] and latest['close'] > latest['EMA_10']:
-                            price_trend = 'UPTREND'
-                        elif latest['EMA_10'] < latest['EMA_20'] and latest['close'] < latest['EMA_10']:
-                            price_trend = 'DOWNTREND'
-                        else:
-                            price_trend = 'SIDEWAYS'
+            df = self._get_indicator_frame(symbol, tf, 100, run_memo, SECONDARY_TIMEFRAME_COLUMNS)
+            if df is not None and len(df) > 0:
+                latest = df.iloc[-1]
+                prev = df.iloc[-2] if len(df) > 1 else latest
+                
+                # Phân tích xu hướng giá
+                if not pd.isna(latest['EMA_10']) and not pd.isna(latest['EMA_20']):
+                    if latest['EMA_10'] > latest['EMA_20'] and latest['close'] > latest['EMA_10']:
+                        price_trend = 'UPTREND'
+                    elif latest['EMA_10'] < latest['EMA_20'] and latest['close'] < latest['EMA_10']:
+                        price_trend = 'DOWNTREND'
                     else:
-                        price_trend = 'UNKNOWN'
-                    
-                    trends[tf] = price_trend
+                        price_trend = 'SIDEWAYS'
+                else:
+                    price_trend = 'UNKNOWN'
+                
+                trends[tf] = price_trend
+                
+                # Phân tích volume
+                if not pd.isna(latest['volume_ratio']):
+                    if latest['volume_ratio'] > 2.0:
+                        volume_trend = 'HIGH'
+                    elif latest['volume_ratio'] > 1.5:
+                        volume_trend = 'ELEVATED'
+                    elif latest['volume_ratio'] > 0.8:
+                        volume_trend = 'NORMAL'
+                    else:
+                        volume_trend = 'LOW'
                     
-                    # Phân tích volume
-                    if not pd.isna(latest['volume_ratio']):
-                        if latest['volume_ratio'] > 2.0:
-                            volume_trend = 'HIGH'
-                        elif latest['volume_ratio'] > 1.5:
-                            volume_trend = 'ELEVATED'
-                        elif latest['volume_ratio'] > 0.8:
-                            volume_trend = 'NORMAL'
-                        else:
-                            volume_trend = 'LOW'
-                        
-                        price_change = ((latest['close'] - prev['close']) / prev['close']) * 100
-                        volume_analysis[tf] = {
-                            'trend': volume_trend,
-                            'ratio': latest['volume_ratio'],
-                            'price_change': price_change
-                        }
-            
-            time.sleep(0.5)  # Rate limit
+                    price_change = ((latest['close'] - prev['close']) / prev['close']) * 100
+                    volume_analysis[tf] = {
+                        'trend': volume_trend,
+                        'ratio': float(latest['volume_ratio']),
+                        'price_change': price_change
+                    }
         
         # Tính điểm tín hiệu nâng cao
         buy_score, sell_score, signals = self.calculate_enhanced_signal_score(df_main)
         
-        latest = df_main.iloc[-1]
+        latest = frame_row(df_main, -1)
         
         # Dự đoán xác suất thành công với weighted multi-timeframe analysis
         success_prob, signal_type, trend_strength = self.predict_enhanced_probability(
@@ -2124,6 +2119,7 @@ class EnhancedCryptoPredictionAppV2:
             tp1, tp2, stop_loss = self.calculate_tp_sl_by_investment_type(
                 entry_price, signal_type, latest['ATR'], trend_strength, investment_type, df_main
             )
+            tp1, tp2, stop_loss = self.round_to_tick(symbol, tp1, tp2, stop_loss)
             # Risk/Reward ratio cho BUY
             rr_ratio = (tp1 - entry_price) / (entry_price - stop_loss) if stop_loss < entry_price else 0
         else:  # WAIT - không có SELL trong spot trading
@@ -2131,6 +2127,7 @@ class EnhancedCryptoPredictionAppV2:
             tp1 = entry_price * 1.005  # Minimal target
             tp2 = entry_price * 1.01
             stop_loss = entry_price * 0.995
+            tp1, tp2, stop_loss = self.round_to_tick(symbol, tp1, tp2, stop_loss)
             rr_ratio = 0
         
         result = {
@@ -2150,7 +2147,7 @@ class EnhancedCryptoPredictionAppV2:
             'tp2': tp2,
             'stop_loss': stop_loss,
             'rr_ratio': rr_ratio,
-            'rsi': latest['RSI'],
+            'rsi': float(latest['RSI']),
             'atr': latest['ATR'],
             'signals': signals,
             'entry_quality': 'HIGH' if success_prob > 0.75 else 'MEDIUM' if success_prob > 0.6 else 'LOW',
@@ -2184,7 +2181,7 @@ class EnhancedCryptoPredictionAppV2:
         if df_15m is None:
             return None
         
-        df_15m = self.calculate_advanced_indicators(df_15m)
+        df_15m = self.calculate_advanced_indicators(df_15m, self.indicator_params())
         if df_15m is None:
             return None
         
@@ -2200,7 +2197,7 @@ class EnhancedCryptoPredictionAppV2:
         for tf in timeframes:
             df = self.get_kline_data(symbol, tf, 100)
             if df is not None:
-                df = self.calculate_advanced_indicators(df)
+                df = self.calculate_advanced_indicators(df, self.indicator_params())
                 if df is not None and len(df) > 0:
                     latest = df.iloc[-1]
                     prev = df.iloc[-2] if len(df) > 1 else latest
@@ -2249,8 +2246,6 @@ class EnhancedCryptoPredictionAppV2:
                         'strength': volume_strength,
                         'price_change': price_change
                     }
-            
-            time.sleep(0.5)  # Rate limit
         
         # Tính điểm tín hiệu nâng cao
         buy_score, sell_score, signals = self.calculate_enhanced_signal_score(df_15m)
@@ -2291,7 +2286,7 @@ class EnhancedCryptoPredictionAppV2:
             'tp2': tp2,
             'stop_loss': stop_loss,
             'rr_ratio': rr_ratio,
-            'rsi': latest['RSI'],
+            'rsi': float(latest['RSI']),
             'atr': latest['ATR'],
             'signals': signals,
             'entry_quality': 'HIGH' if success_prob > 0.75 else 'MEDIUM' if success_prob > 0.6 else 'LOW',
@@ -2330,15 +2325,17 @@ class EnhancedCryptoPredictionAppV2:
         #print(f"\n{Fore.YELLOW}{Style.BRIGHT}🎯 GỢI Ý COIN TỐT NHẤT CHO TỪNG KHUNG THỜI GIAN{Style.RESET_ALL}")
         #print("=" * 70)
         
+        # Tải trước toàn bộ klines (song song), mỗi (symbol, interval) một lần cho cả 3 kiểu đầu tư
+        run_memo = self.create_run_memo(pairs_to_analyze)
+        
         for investment_type in ['60m', '4h', '1d']:
             results = []
             
             for pair in pairs_to_analyze:
                 try:
-                    result = self.analyze_single_pair_by_investment_type(pair, investment_type)
+                    result = self.analyze_single_pair_by_investment_type(pair, investment_type, run_memo)
                     if result:
                         results.append(result)
-                    time.sleep(1)  # Rate limit protection
                 except Exception as e:
                     print(f"{Fore.RED}❌ Error analyzing {pair} for {investment_type}: {e}{Style.RESET_ALL}")
             
@@ -2371,7 +2368,6 @@ class EnhancedCryptoPredictionAppV2:
                 result = self.analyze_single_pair_enhanced(pair)
                 if result:
                     results.append(result)
-                time.sleep(1)  # Rate limit protection
             except Exception as e:
                 print(f"{Fore.RED}❌ Error analyzing {pair}: {e}{Style.RESET_ALL}")
         
@@ -2421,9 +2417,36 @@ class EnhancedCryptoPredictionAppV2:
             'success_boost': pattern['success_boost']
         }
 
-    def run_backtest(self, symbol, timeframe='4h', days_back=30, pattern_name=None):
+    def calculate_pattern_indicators(self, df):
+        """RSI/ATR/EMA/Bollinger theo tham số của mọi market pattern, tính chung một lượt
+        
+        Trả về PatternIndicatorSet; .view(pattern_name) lấy chỉ báo của từng pattern
+        """
+        return PatternIndicatorSet(df['high'], df['low'], df['close'], self.market_patterns)
+
+    def run_pattern_comparison(self, symbol, timeframe='4h', days_back=30, pattern_names=None):
+        """Backtest nhiều pattern trên cùng dữ liệu: tải nến và tính chỉ báo một lần cho mọi pattern"""
+        pattern_names = pattern_names or list(self.market_patterns)
+        limit = self._calculate_limit_for_timeframe(timeframe, days_back)
+        df = self.get_history_data(symbol, timeframe, limit)
+        data = None
+        if df is not None and len(df) >= 50:
+            try:
+                data = (df, self.calculate_pattern_indicators(df))
+            except Exception:
+                data = None
+        
+        results = {}
+        for pattern_name in pattern_names:
+            result = self.run_backtest(symbol, timeframe, days_back, pattern_name, data=data)
+            if result:
+                results[pattern_name] = result
+        return results
+
+    def run_backtest(self, symbol, timeframe='4h', days_back=30, pattern_name=None, data=None):
         """
         Chạy backtest thực sự với dữ liệu lịch sử và pattern cụ thể
+        data: (df, PatternIndicatorSet) đã chuẩn bị sẵn để dùng chung giữa các pattern
         """
         try:
             # Thiết lập pattern nếu được chỉ định
@@ -2439,18 +2462,28 @@ class EnhancedCryptoPredictionAppV2:
             #print("=" * 70)
             
             # Lấy dữ liệu lịch sử thực
-            limit = self._calculate_limit_for_timeframe(timeframe, days_back)
-            df = self.get_kline_data(symbol, timeframe, limit)
+            if data is not None:
+                df, indicators = data
+            else:
+                limit = self._calculate_limit_for_timeframe(timeframe, days_back)
+                df = self.get_history_data(symbol, timeframe, limit)
+                indicators = None
             
             if df is None or len(df) < 50:
                 #print(f"{Fore.RED}❌ Không đủ dữ liệu cho backtest{Style.RESET_ALL}")
                 return None
             
-            # Tính indicators dựa trên pattern
-            df['ema_fast'] = calculate_ema(df['close'], pattern['ema_fast'])
-            df['ema_slow'] = calculate_ema(df['close'], pattern['ema_slow'])
-            df['rsi'] = calculate_rsi(df['close'], 14)
-            df['atr'] = self._calculate_atr(df, 14)
+            # Tính indicators dựa trên pattern (rsi_period, atr_period, ema_fast, ema_slow)
+            if indicators is None:
+                indicators = self.calculate_pattern_indicators(df)
+            view = indicators.view(self.active_pattern)
+            df = df.assign(ema_fast=view['ema_fast'], ema_slow=view['ema_slow'],
+                           rsi=view['RSI'], atr=view['ATR'])
+            
+            # Các rolling series không đổi trong vòng lặp -> tính một lần
+            volume_sma_20 = df['volume'].rolling(20).mean()
+            atr_sma_20 = df['atr'].rolling(20).mean()
+            high_20 = pd.Series(indicator_kernels.rolling_max(df['high'].to_numpy(), 20), index=df.index)
             
             # Tạo signals dựa trên pattern
             signals = []
@@ -2464,7 +2497,7 @@ class EnhancedCryptoPredictionAppV2:
                 # Điều kiện cơ bản cho BUY signal
                 ema_signal = current['ema_fast'] > current['ema_slow']
                 rsi_signal = pattern['rsi_oversold'] < current['rsi'] < pattern['rsi_overbought']
-                volume_signal = current['volume'] > df['volume'].rolling(20).mean().iloc[i] * pattern['volume_multiplier']
+                volume_signal = current['volume'] > volume_sma_20.iloc[i] * pattern['volume_multiplier']
                 
                 # Tạo signal dựa trên pattern cụ thể
                 if pattern_name == "bull_market":
@@ -2474,13 +2507,12 @@ class EnhancedCryptoPredictionAppV2:
                 elif pattern_name == "sideways":
                     signal_created = abs(current['ema_fast'] - current['ema_slow']) < current['close'] * 0.01 and rsi_signal
                 elif pattern_name == "high_volatility":
-                    signal_created = ema_signal and current['atr'] > df['atr'].rolling(20).mean().iloc[i] * 1.5
+                    signal_created = ema_signal and current['atr'] > atr_sma_20.iloc[i] * 1.5
                 elif pattern_name == "low_volatility":
-                    signal_created = ema_signal and rsi_signal and current['atr'] < df['atr'].rolling(20).mean().iloc[i] * 0.8
+                    signal_created = ema_signal and rsi_signal and current['atr'] < atr_sma_20.iloc[i] * 0.8
                 elif pattern_name == "breakout":
                     # Breakout từ consolidation
-                    high_20 = df['high'].rolling(20).max().iloc[i-1]
-                    signal_created = current['close'] > high_20 * 1.02  # Break above 20-period high
+                    signal_created = current['close'] > high_20.iloc[i-1] * 1.02  # Break above 20-period high
                 elif pattern_name == "scalping":
                     signal_created = ema_signal and 45 < current['rsi'] < 55 and volume_signal
                 else:  # default
@@ -2598,19 +2630,15 @@ class EnhancedCryptoPredictionAppV2:
             return None
 
     def _calculate_limit_for_timeframe(self, timeframe, days_back):
-        """Tính limit cần thiết cho mỗi timeframe"""
-        timeframe_minutes = {
-            '60m': 60,
-            '4h': 240,
-            '1d': 1440
-        }
+        """Tính limit cần thiết cho mỗi timeframe (không còn giới hạn 1000 nến)"""
+        timeframe_minutes = INTERVAL_MS.get(normalize_interval(timeframe), INTERVAL_MS['4h']) // 60_000
         
         minutes_in_day = 1440
         total_minutes = days_back * minutes_in_day
-        candles_needed = total_minutes // timeframe_minutes.get(timeframe, 240)
+        candles_needed = total_minutes // timeframe_minutes
         
         # Thêm buffer để đảm bảo đủ data cho indicators
-        return min(max(candles_needed + 100, 200), 1000)
+        return max(candles_needed + 100, 200)
 
     def _calculate_atr(self, df, period=14):
         """Tính Average True Range"""
@@ -2718,7 +2746,6 @@ def main():
                 result = app.analyze_single_pair_by_investment_type(pair, investment_type)
                 if result:
                     results.append(result)
-                time.sleep(1)
             
             # Hiển thị kết quả
             if results:
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Ghi / phát lại response HTTP của Binance để chạy offline, có thể lặp lại
+- record: mỗi response (klines, ticker/24hr, exchangeInfo...) được ghi thêm vào
+  một file JSON lines nén gzip cùng độ trễ gốc
+- replay: phục vụ lại các response đã ghi, không gọi mạng, có thể giả lập độ trễ
+"""
+
+import gzip
+import json
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+FIXTURE_MODES = ('off', 'record', 'replay')
+
+
+def fixture_key(url, params=None):
+    """Khóa so khớp chính xác: path của URL + params đã sắp xếp"""
+    items = sorted((str(k), str(v)) for k, v in (params or {}).items())
+    return f"{urlparse(url).path}?{json.dumps(items)}"
+
+
+def loose_key(url, params=None):
+    """Khóa so khớp lỏng: bỏ các tham số thời gian/limit (phụ thuộc thời điểm chạy)"""
+    params = params or {}
+    return (urlparse(url).path, params.get('symbol'), params.get('interval'))
+
+
+class FixtureResponse:
+    """Response tối giản tương thích với phần requests.Response mà client dùng"""
+
+    def __init__(self, url, status_code, body, headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.text = body
+        self.headers = CaseInsensitiveDict(headers or {})
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error (fixture) for url: {self.url}", response=self)
+
+
+class FixtureRecorder:
+    """Ghi thêm từng response vào file .jsonl.gz (an toàn giữa các thread)"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, url, params, response, elapsed):
+        entry = {
+            'key': fixture_key(url, params),
+            'url': url,
+            'params': params or {},
+            'status': response.status_code,
+            'headers': {k: v for k, v in response.headers.items() if k.upper().startswith('X-MBX')},
+            'body': response.text,
+            'latency': elapsed,
+            'recorded_at': time.time()
+        }
+        line = (json.dumps(entry) + '\n').encode('utf-8')
+        with self._lock:
+            # Mỗi lần ghi là một gzip member - gzip.open đọc nối tiếp được
+            with gzip.open(self.path, 'ab') as f:
+                f.write(line)
+
+
+class FixtureReplayer:
+    """Phát lại response đã ghi theo thứ tự ghi cho từng khóa"""
+
+    def __init__(self, path, latency_scale=0.0):
+        """latency_scale: 0 = trả ngay, 1 = giả lập đúng độ trễ đã ghi"""
+        self.path = path
+        self.latency_scale = latency_scale
+        self.exact = {}
+        self.loose = {}
+        self._cursors = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        with gzip.open(self.path, 'rt', encoding='utf-8') as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                self.exact.setdefault(entry['key'], []).append(entry)
+                self.loose.setdefault(loose_key(entry['url'], entry['params']), []).append(entry)
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.exact.values())
+
+    def _next(self, key, entries):
+        """Lần lượt trả các response của cùng khóa, hết thì lặp lại response cuối"""
+        with self._lock:
+            idx = self._cursors.get(key, 0)
+            self._cursors[key] = idx + 1
+        return entries[min(idx, len(entries) - 1)]
+
+    def get(self, url, params=None):
+        key = fixture_key(url, params)
+        entries = self.exact.get(key)
+        if entries is None:
+            # startTime/endTime phụ thuộc thời điểm chạy -> dùng bản ghi mới nhất cùng symbol/interval
+            lkey = loose_key(url, params)
+            entries = self.loose.get(lkey)
+            if entries is None:
+                raise requests.exceptions.ConnectionError(f"No recorded fixture for {key}")
+            entry = entries[-1]
+        else:
+            entry = self._next(key, entries)
+
+        if self.latency_scale:
+            time.sleep(entry['latency'] * self.latency_scale)
+
+        return FixtureResponse(entry['url'], entry['status'], entry['body'], entry['headers'])
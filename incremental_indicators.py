@@ -0,0 +1,481 @@
+#!/usr/bin/env python3
+"""
+Engine chỉ báo tăng dần: giữ trạng thái chạy cho từng chỉ báo và cập nhật O(1)
+mỗi khi có thêm một nến, thay vì tính lại toàn bộ cửa sổ như calculate_advanced_indicators
+
+Công thức bám sát các node batch trong indicator_graph (EMA, RSI, ATR, ADX...), kể cả
+giá trị NaN ở đầu chuỗi, nên giá trị sau mỗi nến khớp (tới sai số làm tròn) với cột
+tương ứng khi tính batch trên cùng chuỗi nến (kể từ nến seed đầu tiên)
+"""
+
+import copy
+import math
+from bisect import bisect_right
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+import candlestick_patterns
+from indicator_cache import FIB_COLUMNS
+from pattern_indicators import DEFAULT_PATTERN_PARAMS
+
+NAN = float('nan')
+
+# Tỉ lệ Fibonacci Retracement theo thứ tự FIB_COLUMNS
+FIB_RATIOS = (0.236, 0.382, 0.500, 0.618)
+
+# Mọi cửa sổ rolling high/low mà các chỉ báo dùng - tính chung một lượt
+EXTREMA_WINDOWS = (9, 10, 14, 20, 26, 50, 52)
+
+
+def _div(a, b):
+    """Chia theo IEEE như pandas (x/0 -> inf, 0/0 -> nan) thay vì ZeroDivisionError"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return float(np.float64(a) / np.float64(b))
+
+
+class EMAState:
+    """ewm(span, adjust=False).mean() - cùng thứ tự phép tính với pandas"""
+
+    def __init__(self, span):
+        self.alpha = 2.0 / (span + 1.0)
+        self.value = NAN
+
+    def update(self, x):
+        if math.isnan(self.value):
+            self.value = x
+        elif not math.isnan(x) and self.value != x:
+            old_wt = 1.0 - self.alpha
+            self.value = (old_wt * self.value + self.alpha * x) / (old_wt + self.alpha)
+        return self.value
+
+
+class RollingMean:
+    """
+    rolling(window).mean() - NaN cho tới khi đủ `window` giá trị hợp lệ trong cửa sổ
+    Cộng/trừ dồn có bù Kahan theo đúng thứ tự của pandas (bỏ nến cũ trước, thêm nến mới sau)
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.add_compensation = 0.0
+        self.remove_compensation = 0.0
+        self.nobs = 0
+        self.neg_count = 0
+        self.same_count = 0
+        self.prev_value = NAN
+
+    def _kahan(self, x, compensation):
+        y = x - compensation
+        t = self.total + y
+        compensation = t - self.total - y
+        self.total = t
+        return compensation
+
+    def update(self, x):
+        if len(self.values) == self.window:
+            old = self.values.popleft()
+            if not math.isnan(old):
+                self.nobs -= 1
+                self.remove_compensation = self._kahan(-old, self.remove_compensation)
+                if math.copysign(1.0, old) < 0:
+                    self.neg_count -= 1
+
+        self.values.append(x)
+        if not math.isnan(x):
+            self.nobs += 1
+            self.add_compensation = self._kahan(x, self.add_compensation)
+            if math.copysign(1.0, x) < 0:
+                self.neg_count += 1
+            if x == self.prev_value:
+                self.same_count += 1
+            else:
+                self.same_count = 1
+            self.prev_value = x
+
+        if self.nobs < self.window:
+            return NAN
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        result = self.total / self.nobs
+        if self.neg_count == 0 and result < 0:
+            return 0.0
+        if self.neg_count == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class RollingExtremum:
+    """rolling(window).max()/min() bằng monotonic deque - O(1) khấu hao mỗi nến"""
+
+    def __init__(self, window, is_max=True):
+        self.window = window
+        self.is_max = is_max
+        self.candidates = deque()  # (index, value), giá trị đơn điệu
+        self.index = -1
+
+    def update(self, x):
+        self.index += 1
+        if self.is_max:
+            while self.candidates and self.candidates[-1][1] <= x:
+                self.candidates.pop()
+        else:
+            while self.candidates and self.candidates[-1][1] >= x:
+                self.candidates.pop()
+        self.candidates.append((self.index, x))
+
+        if self.candidates[0][0] <= self.index - self.window:
+            self.candidates.popleft()
+
+        if self.index + 1 < self.window:
+            return NAN
+        return self.candidates[0][1]
+
+
+class RollingExtrema:
+    """
+    rolling(w).max()/min() cho nhiều cửa sổ bằng một monotonic deque chung (theo cửa sổ lớn nhất)
+    Cực trị của cửa sổ w là ứng viên đầu tiên còn nằm trong w nến cuối - tìm bằng bisect
+    """
+
+    def __init__(self, windows, is_max=True):
+        self.windows = tuple(windows)
+        self.largest = max(self.windows)
+        self.is_max = is_max
+        self.indices = []  # deque dạng list + head để bisect được
+        self.values = []
+        self.head = 0
+        self.index = -1
+
+    def update(self, x):
+        """Thêm một giá trị, trả về {window: cực trị}"""
+        self.index += 1
+        if self.is_max:
+            while len(self.values) > self.head and self.values[-1] <= x:
+                self.indices.pop()
+                self.values.pop()
+        else:
+            while len(self.values) > self.head and self.values[-1] >= x:
+                self.indices.pop()
+                self.values.pop()
+        self.indices.append(self.index)
+        self.values.append(x)
+
+        while self.indices[self.head] <= self.index - self.largest:
+            self.head += 1
+        if self.head > 64 and self.head * 2 > len(self.indices):
+            del self.indices[:self.head]
+            del self.values[:self.head]
+            self.head = 0
+
+        result = {}
+        for window in self.windows:
+            if self.index + 1 < window:
+                result[window] = NAN
+            else:
+                pos = bisect_right(self.indices, self.index - window, self.head)
+                result[window] = self.values[pos]
+        return result
+
+
+class DelayLine:
+    """shift(periods) - trả về giá trị của `periods` nến trước"""
+
+    def __init__(self, periods):
+        self.values = deque([NAN] * periods, maxlen=periods + 1)
+
+    def update(self, x):
+        self.values.append(x)
+        return self.values[0]
+
+
+class RollingStd:
+    """rolling(window).std() (ddof=1) - tính lại trên cửa sổ nhỏ giữ sẵn, chi phí cố định mỗi nến"""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque(maxlen=window)
+
+    def update(self, x):
+        self.values.append(x)
+        if len(self.values) < self.window:
+            return NAN
+        return float(np.std(np.fromiter(self.values, dtype=np.float64, count=self.window), ddof=1))
+
+
+class PivotState:
+    """Pivot points (pivot, r1-r3, s1-s3) từ high/low/close của nến trước"""
+
+    def __init__(self):
+        self.prev = (NAN, NAN, NAN)
+
+    def update(self, high, low, close):
+        prev_high, prev_low, prev_close = self.prev
+        self.prev = (high, low, close)
+        pivot = (prev_high + prev_low + prev_close) / 3
+        return {
+            'prev_high': prev_high, 'prev_low': prev_low, 'prev_close': prev_close, 'pivot': pivot,
+            'r1': 2 * pivot - prev_low,
+            'r2': pivot + (prev_high - prev_low),
+            'r3': prev_high + 2 * (pivot - prev_low),
+            's1': 2 * pivot - prev_high,
+            's2': pivot - (prev_high - prev_low),
+            's3': prev_low - 2 * (prev_high - pivot),
+        }
+
+
+class CandlePatternState:
+    """Bitmask mô hình nến của nến mới nhất - mô hình dài nhất chỉ cần 3 nến"""
+
+    def __init__(self):
+        self.candles = deque(maxlen=3)
+
+    def update(self, open_, high, low, close):
+        self.candles.append((open_, high, low, close))
+        columns = np.array(self.candles, dtype=np.float64).T
+        return int(candlestick_patterns.detect_patterns(*columns)[-1])
+
+
+class RSIState:
+    """RSI: trung bình trượt đơn giản của gain/loss"""
+
+    def __init__(self, window=14):
+        self.prev_close = NAN
+        self.gain = RollingMean(window)
+        self.loss = RollingMean(window)
+
+    def update(self, close):
+        delta = close - self.prev_close
+        self.prev_close = close
+        # delta.where(delta > 0, 0): delta NaN ở nến đầu cũng thành 0 (loss là -0.0)
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-delta if delta < 0 else -0.0)
+        return 100 - _div(100, 1 + _div(gain, loss))
+
+
+def _true_range(high, low, prev_close):
+    # max(axis=1) bỏ qua NaN -> nến đầu TR = high - low
+    ranges = [high - low, abs(high - prev_close), abs(low - prev_close)]
+    return max(r for r in ranges if not math.isnan(r))
+
+
+class ATRState:
+    """ATR: true range rồi trung bình trượt đơn giản"""
+
+    def __init__(self, window=14):
+        self.prev_close = NAN
+        self.mean = RollingMean(window)
+        self.true_range = NAN
+
+    def update(self, high, low, close):
+        self.true_range = _true_range(high, low, self.prev_close)
+        self.prev_close = close
+        return self.mean.update(self.true_range)
+
+
+class StochasticState:
+    """track_extrema=False: lowest_low/highest_high do bên ngoài truyền vào mỗi nến"""
+
+    def __init__(self, k_window=14, d_window=3, track_extrema=True):
+        self.lowest = RollingExtremum(k_window, is_max=False) if track_extrema else None
+        self.highest = RollingExtremum(k_window, is_max=True) if track_extrema else None
+        self.d = RollingMean(d_window)
+
+    def update(self, high, low, close, lowest_low=None, highest_high=None):
+        if self.lowest is not None:
+            lowest_low = self.lowest.update(low)
+            highest_high = self.highest.update(high)
+        k = 100 * _div(close - lowest_low, highest_high - lowest_low)
+        return k, self.d.update(k)
+
+
+class OBVState:
+    def __init__(self):
+        self.prev_close = NAN
+        self.value = 0.0
+
+    def update(self, close, volume):
+        delta = close - self.prev_close
+        self.prev_close = close
+        if not math.isnan(delta):
+            self.value += float(np.sign(delta)) * volume
+        return self.value
+
+
+class VWAPState:
+    """VWAP tích lũy từ nến đầu tiên của chuỗi"""
+
+    def __init__(self):
+        self.price_volume = 0.0
+        self.volume = 0.0
+
+    def update(self, close, volume):
+        self.price_volume += close * volume
+        self.volume += volume
+        return _div(self.price_volume, self.volume)
+
+
+class ADXState:
+    """ADX: DM/TR trung bình trượt đơn giản, ADX = SMA của DX"""
+
+    def __init__(self, window=14):
+        self.prev_high = NAN
+        self.prev_low = NAN
+        self.prev_close = NAN
+        self.plus_dm = RollingMean(window)
+        self.minus_dm = RollingMean(window)
+        self.tr_1 = RollingMean(1)  # ATR chu kỳ 1
+        self.tr = RollingMean(window)
+        self.dx = RollingMean(window)
+
+    def update(self, high, low, close):
+        true_range = self.tr_1.update(_true_range(high, low, self.prev_close))
+
+        up = high - self.prev_high
+        down = self.prev_low - low
+        plus_dm = up if (up > down and up > 0) else 0.0
+        # Giống batch: so với plus_dm đã được lọc
+        minus_dm = down if (down > plus_dm and down > 0) else 0.0
+        self.prev_high, self.prev_low, self.prev_close = high, low, close
+
+        tr_avg = self.tr.update(true_range)
+        plus_di = 100 * _div(self.plus_dm.update(plus_dm), tr_avg)
+        minus_di = 100 * _div(self.minus_dm.update(minus_dm), tr_avg)
+        dx = _div(100 * abs(plus_di - minus_di), plus_di + minus_di)
+        return self.dx.update(dx), plus_di, minus_di
+
+
+class IncrementalIndicatorEngine:
+    """
+    Trạng thái chỉ báo của một chuỗi nến (symbol, interval)
+    append() cho nến đã đóng; preview() tính giá trị cho nến đang chạy mà không ghi nhận
+    frame() trả về HISTORY nến gần nhất dạng frame chỉ báo để chấm điểm không cần tính batch
+    """
+
+    # Số nến giữ lại cho frame() - calculate_enhanced_signal_score đọc tới nến thứ 10 từ cuối
+    # (phân kỳ Stochastic)
+    HISTORY = 10
+
+    def __init__(self, params=None):
+        """params: tham số market pattern như indicator_graph.evaluate (mặc định: pattern "default")"""
+        params = dict(DEFAULT_PATTERN_PARAMS, **(params or {}))
+        self.ema_10 = EMAState(10)
+        self.ema_20 = EMAState(20)
+        self.ema_50 = EMAState(50)
+        self.macd_fast = EMAState(params['ema_fast'])
+        self.macd_slow = EMAState(params['ema_slow'])
+        self.macd_signal = EMAState(9)
+        self.rsi = RSIState(params['rsi_period'])
+        self.atr = ATRState(params['atr_period'])
+        self.volume_sma = RollingMean(20)
+        self.bb_middle = RollingMean(params['bb_period'])
+        self.bb_std = RollingStd(params['bb_period'])
+        self.bb_num_std = params['bb_std']
+        self.bb_width_sma = RollingMean(20)
+        self.vw_high = RollingMean(20)
+        self.vw_low = RollingMean(20)
+        self.pivots = PivotState()
+        self.patterns = CandlePatternState()
+        self.stochastic = StochasticState(14, 3, track_extrema=False)
+        self.obv = OBVState()
+        self.obv_sma = RollingMean(20)
+        self.vwap = VWAPState()
+        self.adx = ADXState(14)
+
+        # Rolling extrema dùng cho hỗ trợ/kháng cự, Stochastic và Ichimoku - một deque cho mọi cửa sổ
+        self.highs = RollingExtrema(EXTREMA_WINDOWS, is_max=True)
+        self.lows = RollingExtrema(EXTREMA_WINDOWS, is_max=False)
+        self.span_a_delay = DelayLine(26)
+        self.span_b_delay = DelayLine(26)
+
+        self.last_timestamp = None
+        self.count = 0
+        self.values = {}
+        self.history = deque(maxlen=self.HISTORY)
+
+    def append(self, open_, high, low, close, volume, timestamp=None):
+        """Ghi nhận một nến đã đóng, trả về dict giá trị chỉ báo mới nhất"""
+        v = {'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume}
+        v['EMA_10'] = self.ema_10.update(close)
+        v['EMA_20'] = self.ema_20.update(close)
+        v['EMA_50'] = self.ema_50.update(close)
+
+        v['RSI'] = self.rsi.update(close)
+        macd = self.macd_fast.update(close) - self.macd_slow.update(close)
+        v['MACD'] = macd
+        v['MACD_signal'] = self.macd_signal.update(macd)
+        v['MACD_hist'] = macd - v['MACD_signal']
+
+        v['BB_middle'] = self.bb_middle.update(close)
+        bb_width = self.bb_std.update(close) * self.bb_num_std
+        v['BB_upper'] = v['BB_middle'] + bb_width
+        v['BB_lower'] = v['BB_middle'] - bb_width
+        v['ATR'] = self.atr.update(high, low, close)
+        v['volume_sma'] = self.volume_sma.update(volume)
+        v['volume_ratio'] = _div(volume, v['volume_sma'])
+
+        highs = self.highs.update(high)
+        lows = self.lows.update(low)
+        v['resistance'], v['support'] = highs[20], lows[20]
+        v['resistance_strong'], v['support_strong'] = highs[50], lows[50]
+        v['resistance_weak'], v['support_weak'] = highs[10], lows[10]
+        v.update(self.pivots.update(high, low, close))
+        # Tỉ số hai trung bình 20 nến = tỉ số hai tổng 20 nến của bản batch
+        v['vw_resistance'] = _div(self.vw_high.update(high * volume), v['volume_sma'])
+        v['vw_support'] = _div(self.vw_low.update(low * volume), v['volume_sma'])
+        v['ema_resistance'] = float(np.fmax(v['EMA_20'], v['EMA_50']))
+        v['ema_support'] = float(np.fmin(v['EMA_20'], v['EMA_50']))
+
+        v['tenkan_sen'] = (highs[9] + lows[9]) / 2
+        v['kijun_sen'] = (highs[26] + lows[26]) / 2
+        v['senkou_span_a'] = self.span_a_delay.update((v['tenkan_sen'] + v['kijun_sen']) / 2)
+        v['senkou_span_b'] = self.span_b_delay.update((highs[52] + lows[52]) / 2)
+
+        v['stoch_k'], v['stoch_d'] = self.stochastic.update(high, low, close, lows[14], highs[14])
+        v['OBV'] = self.obv.update(close, volume)
+        v['OBV_sma'] = self.obv_sma.update(v['OBV'])
+        v['vwap'] = self.vwap.update(close, volume)
+        v['ADX'], v['DI_plus'], v['DI_minus'] = self.adx.update(high, low, close)
+        v['BB_width'] = _div(v['BB_upper'] - v['BB_lower'], v['BB_middle'])
+        v['BB_width_sma'] = self.bb_width_sma.update(v['BB_width'])
+        v['candle_patterns'] = self.patterns.update(open_, high, low, close)
+
+        self.values = v
+        self.history.append(v)
+        self.count += 1
+        if timestamp is not None:
+            self.last_timestamp = timestamp
+        return v
+
+    def preview(self, open_, high, low, close, volume):
+        """Giá trị chỉ báo nếu nến đang chạy đóng ở giá hiện tại (không thay đổi trạng thái)"""
+        return copy.deepcopy(self).append(open_, high, low, close, volume)
+
+    def fibonacci_levels(self):
+        """Các mức Fibonacci theo high/low 50 nến của nến mới nhất (giá đóng cửa nếu chưa đủ nến)"""
+        v = self.values
+        recent_high, recent_low = v.get('resistance_strong', NAN), v.get('support_strong', NAN)
+        if math.isnan(recent_high) or math.isnan(recent_low):
+            return {col: v.get('close', NAN) for col in FIB_COLUMNS}
+        diff = recent_high - recent_low
+        return {col: recent_high - diff * ratio for col, ratio in zip(FIB_COLUMNS, FIB_RATIOS)}
+
+    def frame(self):
+        """
+        HISTORY nến gần nhất dạng frame chỉ báo (cùng tên cột với calculate_advanced_indicators),
+        Fibonacci trong df.attrs['fibonacci'] như frame compact
+        """
+        df = pd.DataFrame(list(self.history))
+        df.attrs['fibonacci'] = self.fibonacci_levels()
+        return df
+
+    def seed(self, df):
+        """Nạp lịch sử từ DataFrame dạng get_kline_data (chỉ nên gồm nến đã đóng)"""
+        timestamps = df['timestamp'].to_numpy() if 'timestamp' in df else [None] * len(df)
+        columns = [df[col].to_numpy(dtype=np.float64) for col in ('open', 'high', 'low', 'close', 'volume')]
+        for timestamp, o, h, l, c, vol in zip(timestamps, *columns):
+            self.append(float(o), float(h), float(l), float(c), float(vol), timestamp)
+        return self.values
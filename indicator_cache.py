@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Cache LRU cho DataFrame chỉ báo đã tính, dùng chung giữa các lượt phân tích/request
+
+Key: (symbol, interval, open time nến cuối, tham số, digest dữ liệu nến). Digest phủ cả
+nến cuối đang chạy nên chỉ trả về frame khi đầu vào giống hệt; khi có nến mới, các entry
+của nến cũ cùng (symbol, interval) bị bỏ ngay. Giới hạn theo tổng dung lượng frame
+"""
+
+import hashlib
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Cột nến ảnh hưởng tới giá trị chỉ báo
+DIGEST_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+FULL_FRAME = 'full'
+
+# Frame compact: bỏ cột tạm/cột nến không dùng khi phân tích
+COMPACT_DROP_COLUMNS = [
+    'volume_weighted_high', 'volume_weighted_low', 'prev_high', 'prev_low', 'prev_close',
+    'quote_asset_volume', 'number_of_trades', 'taker_buy_base_asset_volume', 'taker_buy_quote_asset_volume'
+]
+
+# Fibonacci là hằng số trên cả frame -> giữ trong df.attrs thay vì cột
+FIB_COLUMNS = ['fib_236', 'fib_382', 'fib_500', 'fib_618']
+
+# Cột dao động/tỉ lệ/volume chỉ cần ~7 chữ số -> float32; cột giá (so sánh với close,
+# làm TP/SL) và OBV (tổng dồn lớn) giữ float64
+FLOAT32_COLUMNS = [
+    'volume', 'RSI', 'volume_sma', 'volume_ratio', 'stoch_k', 'stoch_d',
+    'ADX', 'DI_plus', 'DI_minus', 'BB_width', 'BB_width_sma'
+]
+
+
+def frame_params(columns=None, params=None):
+    """Phần tham số của key: (frame đầy đủ hoặc tập cột đã yêu cầu, tham số chỉ báo của pattern)"""
+    requested = FULL_FRAME if columns is None else tuple(sorted(set(columns)))
+    return requested, tuple(sorted((params or {}).items()))
+
+
+def frame_digest(df):
+    """(open time nến cuối, digest dữ liệu nến) của frame nến thô, None nếu không tạo được"""
+    if df is None or len(df) == 0:
+        return None
+    try:
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(df['timestamp'].to_numpy().tobytes())
+        for col in DIGEST_COLUMNS:
+            digest.update(np.ascontiguousarray(df[col].to_numpy(dtype=np.float64)).tobytes())
+        return int(df['timestamp'].iloc[-1].value), digest.hexdigest()
+    except Exception:
+        return None
+
+
+def frame_nbytes(df):
+    return int(df.memory_usage(index=True, deep=False).sum())
+
+
+def frame_row(df, position=-1):
+    """
+    Một nến của frame chỉ báo dưới dạng Series; giá trị float32 của frame compact đổi sang
+    float Python để so sánh ngưỡng, cộng điểm và jsonify làm việc với float thường
+    """
+    row = df.iloc[position]
+    if row.dtype == object:
+        row = row.map(lambda value: float(value) if isinstance(value, np.float32) else value)
+    return row
+
+
+def compact_frame(df):
+    """
+    Bản compact của frame chỉ báo đầy đủ: bỏ cột tạm, Fibonacci chuyển vào df.attrs['fibonacci'],
+    float32 cho FLOAT32_COLUMNS (bitmask mô hình nến đã là int32)
+    Frame 200 nến giảm ~100 KB -> ~74 KB (~1.4 lần): đa số cột là mức giá, phải giữ float64.
+    Đọc nến qua frame_row để nhận float Python thay vì numpy.float32
+    """
+    if df is None:
+        return None
+    fibonacci = {col: float(df[col].iloc[-1]) for col in FIB_COLUMNS if col in df}
+    df = df.drop(columns=[col for col in COMPACT_DROP_COLUMNS + FIB_COLUMNS if col in df])
+
+    df = df.astype({col: np.float32 for col in FLOAT32_COLUMNS if col in df})
+    df.attrs['fibonacci'] = fibonacci
+    return df
+
+
+class IndicatorFrameCache:
+    """LRU các frame chỉ báo, giới hạn theo tổng số byte"""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # key -> (df, nbytes)
+        self._latest = {}              # (symbol, interval) -> open time nến cuối mới nhất
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key is None:
+            return None
+        with self._lock:
+            return self._get(key)
+
+    def _get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def lookup(self, symbol, interval, df, columns=None, params=None):
+        """
+        Tìm frame chỉ báo cho frame nến thô df -> (frame hoặc None, key để put sau khi tính)
+        Yêu cầu một phần cột cũng dùng được frame đầy đủ đã có (cùng params)
+        """
+        base = frame_digest(df)
+        if base is None:
+            return None, None
+        last_open, digest = base
+        key = (symbol, interval, last_open, frame_params(columns, params), digest)
+        with self._lock:
+            if columns is not None:
+                full_key = (symbol, interval, last_open, frame_params(None, params), digest)
+                if full_key in self._entries:
+                    return self._get(full_key), key
+            return self._get(key), key
+
+    def put(self, key, df):
+        if key is None or df is None:
+            return
+        nbytes = frame_nbytes(df)
+        if nbytes > self.max_bytes:
+            return
+
+        symbol, interval, last_open, params = key[:4]
+        with self._lock:
+            latest = self._latest.get((symbol, interval))
+            if latest is not None and last_open < latest:
+                # Frame của nến cũ hơn cái đang giữ - không cần nữa
+                return
+            if latest is not None and last_open > latest:
+                self._drop_series(symbol, interval)
+            else:
+                # Cùng nến cuối nhưng giá nến đang chạy đã đổi: snapshot cũ không dùng lại nữa
+                self._drop_series(symbol, interval, params)
+            self._latest[(symbol, interval)] = last_open
+
+            self._entries[key] = (df, nbytes)
+            self._bytes += nbytes
+
+            while self._bytes > self.max_bytes and self._entries:
+                _, (_, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+
+    def _drop_series(self, symbol, interval, params=None):
+        """Bỏ các frame của (symbol, interval) - chỉ những frame cùng `params` nếu có truyền"""
+        stale = [key for key in self._entries
+                 if key[0] == symbol and key[1] == interval and (params is None or key[3] == params)]
+        for key in stale:
+            self._bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._latest.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses
+            }
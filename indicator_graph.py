@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Đồ thị phụ thuộc của các cột chỉ báo - nguồn công thức duy nhất cho
+calculate_advanced_indicators, calculate_indicator_columns và panel nhiều symbol
+
+Mỗi node khai báo cột đầu vào và cột đầu ra; evaluate() chỉ tính bao đóng phụ thuộc
+của các cột được yêu cầu (vd khung phụ chỉ cần EMA_10, EMA_20, volume_ratio) và bỏ qua
+cột đã có sẵn. Node chạy trên mảng 1 chiều (time) hoặc panel 2 chiều (symbols x time)
+Cột bắt đầu bằng '_' là giá trị trung gian dùng chung, không trả ra ngoài
+RSI, MACD, Bollinger Bands và ATR theo tham số market pattern (mặc định: pattern "default")
+"""
+
+import numpy as np
+
+import candlestick_patterns
+import indicator_kernels as k
+from incremental_indicators import EXTREMA_WINDOWS, FIB_RATIOS
+from pattern_indicators import DEFAULT_PATTERN_PARAMS
+
+# Cột nến thô mà các node đọc vào
+CANDLE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+NODES = []
+
+
+def indicator(outputs, inputs, params=()):
+    """
+    Đăng ký một node - phải khai báo sau các node mà nó phụ thuộc
+    params: các khóa tham số pattern (PATTERN_PARAM_KEYS) mà node nhận dưới dạng keyword
+    """
+    def register(fn):
+        NODES.append((tuple(outputs), tuple(inputs), tuple(params), fn))
+        return fn
+    return register
+
+
+# ---------- Moving Averages ----------
+
+@indicator(['EMA_10'], ['close'])
+def _ema_10(close):
+    return k.ema(close, 10)
+
+
+@indicator(['EMA_20'], ['close'])
+def _ema_20(close):
+    return k.ema(close, 20)
+
+
+@indicator(['EMA_50'], ['close'])
+def _ema_50(close):
+    return k.ema(close, 50)
+
+
+# ---------- Momentum / Volatility / Volume ----------
+
+@indicator(['RSI'], ['close'], ['rsi_period'])
+def _rsi(close, rsi_period):
+    return k.rsi(close, rsi_period)
+
+
+@indicator(['MACD', 'MACD_signal', 'MACD_hist'], ['close'], ['ema_fast', 'ema_slow'])
+def _macd(close, ema_fast, ema_slow):
+    return k.macd(close, ema_fast, ema_slow)
+
+
+@indicator(['BB_upper', 'BB_middle', 'BB_lower'], ['close'], ['bb_period', 'bb_std'])
+def _bollinger_bands(close, bb_period, bb_std):
+    return k.bollinger_bands(close, bb_period, bb_std)
+
+
+@indicator(['ATR'], ['high', 'low', 'close'], ['atr_period'])
+def _atr(high, low, close, atr_period):
+    return k.atr(high, low, close, atr_period)
+
+
+@indicator(['volume_sma'], ['volume'])
+def _volume_sma(volume):
+    return k.sma(volume, 20)
+
+
+@indicator(['volume_ratio'], ['volume', 'volume_sma'])
+def _volume_ratio(volume, volume_sma):
+    return volume / volume_sma
+
+
+# ---------- Rolling high/low ----------
+
+@indicator(['_high_%d' % w for w in EXTREMA_WINDOWS], ['high'])
+def _rolling_highs(high):
+    highs = k.rolling_extrema(high, EXTREMA_WINDOWS, is_max=True)
+    return tuple(highs[w] for w in EXTREMA_WINDOWS)
+
+
+@indicator(['_low_%d' % w for w in EXTREMA_WINDOWS], ['low'])
+def _rolling_lows(low):
+    lows = k.rolling_extrema(low, EXTREMA_WINDOWS, is_max=False)
+    return tuple(lows[w] for w in EXTREMA_WINDOWS)
+
+
+# ---------- Support/Resistance ----------
+
+@indicator(['resistance'], ['_high_20'])
+def _resistance(high_20):
+    return high_20
+
+
+@indicator(['support'], ['_low_20'])
+def _support(low_20):
+    return low_20
+
+
+@indicator(['prev_high', 'prev_low', 'prev_close', 'pivot', 'r1', 'r2', 'r3', 's1', 's2', 's3'],
+           ['high', 'low', 'close'])
+def _pivot_points(high, low, close):
+    prev_high, prev_low, prev_close = k.shift(high, 1), k.shift(low, 1), k.shift(close, 1)
+    pivot = (prev_high + prev_low + prev_close) / 3
+    return (prev_high, prev_low, prev_close, pivot,
+            2 * pivot - prev_low,
+            pivot + (prev_high - prev_low),
+            prev_high + 2 * (pivot - prev_low),
+            2 * pivot - prev_high,
+            pivot - (prev_high - prev_low),
+            prev_low - 2 * (prev_high - pivot))
+
+
+@indicator(['vwap'], ['close', 'volume'])
+def _vwap(close, volume):
+    return np.cumsum(close * volume, axis=-1) / np.cumsum(volume, axis=-1)
+
+
+@indicator(['_volume_sum_20'], ['volume'])
+def _volume_sum_20(volume):
+    return k.rolling_sum(volume, 20)
+
+
+@indicator(['volume_weighted_high'], ['high', 'volume'])
+def _volume_weighted_high(high, volume):
+    return high * volume
+
+
+@indicator(['vw_resistance'], ['volume_weighted_high', '_volume_sum_20'])
+def _vw_resistance(volume_weighted_high, volume_sum_20):
+    return k.rolling_sum(volume_weighted_high, 20) / volume_sum_20
+
+
+@indicator(['volume_weighted_low'], ['low', 'volume'])
+def _volume_weighted_low(low, volume):
+    return low * volume
+
+
+@indicator(['vw_support'], ['volume_weighted_low', '_volume_sum_20'])
+def _vw_support(volume_weighted_low, volume_sum_20):
+    return k.rolling_sum(volume_weighted_low, 20) / volume_sum_20
+
+
+@indicator(['resistance_strong'], ['_high_50'])
+def _resistance_strong(high_50):
+    return high_50
+
+
+@indicator(['resistance_weak'], ['_high_10'])
+def _resistance_weak(high_10):
+    return high_10
+
+
+@indicator(['support_strong'], ['_low_50'])
+def _support_strong(low_50):
+    return low_50
+
+
+@indicator(['support_weak'], ['_low_10'])
+def _support_weak(low_10):
+    return low_10
+
+
+@indicator(['ema_resistance', 'ema_support'], ['EMA_20', 'EMA_50'])
+def _ema_levels(ema_20, ema_50):
+    return np.fmax(ema_20, ema_50), np.fmin(ema_20, ema_50)
+
+
+# ---------- Ichimoku ----------
+
+@indicator(['tenkan_sen'], ['_high_9', '_low_9'])
+def _tenkan_sen(high_9, low_9):
+    return (high_9 + low_9) / 2
+
+
+@indicator(['kijun_sen'], ['_high_26', '_low_26'])
+def _kijun_sen(high_26, low_26):
+    return (high_26 + low_26) / 2
+
+
+@indicator(['senkou_span_a'], ['tenkan_sen', 'kijun_sen'])
+def _senkou_span_a(tenkan_sen, kijun_sen):
+    return k.shift((tenkan_sen + kijun_sen) / 2, 26)
+
+
+@indicator(['senkou_span_b'], ['_high_52', '_low_52'])
+def _senkou_span_b(high_52, low_52):
+    return k.shift((high_52 + low_52) / 2, 26)
+
+
+@indicator(['chikou_span'], ['close'])
+def _chikou_span(close):
+    return k.shift(close, -26)
+
+
+# ---------- Oscillators / trend strength ----------
+
+@indicator(['stoch_k', 'stoch_d'], ['high', 'low', 'close', '_low_14', '_high_14'])
+def _stochastic(high, low, close, low_14, high_14):
+    return k.stochastic(high, low, close, 14, 3, lowest_low=low_14, highest_high=high_14)
+
+
+@indicator(['OBV'], ['close', 'volume'])
+def _obv(close, volume):
+    return k.obv(close, volume)
+
+
+@indicator(['OBV_sma'], ['OBV'])
+def _obv_sma(obv):
+    return k.sma(obv, 20)
+
+
+@indicator(['ADX', 'DI_plus', 'DI_minus'], ['high', 'low', 'close'])
+def _adx(high, low, close):
+    return k.adx(high, low, close, 14)
+
+
+@indicator(['BB_width'], ['BB_upper', 'BB_lower', 'BB_middle'])
+def _bb_width(bb_upper, bb_lower, bb_middle):
+    return (bb_upper - bb_lower) / bb_middle
+
+
+@indicator(['BB_width_sma'], ['BB_width'])
+def _bb_width_sma(bb_width):
+    return k.rolling_mean(bb_width, 20)
+
+
+# ---------- Fibonacci ----------
+
+@indicator(['fib_236', 'fib_382', 'fib_500', 'fib_618'], ['resistance_strong', 'support_strong', 'close'])
+def _fibonacci(resistance_strong, support_strong, close):
+    # Theo high/low 50 nến của nến cuối - hằng số trên từng chuỗi
+    recent_high = resistance_strong[..., -1:]
+    recent_low = support_strong[..., -1:]
+    missing = np.isnan(recent_high) | np.isnan(recent_low)
+    diff = recent_high - recent_low
+    return tuple(np.where(missing, close, np.broadcast_to(recent_high - (diff * ratio), close.shape))
+                 for ratio in FIB_RATIOS)
+
+
+# ---------- Candlestick patterns ----------
+
+@indicator(['candle_patterns'], ['open', 'high', 'low', 'close'])
+def _candle_patterns(open_, high, low, close):
+    return candlestick_patterns.detect_patterns(open_, high, low, close)
+
+
+ALL_COLUMNS = [col for outputs, _, _, _ in NODES for col in outputs if not col.startswith('_')]
+
+
+def plan(columns, available=()):
+    """
+    Các node cần chạy (theo thứ tự phụ thuộc) để có `columns`
+    Node chỉ được bỏ qua khi mọi output cần dùng đã có trong `available`
+    """
+    needed = {col for col in columns if col not in available}
+    nodes = []
+    for node in reversed(NODES):
+        outputs, inputs = node[:2]
+        if needed.intersection(outputs):
+            nodes.append(node)
+            needed.update(col for col in inputs if col not in available)
+    return nodes[::-1]
+
+
+def evaluate(values, columns=None, params=None):
+    """
+    Tính các cột chỉ báo còn thiếu cho `columns` (mặc định: tất cả)
+    values: dict/DataFrame có các cột nến (open, high, low, close, volume) và cột đã tính
+    params: tham số market pattern (các khóa của PATTERN_PARAM_KEYS), thiếu khóa nào lấy theo
+    DEFAULT_PATTERN_PARAMS
+    Trả về dict {column: array} theo thứ tự cột của calculate_advanced_indicators, chỉ gồm
+    các cột chưa có trong values (node nhiều output có thể tính lại cả cột đã có)
+    """
+    columns = ALL_COLUMNS if columns is None else columns
+    params = dict(DEFAULT_PATTERN_PARAMS, **(params or {}))
+    computed = {}
+
+    def lookup(col):
+        if col in computed:
+            return computed[col]
+        return np.asarray(values[col], dtype=np.float64)
+
+    for outputs, inputs, node_params, fn in plan(columns, values):
+        result = fn(*[lookup(col) for col in inputs], **{key: params[key] for key in node_params})
+        if len(outputs) == 1:
+            result = (result,)
+        computed.update(zip(outputs, result))
+
+    return {col: value for col, value in computed.items() if not col.startswith('_') and col not in values}
@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Kernel chỉ báo trên mảng NumPy float64 liên tục (không Series, không căn index)
+
+Các phép theo từng phần tử (diff, true range, where, sign, cumsum, chia) làm bằng NumPy
+ghi vào buffer dùng lại. Rolling sum/mean/std cộng trực tiếp trên sliding_window_view,
+EMA tính theo khối bằng phép nhân ma trận - chỉ dùng API công khai của NumPy.
+Kết quả khớp Series.rolling/ewm tới sai số làm tròn (~1e-12 tương đối), không trùng từng bit:
+pandas cộng dồn có bù Kahan và đệ quy EMA từng nến.
+
+Mọi kernel nhận mảng 1 chiều (time) hoặc 2 chiều (symbols x time), luôn tính dọc trục cuối.
+"""
+
+import threading
+
+import numpy as np
+
+_scratch = threading.local()
+
+# Số nến mỗi khối khi tính EMA
+EMA_BLOCK = 64
+
+
+def _buffer(name, shape):
+    """Buffer tạm dùng lại theo thread - chỉ cho giá trị trung gian, không trả ra ngoài"""
+    buffers = getattr(_scratch, 'buffers', None)
+    if buffers is None:
+        buffers = _scratch.buffers = {}
+    buf = buffers.get(name)
+    if buf is None or buf.shape != shape:
+        buf = buffers[name] = np.empty(shape, dtype=np.float64)
+    return buf
+
+
+def _as_float(values):
+    return np.ascontiguousarray(values, dtype=np.float64)
+
+
+def _finish(result, out):
+    if out is None:
+        return result
+    np.copyto(out, result)
+    return out
+
+
+def _windows(values, window):
+    """View (..., n - window + 1, window) trên các cửa sổ trượt dọc trục cuối; None nếu chưa đủ nến"""
+    if values.shape[-1] < window:
+        return None
+    return np.lib.stride_tricks.sliding_window_view(values, window, axis=-1)
+
+
+def _rolling(values, window, reduce, out):
+    """Áp reduce lên từng cửa sổ; NaN ở window - 1 nến đầu và ở cửa sổ có NaN (như min_periods=window)"""
+    values = _as_float(values)
+    result = out if out is not None else np.empty(values.shape)
+    result[..., :window - 1] = np.nan
+    windows = _windows(values, window)
+    if windows is not None:
+        result[..., window - 1:] = reduce(windows)
+    return result
+
+
+# ---------- primitives ----------
+
+def rolling_mean(values, window, out=None):
+    """rolling(window).mean()"""
+    return _rolling(values, window, lambda w: w.mean(axis=-1), out)
+
+
+def rolling_std(values, window, out=None):
+    """rolling(window).std() (ddof=1)"""
+    return _rolling(values, window, lambda w: w.std(axis=-1, ddof=1), out)
+
+
+def rolling_sum(values, window, out=None):
+    """rolling(window).sum()"""
+    return _rolling(values, window, lambda w: w.sum(axis=-1), out)
+
+
+def rolling_extrema(values, windows, is_max=True):
+    """
+    rolling(w).max()/min() cho nhiều cửa sổ trong một lượt - đầu vào không có NaN
+    Bảng doubling: tầng j là cực trị của 2^j nến cuối, mọi cửa sổ dùng chung các tầng;
+    mỗi cửa sổ w chỉ cần ghép hai đoạn 2^j chồng lên nhau (2^j <= w < 2^(j+1))
+    -> {window: array}
+    """
+    values = _as_float(values)
+    combine = np.maximum if is_max else np.minimum
+    n = values.shape[-1]
+
+    levels = [values]
+    span = 1
+    while span * 2 <= max(windows):
+        prev = levels[-1]
+        level = prev.copy()
+        combine(prev[..., span:], prev[..., :-span], out=level[..., span:])
+        levels.append(level)
+        span *= 2
+
+    result = {}
+    for window in windows:
+        out = np.full(values.shape, np.nan)
+        if n >= window:
+            j = window.bit_length() - 1
+            span = 1 << j
+            combine(levels[j][..., window - 1:], levels[j][..., span - 1:n - (window - span)],
+                    out=out[..., window - 1:])
+        result[window] = out
+    return result
+
+
+def rolling_max(values, window, out=None):
+    """rolling(window).max() - đầu vào không có NaN"""
+    return _finish(rolling_extrema(values, (window,), is_max=True)[window], out)
+
+
+def rolling_min(values, window, out=None):
+    """rolling(window).min() - đầu vào không có NaN"""
+    return _finish(rolling_extrema(values, (window,), is_max=False)[window], out)
+
+
+def ema(values, span, out=None):
+    """
+    ewm(span, adjust=False).mean(): NaN trước giá trị hợp lệ đầu tiên, nến NaN ở giữa giữ nguyên EMA
+    Trong mỗi khối EMA_BLOCK nến: y[k] = sum_j alpha * decay^(k-j) * x[j] + decay^(k+1) * y_trước_khối,
+    vector hóa theo symbol và theo nến trong khối. Khối luôn đủ EMA_BLOCK phần tử (đệm 0 ở cuối)
+    nên giá trị mỗi nến không phụ thuộc độ dài chuỗi - tính trên một đoạn đầu cho đúng kết quả đó
+    """
+    values = _as_float(values)
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    n = values.shape[-1]
+    result = out if out is not None else np.empty(values.shape)
+    if n == 0:
+        return result
+
+    valid = ~np.isnan(values)
+    started = np.logical_or.accumulate(valid, axis=-1)
+    # Trạng thái ban đầu là giá trị hợp lệ đầu tiên; NaN ở đầu chuỗi thay bằng chính giá trị đó
+    state = np.take_along_axis(values, np.argmax(valid, axis=-1)[..., None], axis=-1)[..., 0]
+    padded = np.zeros(values.shape[:-1] + (-(-n // EMA_BLOCK) * EMA_BLOCK,))
+    padded[..., :n] = np.where(started, values, state[..., None])
+
+    lag = np.arange(EMA_BLOCK)
+    lower = lag[:, None] >= lag[None, :]
+    with np.errstate(over='ignore'):
+        weights = np.where(lower, alpha * decay ** (lag[:, None] - lag[None, :]), 0.0)
+    carry = decay ** (lag + 1)
+
+    for start in range(0, n, EMA_BLOCK):
+        block = padded[..., start:start + EMA_BLOCK]
+        ok = ~np.isnan(block)
+        if ok.all():
+            y = (block[..., None, :] * weights).sum(axis=-1) + carry * state[..., None]
+        else:
+            # decay^(số nến hợp lệ trong (j, k]) thay cho decay^(k-j)
+            count = np.cumsum(ok, axis=-1)
+            with np.errstate(over='ignore'):
+                w = np.where(lower & ok[..., None, :],
+                             alpha * decay ** (count[..., :, None] - count[..., None, :]), 0.0)
+            y = (np.where(ok, block, 0.0)[..., None, :] * w).sum(axis=-1) + decay ** count * state[..., None]
+        m = min(EMA_BLOCK, n - start)
+        result[..., start:start + m] = y[..., :m]
+        state = y[..., -1]
+
+    result[~started] = np.nan
+    return result
+
+
+def diff(values, out=None):
+    """Series.diff(): phần tử đầu là NaN"""
+    values = _as_float(values)
+    result = out if out is not None else np.empty(values.shape)
+    if values.shape[-1]:
+        result[..., 0] = np.nan
+        np.subtract(values[..., 1:], values[..., :-1], out=result[..., 1:])
+    return result
+
+
+def shift(values, periods, out=None):
+    """Series.shift(periods): dịch theo thời gian, chỗ trống là NaN"""
+    values = _as_float(values)
+    result = out if out is not None else np.empty(values.shape)
+    n = values.shape[-1]
+    if abs(periods) >= n:
+        result[...] = np.nan
+    elif periods >= 0:
+        result[..., :periods] = np.nan
+        result[..., periods:] = values[..., :n - periods]
+    else:
+        result[..., periods:] = np.nan
+        result[..., :periods] = values[..., -periods:]
+    return result
+
+
+def true_range(high, low, close, out=None):
+    """max(high - low, |high - prev close|, |low - prev close|), bỏ qua NaN ở nến đầu"""
+    high, low, close = _as_float(high), _as_float(low), _as_float(close)
+    result = out if out is not None else np.empty(close.shape)
+    np.subtract(high, low, out=result)
+    if close.shape[-1] > 1:
+        prev_close = close[..., :-1]
+        gap = _buffer('tr_gap', prev_close.shape)
+        np.abs(np.subtract(high[..., 1:], prev_close, out=gap), out=gap)
+        np.fmax(result[..., 1:], gap, out=result[..., 1:])
+        np.abs(np.subtract(low[..., 1:], prev_close, out=gap), out=gap)
+        np.fmax(result[..., 1:], gap, out=result[..., 1:])
+    return result
+
+
+# ---------- indicators ----------
+
+def sma(values, window, out=None):
+    return rolling_mean(values, window, out)
+
+
+def price_changes(close):
+    """(gain, loss) theo từng nến của RSI - dùng chung khi tính RSI nhiều chu kỳ"""
+    close = _as_float(close)
+    delta = diff(close, out=_buffer('rsi_delta', close.shape))
+    with np.errstate(invalid='ignore'):
+        gain = np.where(delta > 0, delta, 0.0)
+        # -(delta.where(delta < 0, 0)): giữ nguyên dấu -0.0 như pandas
+        loss = np.negative(np.where(delta < 0, delta, 0.0))
+    return gain, loss
+
+
+def rsi(close, window=14, out=None, changes=None):
+    """changes: (gain, loss) từ price_changes đã tính sẵn"""
+    close = _as_float(close)
+    gain, loss = changes if changes is not None else price_changes(close)
+    avg_gain = rolling_mean(gain, window)
+    avg_loss = rolling_mean(loss, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rs = np.divide(avg_gain, avg_loss, out=avg_gain)
+        result = out if out is not None else np.empty(close.shape)
+        np.subtract(100, np.divide(100, np.add(1, rs, out=rs), out=rs), out=result)
+    return result
+
+
+def macd(close, fast=12, slow=26, signal=9):
+    close = _as_float(close)
+    line = np.subtract(ema(close, fast), ema(close, slow))
+    signal_line = ema(line, signal)
+    return line, signal_line, line - signal_line
+
+
+def bollinger_bands(close, window=20, num_std=2):
+    close = _as_float(close)
+    middle = rolling_mean(close, window)
+    width = rolling_std(close, window) * num_std
+    return middle + width, middle, middle - width
+
+
+def atr(high, low, close, window=14, out=None, tr=None):
+    """tr: true range đã tính sẵn (dùng chung khi tính ATR nhiều chu kỳ)"""
+    if tr is None:
+        tr = true_range(high, low, close, out=_buffer('atr_tr', np.shape(close)))
+    return rolling_mean(tr, window, out)
+
+
+def stochastic(high, low, close, k_window=14, d_window=3, lowest_low=None, highest_high=None):
+    """lowest_low/highest_high: rolling min/max k_window đã tính sẵn (vd từ rolling_extrema)"""
+    close = _as_float(close)
+    if lowest_low is None:
+        lowest_low = rolling_min(low, k_window)
+    if highest_high is None:
+        highest_high = rolling_max(high, k_window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        k = np.subtract(close, lowest_low)
+        np.divide(k, np.subtract(highest_high, lowest_low, out=_buffer('stoch_range', close.shape)), out=k)
+        np.multiply(100, k, out=k)
+    return k, rolling_mean(k, d_window)
+
+
+def obv(close, volume):
+    close = _as_float(close)
+    delta = diff(close, out=_buffer('obv_delta', close.shape))
+    flow = np.sign(delta)
+    np.multiply(flow, volume, out=flow)
+    flow[np.isnan(flow)] = 0
+    return np.cumsum(flow, axis=-1, out=flow)
+
+
+def adx(high, low, close, window=14):
+    high, low = _as_float(high), _as_float(low)
+    # ATR chu kỳ 1 (trung bình trượt 1 nến của true range)
+    tr = rolling_mean(true_range(high, low, close, out=_buffer('adx_tr', high.shape)), 1)
+
+    up = diff(high, out=_buffer('adx_up', high.shape))
+    down = np.negative(diff(low, out=_buffer('adx_down', high.shape)))
+    with np.errstate(invalid='ignore'):
+        plus_dm = np.where((up > down) & (up > 0), up, 0)
+        # So với plus_dm đã lọc - giống hàm batch
+        minus_dm = np.where((down > plus_dm) & (down > 0), down, 0)
+
+    plus_avg = rolling_mean(plus_dm, window)
+    minus_avg = rolling_mean(minus_dm, window)
+    tr_avg = rolling_mean(tr, window)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        plus_di = 100 * (plus_avg / tr_avg)
+        minus_di = 100 * (minus_avg / tr_avg)
+        dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+    return rolling_mean(dx, window), plus_di, minus_di
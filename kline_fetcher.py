@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Bộ tải klines song song cho nhiều symbol / nhiều khung thời gian
+Nhận danh sách job (symbol, interval, limit), chạy đồng thời bằng asyncio
+trong giới hạn concurrency chung và trả về DataFrame giống get_kline_data
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+class AsyncKlineFetcher:
+    """Chạy nhiều lần fetch klines đồng thời với một ngân sách concurrency chung"""
+
+    def __init__(self, fetch_fn, max_concurrency=8):
+        """
+        fetch_fn(symbol, interval, limit) -> DataFrame hoặc None
+        (thường là EnhancedCryptoPredictionAppV2.get_kline_data)
+        """
+        self.fetch_fn = fetch_fn
+        self.max_concurrency = max_concurrency
+        # Pool dùng chung cho mọi batch -> giới hạn concurrency toàn process
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency,
+                                            thread_name_prefix='kline-fetch')
+
+    async def fetch_all_async(self, jobs):
+        """Coroutine: tải tất cả job, trả về dict {(symbol, interval, limit): df}"""
+        loop = asyncio.get_running_loop()
+        unique_jobs = list(dict.fromkeys(tuple(job) for job in jobs))
+
+        async def run_job(job):
+            symbol, interval, limit = job
+            try:
+                return await loop.run_in_executor(self._executor, self.fetch_fn,
+                                                  symbol, interval, limit)
+            except Exception:
+                return None
+
+        frames = await asyncio.gather(*(run_job(job) for job in unique_jobs))
+        return dict(zip(unique_jobs, frames))
+
+    def fetch_all(self, jobs):
+        """Bản đồng bộ của fetch_all_async (dùng trong Flask / AutoRunner)"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.fetch_all_async(jobs))
+
+        # Đang ở trong event loop khác -> chạy trên thread riêng để không chặn loop đó
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, self.fetch_all_async(jobs)).result()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,411 @@
+#!/usr/bin/env python3
+"""
+Chế độ streaming klines
+Nhận sự kiện kline (Binance WebSocket hoặc nguồn giả lập cục bộ), giữ cửa sổ nến
+cố định trong ring buffer theo (symbol, interval) và chạy phân tích ngay khi
+một nến đóng - không cần gọi REST sau lần seed đầu tiên
+"""
+
+import json
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from candle_store import MAX_KLINES_PER_REQUEST, interval_to_ms
+from enhanced_app_v2 import AnalysisRunMemo
+from incremental_indicators import IncrementalIndicatorEngine
+
+try:
+    import websocket  # websocket-client
+except ImportError:
+    websocket = None
+
+BINANCE_STREAM_URL = "wss://stream.binance.com:9443/stream"
+
+OHLCV_COLUMNS = ['open', 'high', 'low', 'close', 'volume']
+
+# Sự kiện nguồn phát ra sau khi kết nối lại (không phải sự kiện của Binance)
+RECONNECT_EVENT = 'reconnect'
+
+
+class KlineRingBuffer:
+    """Ring buffer kích thước cố định cho một chuỗi nến"""
+
+    def __init__(self, size=200):
+        self.size = size
+        self.timestamps = np.zeros(size, dtype=np.int64)
+        self.values = np.zeros((size, len(OHLCV_COLUMNS)), dtype=np.float64)
+        self.head = 0   # vị trí sẽ ghi nến tiếp theo
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    def last_timestamp(self):
+        if self.count == 0:
+            return None
+        return int(self.timestamps[(self.head - 1) % self.size])
+
+    def update(self, open_time, ohlcv):
+        """
+        Ghi đè nến cuối nếu cùng open time (nến đang chạy), ngược lại thêm nến mới
+        Trả về False nếu sự kiện bị bỏ qua (cũ hơn nến cuối)
+        """
+        if self.count and open_time == self.last_timestamp():
+            idx = (self.head - 1) % self.size
+        elif self.count and open_time < self.last_timestamp():
+            return False  # sự kiện cũ đến trễ
+        else:
+            idx = self.head
+            self.head = (self.head + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+
+        self.timestamps[idx] = open_time
+        self.values[idx] = ohlcv
+        return True
+
+    def seed(self, df):
+        """Nạp lịch sử ban đầu từ DataFrame dạng get_kline_data"""
+        ts, values = frame_arrays(df)
+        for open_time, row in zip(ts[-self.size:], values[-self.size:]):
+            self.update(int(open_time), row)
+
+    def _order(self):
+        if self.count < self.size:
+            return np.arange(self.count)
+        return np.r_[self.head:self.size, 0:self.head]
+
+    def ordered(self):
+        """(timestamps, values) theo thứ tự thời gian"""
+        order = self._order()
+        return self.timestamps[order], self.values[order]
+
+    def to_frame(self):
+        """DataFrame theo thứ tự thời gian, cùng dạng với get_kline_data"""
+        timestamps, values = self.ordered()
+        df = pd.DataFrame(values, columns=OHLCV_COLUMNS)
+        df.insert(0, 'timestamp', pd.to_datetime(timestamps, unit='ms'))
+        return df
+
+
+def frame_arrays(df):
+    """(open time ms, giá trị OHLCV) từ DataFrame dạng get_kline_data"""
+    ts = df['timestamp'].to_numpy().astype('datetime64[ms]').astype(np.int64)
+    return ts, df[OHLCV_COLUMNS].to_numpy(dtype=np.float64)
+
+
+def parse_kline_event(message):
+    """Tách (symbol, interval, open_time, ohlcv, is_closed) từ sự kiện kline của Binance"""
+    if 'data' in message:  # combined stream
+        message = message['data']
+    if message.get('e') != 'kline':
+        return None
+
+    k = message['k']
+    ohlcv = [float(k['o']), float(k['h']), float(k['l']), float(k['c']), float(k['v'])]
+    return k['s'], k['i'], int(k['t']), ohlcv, bool(k['x'])
+
+
+class KlineStreamConsumer:
+    """
+    Duy trì ring buffer cho từng (symbol, interval) và gọi handler khi nến đóng
+    Nếu bật indicators, mỗi chuỗi có thêm một IncrementalIndicatorEngine cập nhật O(1) mỗi nến đóng
+    Nến bị lỡ (mất kết nối, open time nhảy quá một bước) được tải bù qua backfill_fn
+    """
+
+    def __init__(self, window=200, indicators=True, backfill_fn=None, engine_params=None):
+        """
+        backfill_fn(symbol, interval, limit) -> DataFrame dạng get_kline_data (thường là app.get_kline_data)
+        engine_params: tham số market pattern cho engine chỉ báo (mặc định: pattern "default")
+        """
+        self.window = window
+        self.buffers = {}
+        self.engines = {} if indicators else None
+        self.engine_params = engine_params
+        self.handlers = []
+        self.backfill_fn = backfill_fn
+        self.backfill_stats = {}
+        self._closed = {}  # {(symbol, interval): open time của nến đã đóng gần nhất}
+        self._lock = threading.Lock()
+
+    def buffer(self, symbol, interval):
+        key = (symbol, interval)
+        with self._lock:
+            if key not in self.buffers:
+                self.buffers[key] = KlineRingBuffer(self.window)
+            return self.buffers[key]
+
+    def seed(self, symbol, interval, df):
+        if df is not None and len(df) > 0:
+            self.buffer(symbol, interval).seed(df)
+            # Nến cuối từ REST có thể chưa đóng -> chưa đưa vào engine
+            self._mark_closed(symbol, interval, frame_arrays(df)[0][:-1])
+            self._advance_engine(symbol, interval)
+
+    def _mark_closed(self, symbol, interval, closed_timestamps):
+        if len(closed_timestamps):
+            key = (symbol, interval)
+            self._closed[key] = max(self._closed.get(key, -1), int(closed_timestamps[-1]))
+
+    def _reset_series(self, symbol, interval):
+        """Bỏ buffer và engine của một chuỗi để nạp lại từ đầu"""
+        key = (symbol, interval)
+        with self._lock:
+            self.buffers[key] = KlineRingBuffer(self.window)
+        self._closed.pop(key, None)
+        if self.engines is not None:
+            self.engines.pop(key, None)
+
+    def _advance_engine(self, symbol, interval):
+        """Đưa các nến đã đóng mà engine chưa thấy vào engine chỉ báo"""
+        key = (symbol, interval)
+        if self.engines is None or key not in self._closed:
+            return
+        engine = self.engines.get(key)
+        if engine is None:
+            engine = self.engines[key] = IncrementalIndicatorEngine(self.engine_params)
+
+        timestamps, values = self.buffer(symbol, interval).ordered()
+        stop = np.searchsorted(timestamps, self._closed[key], side='right')
+        timestamps, values = timestamps[:stop], values[:stop]
+        if engine.last_timestamp is not None:
+            start = np.searchsorted(timestamps, engine.last_timestamp, side='right')
+            timestamps, values = timestamps[start:], values[start:]
+
+        for open_time, (o, h, l, c, v) in zip(timestamps.tolist(), values.tolist()):
+            engine.append(o, h, l, c, v, open_time)
+
+    def backfill(self, symbol, interval, before=None):
+        """
+        Tải lại qua REST các nến kể từ nến cuối trong buffer
+        before: open time của sự kiện vừa nhận - chỉ ghi các nến trước đó (đều đã đóng)
+        Không có before (sau khi kết nối lại): nến cuối REST trả về coi như chưa đóng
+        Khoảng mất dài hơn cửa sổ -> nạp lại cả buffer và engine của chuỗi
+        """
+        key = (symbol, interval)
+        stats = self.backfill_stats.setdefault(key, {'backfills': 0, 'candles': 0, 'reseeds': 0, 'failed': 0})
+        last = self.buffer(symbol, interval).last_timestamp()
+        if self.backfill_fn is None or last is None:
+            return False
+
+        step = interval_to_ms(interval)
+        end = before if before is not None else int(time.time() * 1000)
+        limit = (end - last) // step + 2
+        reseed = limit > self.window
+        try:
+            df = self.backfill_fn(symbol, interval, min(self.window if reseed else limit, MAX_KLINES_PER_REQUEST))
+        except Exception:
+            df = None
+        if df is None or len(df) == 0:
+            stats['failed'] += 1
+            #print(f"❌ Backfill failed for {symbol} {interval}, indicators may drift")
+            return False
+
+        timestamps, values = frame_arrays(df)
+        if not reseed and timestamps[0] > last:
+            reseed = True  # REST không trả về đủ lùi tới nến cuối trong buffer
+        if before is not None:
+            keep = timestamps < before
+            timestamps, values = timestamps[keep], values[keep]
+        if reseed:
+            self._reset_series(symbol, interval)
+            stats['reseeds'] += 1
+        else:
+            keep = timestamps >= last
+            timestamps, values = timestamps[keep], values[keep]
+
+        buffer = self.buffer(symbol, interval)
+        for open_time, row in zip(timestamps.tolist(), values):
+            buffer.update(open_time, row)
+
+        self._mark_closed(symbol, interval, timestamps if before is not None else timestamps[:-1])
+        self._advance_engine(symbol, interval)
+        stats['backfills'] += 1
+        stats['candles'] += len(timestamps)
+        return True
+
+    def resync(self):
+        """Tải bù mọi chuỗi sau khi kết nối lại (các nến đóng trong lúc mất kết nối)"""
+        for symbol, interval in list(self.buffers):
+            self.backfill(symbol, interval)
+
+    def indicators(self, symbol, interval):
+        """Giá trị chỉ báo tăng dần mới nhất (sau nến đóng gần nhất) của một chuỗi"""
+        if self.engines is None or (symbol, interval) not in self.engines:
+            return None
+        return self.engines[(symbol, interval)].values
+
+    def indicator_frame(self, symbol, interval, min_candles=50):
+        """
+        Frame chỉ báo vài nến cuối lấy từ engine tăng dần (xem IncrementalIndicatorEngine.frame)
+        None nếu chuỗi chưa có engine hoặc chưa đủ min_candles nến như calculate_advanced_indicators
+        """
+        engine = None if self.engines is None else self.engines.get((symbol, interval))
+        if engine is None or engine.count < min_candles:
+            return None
+        return engine.frame()
+
+    def on_candle_close(self, handler):
+        """handler(symbol, interval, consumer) được gọi mỗi khi một nến đóng"""
+        self.handlers.append(handler)
+
+    def process(self, message):
+        if message.get('e') == RECONNECT_EVENT:
+            self.resync()
+            return
+        parsed = parse_kline_event(message)
+        if parsed is None:
+            return
+        symbol, interval, open_time, ohlcv, is_closed = parsed
+        key = (symbol, interval)
+
+        last = self.buffer(symbol, interval).last_timestamp()
+        if last is not None and open_time - last > interval_to_ms(interval):
+            # Nến nhảy quá một bước -> đã lỡ sự kiện, tải bù trước khi ghi nến mới
+            self.backfill(symbol, interval, before=open_time)
+
+        if not self.buffer(symbol, interval).update(open_time, ohlcv):
+            return
+        # Chỉ chạy handler khi có nến mới đóng (bỏ sự kiện đóng trùng lặp)
+        if not is_closed or open_time <= self._closed.get(key, -1):
+            return
+
+        self._closed[key] = open_time
+        self._advance_engine(symbol, interval)
+        for handler in self.handlers:
+            handler(symbol, interval, self)
+
+    def run(self, source, stop_event=None):
+        """Tiêu thụ sự kiện từ source (iterable) cho tới khi hết hoặc stop_event được set"""
+        for message in source:
+            if stop_event is not None and stop_event.is_set():
+                break
+            self.process(message)
+
+
+class BinanceWebSocketSource:
+    """Nguồn sự kiện kline từ Binance combined stream (cần websocket-client)"""
+
+    def __init__(self, subscriptions, url=BINANCE_STREAM_URL, reconnect_delay=5):
+        if websocket is None:
+            raise ImportError("websocket-client is required for BinanceWebSocketSource")
+        streams = [f"{symbol.lower()}@kline_{interval}" for symbol, interval in subscriptions]
+        self.url = f"{url}?streams={'/'.join(streams)}"
+        self.reconnect_delay = reconnect_delay
+
+    def __iter__(self):
+        connected = False
+        while True:
+            ws = None
+            try:
+                ws = websocket.create_connection(self.url, timeout=60)
+                if connected:
+                    # Báo cho consumer tải bù các nến đóng trong lúc mất kết nối
+                    yield {'e': RECONNECT_EVENT}
+                connected = True
+                while True:
+                    yield json.loads(ws.recv())
+            except (websocket.WebSocketException, OSError, ValueError):
+                # Binance ngắt kết nối sau 24h hoặc khi mạng lỗi -> kết nối lại
+                time.sleep(self.reconnect_delay)
+            finally:
+                if ws is not None:
+                    ws.close()
+
+
+class ReplayKlineSource:
+    """Nguồn sự kiện giả lập từ DataFrame nến lịch sử - dùng để test không cần mạng"""
+
+    def __init__(self, frames, ticks_per_candle=2, delay=0.0):
+        """frames: {(symbol, interval): df dạng get_kline_data}"""
+        self.frames = frames
+        self.ticks_per_candle = max(1, ticks_per_candle)
+        self.delay = delay
+
+    def _events(self):
+        events = []
+        for (symbol, interval), df in self.frames.items():
+            step = interval_to_ms(interval)
+            ts, values = frame_arrays(df)
+
+            for open_time, (o, h, l, c, v) in zip(ts, values):
+                close_time = int(open_time) + step - 1
+                for tick in range(1, self.ticks_per_candle + 1):
+                    frac = tick / self.ticks_per_candle
+                    is_closed = tick == self.ticks_per_candle
+                    event_time = int(open_time) + int((step - 1) * frac)
+                    events.append((event_time, is_closed, {
+                        'e': 'kline', 'E': event_time, 's': symbol,
+                        'k': {
+                            't': int(open_time), 'T': close_time, 's': symbol, 'i': interval,
+                            'o': str(o), 'h': str(h), 'l': str(l),
+                            'c': str(c if is_closed else o + (c - o) * frac),
+                            'v': str(v * frac), 'x': is_closed
+                        }
+                    }))
+
+        # Sắp theo thời gian sự kiện, cập nhật dở dang trước sự kiện đóng nến
+        events.sort(key=lambda e: (e[0], e[1]))
+        return [event for _, _, event in events]
+
+    def __iter__(self):
+        for event in self._events():
+            if self.delay:
+                time.sleep(self.delay)
+            yield event
+
+
+class StreamAnalysisRunner:
+    """
+    Chạy analyze_single_pair_by_investment_type mỗi khi nến khung chính đóng
+    Chỉ báo lấy từ engine tăng dần của consumer (không tính lại batch trên ring buffer);
+    filter symbol (tick size) được nạp trước khi stream để callback không gọi REST
+    """
+
+    def __init__(self, app, symbols, investment_type='60m', window=200, on_result=None):
+        self.app = app
+        self.symbols = list(symbols)
+        self.investment_type = investment_type
+        self.on_result = on_result
+
+        config = app.investment_types[investment_type]
+        self.main_timeframe = config['timeframe']
+        self.intervals = list(dict.fromkeys([self.main_timeframe] + config['analysis_timeframes']))
+
+        self.consumer = KlineStreamConsumer(window, backfill_fn=app.get_kline_data,
+                                            engine_params=app.indicator_params())
+        self.consumer.on_candle_close(self._handle_close)
+
+    def subscriptions(self):
+        return [(symbol, interval) for symbol in self.symbols for interval in self.intervals]
+
+    def seed_from_rest(self):
+        """Nạp lịch sử ban đầu một lần qua REST (song song)"""
+        jobs = [(symbol, interval, self.consumer.window) for symbol, interval in self.subscriptions()]
+        for (symbol, interval, _), df in self.app.fetcher.fetch_all(jobs).items():
+            self.consumer.seed(symbol, interval, df)
+
+    def _handle_close(self, symbol, interval, consumer):
+        if interval != self.main_timeframe:
+            return
+
+        memo = AnalysisRunMemo()
+        for tf in self.intervals:
+            memo.frames[(symbol, tf)] = consumer.indicator_frame(symbol, tf)
+        result = self.app.analyze_single_pair_by_investment_type(symbol, self.investment_type, memo)
+        if result and self.on_result:
+            self.on_result(result)
+
+    def run(self, source=None, stop_event=None, seed=True):
+        """Chạy vòng lặp streaming (mặc định dùng Binance WebSocket)"""
+        try:
+            self.app.symbol_index.get()
+        except Exception:
+            pass  # round_to_tick giữ nguyên giá khi không có exchangeInfo
+        if seed:
+            self.seed_from_rest()
+        if source is None:
+            source = BinanceWebSocketSource(self.subscriptions())
+        self.consumer.run(source, stop_event)
@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Cache dữ liệu toàn thị trường dùng chung giữa các request
+- Ticker 24h: snapshot có TTL, view xếp hạng theo base currency tính sẵn mỗi lần refresh
+- exchangeInfo: index metadata symbol (base/quote asset, status, tick size, lot size)
+Cả hai đều refresh theo kiểu single-flight: chỉ một thread tải, các thread khác chờ
+"""
+
+import threading
+import time
+from decimal import Decimal, ROUND_HALF_UP
+
+# Hậu tố của leveraged token (vd BTCUP, ETHBEAR)
+LEVERAGED_SUFFIXES = ('UP', 'DOWN', 'BULL', 'BEAR')
+
+
+class SingleFlightCache:
+    """Cache TTL một giá trị, refresh single-flight, giữ giá trị cũ khi refresh lỗi"""
+
+    def __init__(self, load_fn, ttl=60, wait_timeout=60, error_backoff=30):
+        """load_fn() -> giá trị mới (gọi khi hết hạn, chỉ từ một thread)"""
+        self.load_fn = load_fn
+        self.ttl = ttl
+        self.wait_timeout = wait_timeout
+        self.error_backoff = error_backoff
+
+        self._value = None
+        self._loaded_at = 0
+        self._failed_at = 0
+        self._refreshing = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self):
+        return self._value is not None and time.time() - self._loaded_at < self.ttl
+
+    def get(self, background=False):
+        """
+        Trả về giá trị còn hạn; nếu hết hạn chỉ một thread tải lại,
+        các thread khác chờ kết quả của lần tải đó
+        background: đã có giá trị cũ thì trả ngay giá trị đó, việc tải lại chạy ở thread nền
+        """
+        with self._lock:
+            if self._is_fresh():
+                return self._value
+            current = self._value
+            if time.time() - self._failed_at < self.error_backoff:
+                # Vừa tải lỗi - không gọi lại API ngay, dùng giá trị cũ nếu có
+                if current is None:
+                    raise RuntimeError(f"{type(self).__name__} unavailable")
+                return current
+
+            if self._refreshing is None:
+                self._refreshing = threading.Event()
+                event, is_leader = self._refreshing, True
+            else:
+                event, is_leader = self._refreshing, False
+
+        if background and current is not None:
+            if is_leader:
+                threading.Thread(target=self._refresh, args=(event, current), daemon=True).start()
+            return current
+
+        if not is_leader:
+            event.wait(self.wait_timeout)
+            with self._lock:
+                if self._value is None:
+                    raise RuntimeError(f"{type(self).__name__} unavailable")
+                return self._value
+
+        self._refresh(event, current)
+        return self._value
+
+    def _refresh(self, event, current):
+        try:
+            fresh = self.load_fn()
+            with self._lock:
+                self._value = fresh
+                self._loaded_at = time.time()
+        except Exception:
+            # Lỗi mạng: dùng giá trị cũ nếu có, nếu không thì báo lỗi cho caller
+            with self._lock:
+                self._failed_at = time.time()
+            if current is None:
+                raise
+        finally:
+            with self._lock:
+                self._refreshing = None
+            event.set()
+
+    def invalidate(self):
+        with self._lock:
+            self._loaded_at = 0
+
+
+class TickerSnapshot:
+    """Một lần tải /ticker/24hr cùng các view đã xếp hạng"""
+
+    def __init__(self, tickers, fetched_at):
+        self.tickers = tickers
+        self.fetched_at = fetched_at
+        self.views = {}
+
+
+class TickerSnapshotCache(SingleFlightCache):
+    """Cache TTL cho ticker 24h"""
+
+    def __init__(self, fetch_fn, build_view_fn, ttl=60, precompute=(), wait_timeout=60):
+        """
+        fetch_fn() -> list ticker thô
+        build_view_fn(tickers, base_currency) -> list coin đã lọc và xếp hạng
+        """
+        super().__init__(self._load_snapshot, ttl, wait_timeout)
+        self.fetch_fn = fetch_fn
+        self.build_view_fn = build_view_fn
+        self.precompute = list(precompute)
+
+    def _load_snapshot(self):
+        tickers = self.fetch_fn()
+        snapshot = TickerSnapshot(tickers, time.time())
+        for base_currency in self.precompute:
+            snapshot.views[base_currency] = self.build_view_fn(tickers, base_currency)
+        return snapshot
+
+    def snapshot(self):
+        return self.get()
+
+    def get_view(self, base_currency):
+        """View đã xếp hạng cho base currency (tính lười nếu chưa có trong snapshot)"""
+        snapshot = self.snapshot()
+        view = snapshot.views.get(base_currency)
+        if view is None:
+            view = self.build_view_fn(snapshot.tickers, base_currency)
+            snapshot.views[base_currency] = view
+        return view
+
+
+def _parse_symbol(raw):
+    """Rút gọn một phần tử 'symbols' của exchangeInfo"""
+    info = {
+        'symbol': raw['symbol'],
+        'baseAsset': raw['baseAsset'],
+        'quoteAsset': raw['quoteAsset'],
+        'status': raw.get('status'),
+        'tickSize': None,
+        'stepSize': None,
+        'minQty': None,
+        'minNotional': None,
+    }
+    for f in raw.get('filters', []):
+        filter_type = f.get('filterType')
+        if filter_type == 'PRICE_FILTER':
+            info['tickSize'] = f.get('tickSize')
+        elif filter_type == 'LOT_SIZE':
+            info['stepSize'] = f.get('stepSize')
+            info['minQty'] = f.get('minQty')
+        elif filter_type in ('NOTIONAL', 'MIN_NOTIONAL'):
+            info['minNotional'] = f.get('minNotional')
+    return info
+
+
+class SymbolIndexData:
+    """Dữ liệu index đã dựng từ một lần tải exchangeInfo"""
+
+    def __init__(self, symbols):
+        self.symbols = {}
+        self.by_quote = {}
+        self.base_assets = set()
+
+        for raw in symbols:
+            info = _parse_symbol(raw)
+            self.symbols[info['symbol']] = info
+            self.by_quote.setdefault(info['quoteAsset'], []).append(info['symbol'])
+            self.base_assets.add(info['baseAsset'])
+
+    def is_leveraged_token(self, base_asset):
+        """BTCUP/ETHBEAR... là leveraged token; JUP, SUPER thì không"""
+        for suffix in LEVERAGED_SUFFIXES:
+            if base_asset.endswith(suffix) and base_asset[:-len(suffix)] in self.base_assets:
+                return True
+        return False
+
+    def round_price(self, symbol, price):
+        """Làm tròn giá về bội số tick size gần nhất"""
+        info = self.symbols.get(symbol)
+        if info is None or not info['tickSize'] or float(info['tickSize']) == 0:
+            return price
+
+        tick = Decimal(info['tickSize'])
+        ticks = (Decimal(str(price)) / tick).to_integral_value(rounding=ROUND_HALF_UP)
+        return float(ticks * tick)
+
+
+class SymbolIndex(SingleFlightCache):
+    """Index metadata symbol từ /exchangeInfo, tra cứu O(1) theo symbol"""
+
+    def __init__(self, fetch_fn, ttl=3600, wait_timeout=60):
+        """fetch_fn() -> payload JSON của /api/v3/exchangeInfo"""
+        super().__init__(self._load_index, ttl, wait_timeout)
+        self.fetch_fn = fetch_fn
+
+    def _load_index(self):
+        return SymbolIndexData(self.fetch_fn().get('symbols', []))
+
+    def get_symbol(self, symbol):
+        return self.get().symbols.get(symbol)
+
+    def symbols_for_quote(self, quote_asset, trading_only=True):
+        data = self.get()
+        symbols = data.by_quote.get(quote_asset, [])
+        if trading_only:
+            symbols = [s for s in symbols if data.symbols[s]['status'] == 'TRADING']
+        return symbols
+
+    def round_price(self, symbol, price):
+        return self.get().round_price(symbol, price)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tính chỉ báo cho nhiều symbol cùng lúc trên panel OHLCV (symbols x time)
+Mỗi node của indicator_graph là một lần gọi kernel cho cả panel thay vì gọi
+calculate_advanced_indicators riêng cho từng symbol
+Cột và công thức giống hệt calculate_advanced_indicators (cùng các node của indicator_graph)
+"""
+
+import numpy as np
+import pandas as pd
+
+import indicator_graph
+
+PANEL_INPUTS = indicator_graph.CANDLE_COLUMNS
+
+
+def group_aligned(frames, min_length=50):
+    """
+    Gom các symbol có cùng chuỗi timestamp (cùng độ dài, cùng nến) để xếp chung một panel
+    frames: {symbol: df}. Frame None hoặc ngắn hơn min_length bị bỏ qua
+    """
+    groups = {}
+    for symbol, df in frames.items():
+        if df is None or len(df) < min_length:
+            continue
+        key = df['timestamp'].to_numpy().tobytes()
+        groups.setdefault(key, []).append(symbol)
+    return list(groups.values())
+
+
+def build_panel(frames, symbols):
+    """Xếp các cột OHLCV của những symbol đã căn thẳng hàng thành mảng (symbols x time)"""
+    return {col: np.vstack([frames[symbol][col].to_numpy(dtype=np.float64) for symbol in symbols])
+            for col in PANEL_INPUTS}
+
+
+def compute_panel_indicators(panel, columns=None, params=None):
+    """
+    Tính các cột chỉ báo của calculate_advanced_indicators cho panel (symbols x time)
+    columns: chỉ tính bao đóng phụ thuộc của các cột này (mặc định: tất cả)
+    params: tham số market pattern (xem indicator_graph.evaluate)
+    Trả về dict {column: array 2 chiều} theo đúng thứ tự cột của hàm gốc
+    """
+    return indicator_graph.evaluate(panel, columns, params)
+
+
+def panel_frames(frames, symbols, indicators):
+    """Gắn kết quả panel vào bản sao DataFrame của từng symbol (cùng dạng calculate_advanced_indicators)"""
+    result = {}
+    for i, symbol in enumerate(symbols):
+        df = frames[symbol]
+        columns = pd.DataFrame({col: values[i] for col, values in indicators.items()}, index=df.index)
+        result[symbol] = pd.concat([df, columns], axis=1)
+    return result
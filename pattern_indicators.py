@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Chỉ báo theo tham số của các market pattern (rsi_period, atr_period, ema_fast, ema_slow,
+bb_period, bb_std) tính chung trong một lượt
+
+Tính hợp các tham số của mọi pattern: phần dùng chung (gain/loss của RSI, true range,
+rolling mean/std theo bb_period) chỉ tính một lần, mỗi chu kỳ/span trùng nhau giữa các
+pattern chỉ tính một lần. view(pattern) lấy bộ chỉ báo của một pattern, không tính lại
+"""
+
+import numpy as np
+
+import indicator_kernels as k
+
+PATTERN_PARAM_KEYS = ('rsi_period', 'atr_period', 'ema_fast', 'ema_slow', 'bb_period', 'bb_std')
+
+# Tham số của pattern "default" - cũng là tham số mặc định của indicator_graph
+DEFAULT_PATTERN_PARAMS = {'rsi_period': 14, 'atr_period': 14, 'ema_fast': 12, 'ema_slow': 26,
+                          'bb_period': 20, 'bb_std': 2.0}
+
+
+def pattern_params(pattern):
+    """Chỉ các tham số chỉ báo (PATTERN_PARAM_KEYS) của một market pattern"""
+    return {key: pattern[key] for key in PATTERN_PARAM_KEYS}
+
+
+def parameter_union(patterns):
+    """patterns: {name: params} -> các chu kỳ/span cần tính cho tất cả pattern"""
+    union = {'rsi': set(), 'atr': set(), 'ema': set(), 'bb': set()}
+    for params in patterns.values():
+        union['rsi'].add(params['rsi_period'])
+        union['atr'].add(params['atr_period'])
+        union['ema'].update((params['ema_fast'], params['ema_slow']))
+        union['bb'].add((params['bb_period'], params['bb_std']))
+    return {key: sorted(values) for key, values in union.items()}
+
+
+class PatternIndicatorSet:
+    """Chỉ báo của hợp tham số mọi pattern trên một frame nến"""
+
+    def __init__(self, high, low, close, patterns):
+        high, low, close = (np.asarray(values, dtype=np.float64) for values in (high, low, close))
+        self.patterns = patterns
+        union = parameter_union(patterns)
+
+        # Phần dùng chung giữa các chu kỳ
+        changes = k.price_changes(close)
+        tr = k.true_range(high, low, close)
+
+        self.rsi = {period: k.rsi(close, period, changes=changes) for period in union['rsi']}
+        self.atr = {period: k.atr(high, low, close, period, tr=tr) for period in union['atr']}
+        self.ema = {span: k.ema(close, span) for span in union['ema']}
+
+        # Bollinger: mean/std theo bb_period dùng chung cho mọi bb_std
+        bb_periods = sorted({period for period, _ in union['bb']})
+        middles = {period: k.rolling_mean(close, period) for period in bb_periods}
+        stds = {period: k.rolling_std(close, period) for period in bb_periods}
+        self.bb = {}
+        for period, num_std in union['bb']:
+            width = stds[period] * num_std
+            self.bb[(period, num_std)] = (middles[period] + width, middles[period], middles[period] - width)
+
+    def view(self, pattern_name):
+        """Bộ chỉ báo của một pattern: {'RSI', 'ATR', 'ema_fast', 'ema_slow', 'BB_upper', 'BB_middle', 'BB_lower'}"""
+        params = self.patterns[pattern_name]
+        upper, middle, lower = self.bb[(params['bb_period'], params['bb_std'])]
+        return {
+            'RSI': self.rsi[params['rsi_period']],
+            'ATR': self.atr[params['atr_period']],
+            'ema_fast': self.ema[params['ema_fast']],
+            'ema_slow': self.ema[params['ema_slow']],
+            'BB_upper': upper,
+            'BB_middle': middle,
+            'BB_lower': lower
+        }
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Index các mức giá hỗ trợ/kháng cự của nến cuối cho tính TP/SL
+
+Gộp mức pivot, rolling high/low, volume-weighted, EMA, VWAP và Fibonacci vào một mảng
+đã sắp xếp, mỗi mức gắn nguồn (tên cột). Tìm N mức gần nhất trên/dưới một giá và đếm
+mật độ cụm trong một khoảng bằng tìm kiếm nhị phân - dựng một lần cho mỗi frame rồi
+dùng cho nhiều giá entry
+"""
+
+import math
+
+import numpy as np
+
+RESISTANCE_SOURCES = ('resistance', 'resistance_weak', 'resistance_strong', 'r1', 'r2',
+                      'vw_resistance', 'ema_resistance')
+SUPPORT_SOURCES = ('support', 'support_weak', 'support_strong', 's1', 's2',
+                   'vw_support', 'ema_support')
+FIB_SOURCES = ('fib_236', 'fib_382', 'fib_500', 'fib_618')
+
+LEVEL_COLUMNS = RESISTANCE_SOURCES + SUPPORT_SOURCES + ('vwap',)
+
+
+class PriceLevelIndex:
+    """Các mức giá đã sắp xếp tăng dần, kèm nguồn; truy vấn lọc theo tập nguồn"""
+
+    def __init__(self, levels):
+        """levels: {source: price} - bỏ qua mức NaN/None"""
+        items = []
+        for source, price in levels.items():
+            if price is None:
+                continue
+            price = float(price)
+            if not math.isnan(price):
+                items.append((source, price))
+        # Sắp xếp ổn định theo giá: mức trùng giá giữ thứ tự khai báo
+        items.sort(key=lambda item: item[1])
+        self.sources = [source for source, _ in items]
+        self.prices = np.array([price for _, price in items], dtype=np.float64)
+        self._views = {}
+
+    @classmethod
+    def from_row(cls, latest, fibonacci=None):
+        """Dựng index từ dòng chỉ báo của nến cuối (+ các mức Fibonacci nếu có)"""
+        levels = {col: latest[col] for col in LEVEL_COLUMNS if col in latest}
+        if fibonacci:
+            levels.update((col, fibonacci[col]) for col in FIB_SOURCES if col in fibonacci)
+        return cls(levels)
+
+    def _view(self, sources):
+        """(prices, sources) đã sắp xếp của riêng các nguồn được chọn - tính một lần mỗi tập nguồn"""
+        if sources is None:
+            return self.prices, self.sources
+        key = frozenset(sources)
+        view = self._views.get(key)
+        if view is None:
+            picked = [i for i, source in enumerate(self.sources) if source in key]
+            view = self._views[key] = (self.prices[picked], [self.sources[i] for i in picked])
+        return view
+
+    def above(self, price, n=None, sources=None):
+        """Các mức > price, gần nhất trước -> [(source, level)]"""
+        prices, names = self._view(sources)
+        start = int(np.searchsorted(prices, price, side='right'))
+        stop = len(prices) if n is None else min(len(prices), start + n)
+        return [(names[i], float(prices[i])) for i in range(start, stop)]
+
+    def below(self, price, n=None, sources=None):
+        """Các mức < price, gần nhất trước -> [(source, level)]"""
+        prices, names = self._view(sources)
+        stop = int(np.searchsorted(prices, price, side='left'))
+        start = 0 if n is None else max(0, stop - n)
+        return [(names[i], float(prices[i])) for i in range(stop - 1, start - 1, -1)]
+
+    def count_within(self, low, high, sources=None):
+        """Số mức trong [low, high] - mật độ cụm quanh một mức"""
+        prices, _ = self._view(sources)
+        return int(np.searchsorted(prices, high, side='right') - np.searchsorted(prices, low, side='left'))
+
+    def __len__(self):
+        return len(self.prices)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Rate limiter theo request weight của Binance
+Token bucket dùng chung giữa các thread và giữa các worker process
+(trạng thái lưu trong một file được khóa bằng fcntl.flock)
+"""
+
+import json
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows - chỉ chia sẻ được giữa các thread
+    fcntl = None
+
+# Weight của các endpoint đang dùng (theo tài liệu Binance REST API)
+TICKER_24HR_ALL_WEIGHT = 80
+EXCHANGE_INFO_WEIGHT = 20
+
+USED_WEIGHT_HEADER = 'X-MBX-USED-WEIGHT-1M'
+
+
+def klines_weight(limit):
+    """Weight của /api/v3/klines phụ thuộc vào limit"""
+    if limit < 100:
+        return 1
+    if limit < 500:
+        return 2
+    if limit <= 1000:
+        return 5
+    return 10
+
+
+class WeightRateLimiter:
+    """Token bucket theo weight, chỉ chặn khi ngân sách thực sự đã cạn"""
+
+    def __init__(self, weight_limit=6000, window_seconds=60, safety_margin=0.1,
+                 state_file='data/rate_limit.json'):
+        # Giữ lại một phần ngân sách cho các client khác dùng chung IP
+        self.capacity = weight_limit * (1 - safety_margin)
+        self.refill_rate = self.capacity / window_seconds
+        self.window_seconds = window_seconds
+        self.state_file = state_file
+        self._thread_lock = threading.Lock()
+        # Weight Binance báo về gần nhất, áp vào trạng thái chung ở lần acquire kế tiếp
+        self._observed_used = None
+
+    # ---------- shared state ----------
+
+    def _open_state(self):
+        directory = os.path.dirname(self.state_file)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        f = open(self.state_file, 'a+', encoding='utf-8')
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        return f
+
+    def _read_state(self, f, now):
+        f.seek(0)
+        try:
+            state = json.loads(f.read() or '{}')
+        except ValueError:
+            state = {}
+        state.setdefault('tokens', self.capacity)
+        state.setdefault('updated_at', now)
+        state.setdefault('blocked_until', 0)
+
+        # Nạp lại token theo thời gian đã trôi qua
+        elapsed = max(0.0, now - state['updated_at'])
+        state['tokens'] = min(self.capacity, state['tokens'] + elapsed * self.refill_rate)
+        state['updated_at'] = now
+        return state
+
+    def _write_state(self, f, state):
+        f.seek(0)
+        f.truncate()
+        f.write(json.dumps(state))
+        f.flush()
+
+    def _with_state(self, update_fn):
+        """Đọc - sửa - ghi trạng thái dưới khóa thread + khóa file"""
+        with self._thread_lock:
+            f = self._open_state()
+            try:
+                state = self._read_state(f, time.time())
+                result = update_fn(state)
+                self._write_state(f, state)
+                return result
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+                f.close()
+
+    # ---------- public API ----------
+
+    def acquire(self, weight=1):
+        """
+        Chờ tới khi đủ weight rồi trừ vào ngân sách
+        Weight header ghi nhận từ response trước được đồng bộ trong cùng lần khóa file
+        """
+        weight = min(weight, self.capacity)
+
+        def take(state):
+            now = state['updated_at']
+            used, self._observed_used = self._observed_used, None
+            if used is not None:
+                # Binance tính theo cửa sổ phút cố định - chỉ giảm token, không tăng
+                state['tokens'] = min(state['tokens'], self.capacity - used)
+            if state['blocked_until'] > now:
+                return state['blocked_until'] - now
+            if state['tokens'] >= weight:
+                state['tokens'] -= weight
+                return 0
+            return (weight - state['tokens']) / self.refill_rate
+
+        while True:
+            wait = self._with_state(take)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    def update_from_headers(self, headers):
+        """
+        Ghi nhận weight Binance báo về trong response header (chỉ trong bộ nhớ)
+        Ngân sách chung được đồng bộ ở lần acquire kế tiếp, không tốn thêm một lần khóa file
+        """
+        used = headers.get(USED_WEIGHT_HEADER) or headers.get('X-MBX-USED-WEIGHT')
+        if used is None:
+            return
+        try:
+            used = float(used)
+        except ValueError:
+            return
+
+        with self._thread_lock:
+            if self._observed_used is None or used > self._observed_used:
+                self._observed_used = used
+
+    def block_for(self, seconds):
+        """Tạm dừng mọi request (khi nhận 429/418 kèm Retry-After)"""
+        def block(state):
+            state['blocked_until'] = max(state['blocked_until'], state['updated_at'] + seconds)
+            state['tokens'] = min(state['tokens'], 0)
+
+        self._with_state(block)
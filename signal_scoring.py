@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""
+Bản vector hóa của calculate_enhanced_signal_score cho mọi nến của frame chỉ báo
+
+Mỗi nhánh if/elif của hàm gốc thành một mask boolean trên cả chuỗi; buy/sell score được
+cộng/nhân theo đúng thứ tự của hàm gốc nên giá trị ở nến cuối trùng từng bit. Tín hiệu
+(key của dict signals) gộp vào bitmask: SIGNAL_WORDS từ uint64 mỗi nến
+Fibonacci lấy theo từng nến từ high/low 50 nến (resistance_strong/support_strong) -
+ở nến cuối trùng với các mức Fibonacci của frame, ở nến cũ không nhìn trước tương lai
+Cột giữ nguyên dtype (float32 của frame compact) để phép so sánh giống hệt bản scalar
+"""
+
+import numpy as np
+
+import candlestick_patterns
+
+FIB_LEVELS = (('23.6%', 0.236), ('38.2%', 0.382), ('50.0%', 0.500), ('61.8%', 0.618))
+PIVOT_LEVELS = ('R3', 'R2', 'R1', 'PIVOT', 'S1', 'S2', 'S3')
+BULLISH_CANDLES = ('hammer', 'engulfing_bullish', 'morning_star')
+BEARISH_CANDLES = ('hanging_man', 'evening_star')
+
+STRONG_BULLISH_SIGNALS = ('ichimoku_bullish_cross', 'perfect_bullish_alignment',
+                          'macd_strong_bullish', 'fib_50.0%_bounce', 'obv_price_bullish_confirm')
+STRONG_BEARISH_SIGNALS = ('ichimoku_bearish_cross', 'perfect_bearish_alignment',
+                          'macd_strong_bearish', 'fib_50.0%_rejection', 'obv_price_bearish_confirm')
+
+SIGNAL_NAMES = [
+    'very_strong_trend', 'strong_trend', 'weak_trend',
+    'very_narrow_range', 'narrow_range', 'expanding_range',
+    'ichimoku_bullish_cross', 'ichimoku_bearish_cross',
+    'price_above_cloud', 'price_below_cloud', 'price_in_cloud',
+    'EMA_bullish_cross', 'EMA_bearish_cross', 'perfect_bullish_alignment', 'perfect_bearish_alignment',
+    'stoch_bullish_cross', 'stoch_bearish_cross', 'stoch_bullish_divergence', 'stoch_bearish_divergence',
+    'rsi_deep_oversold_recovery', 'rsi_oversold_recovery', 'rsi_neutral_bullish',
+    'rsi_overbought_decline', 'rsi_strong_decline',
+    'obv_price_bullish_confirm', 'obv_price_mild_bullish', 'obv_price_bearish_confirm', 'obv_price_mild_bearish',
+    'obv_bullish_divergence', 'obv_bearish_divergence',
+    'macd_strong_bullish', 'macd_bullish_improving', 'macd_weak_bullish',
+    'macd_strong_bearish', 'macd_bearish_deteriorating', 'macd_weak_bearish',
+    'macd_above_zero', 'macd_below_zero',
+]
+SIGNAL_NAMES += ['fib_23.6%_mild_bounce', 'fib_23.6%_mild_rejection']
+SIGNAL_NAMES += ['fib_%s_%s' % (name, kind) for name, _ in FIB_LEVELS[1:] for kind in ('bounce', 'rejection')]
+SIGNAL_NAMES += ['%s_%s' % (pattern, suffix) for pattern in BULLISH_CANDLES
+                 for suffix in ('at_support', 'volume_confirm')]
+SIGNAL_NAMES += ['bullish_%s' % pattern for pattern in BULLISH_CANDLES]
+SIGNAL_NAMES += ['%s_at_resistance' % pattern for pattern in BEARISH_CANDLES]
+SIGNAL_NAMES += ['bearish_%s' % pattern for pattern in BEARISH_CANDLES]
+SIGNAL_NAMES += ['doji_indecision']
+SIGNAL_NAMES += ['pivot_%s_bounce' % level for level in ('S1', 'S2', 'S3', 'PIVOT')]
+SIGNAL_NAMES += ['pivot_%s_rejection' % level for level in ('R1', 'R2', 'R3', 'PIVOT')]
+SIGNAL_NAMES += ['strong_bullish_consensus', 'strong_bearish_consensus']
+
+SIGNAL_BITS = {name: bit for bit, name in enumerate(SIGNAL_NAMES)}
+SIGNAL_WORDS = (len(SIGNAL_NAMES) + 63) // 64
+
+
+def _prev(values, periods=1):
+    """Giá trị `periods` nến trước, giữ dtype; chỗ trống là NaN"""
+    result = np.full(values.shape, np.nan, dtype=values.dtype)
+    if periods < len(values):
+        result[periods:] = values[:len(values) - periods]
+    return result
+
+
+def _known(*arrays):
+    """Không cột nào là NaN (tương đương chuỗi `not pd.isna(...)` của bản scalar)"""
+    mask = ~np.isnan(arrays[0])
+    for values in arrays[1:]:
+        mask &= ~np.isnan(values)
+    return mask
+
+
+def fibonacci_history(close, recent_high, recent_low):
+    """Các mức Fibonacci theo từng nến từ high/low 50 nến, như node fib_* của indicator_graph"""
+    missing = np.isnan(recent_high) | np.isnan(recent_low)
+    diff = recent_high - recent_low
+    return {name: np.where(missing, close, recent_high - (diff * ratio)) for name, ratio in FIB_LEVELS}
+
+
+def signal_dict(words):
+    """Bitmask của một nến -> dict signals như bản scalar ({name: True})"""
+    return {name: True for name, bit in SIGNAL_BITS.items()
+            if int(words[bit // 64]) >> (bit % 64) & 1}
+
+
+class _Signals:
+    def __init__(self, n):
+        self.flags = np.zeros((len(SIGNAL_NAMES), n), dtype=bool)
+
+    def set(self, name, mask):
+        self.flags[SIGNAL_BITS[name]] |= mask
+
+    def get(self, name):
+        return self.flags[SIGNAL_BITS[name]]
+
+    def pack(self):
+        words = np.zeros((self.flags.shape[1], SIGNAL_WORDS), dtype=np.uint64)
+        for bit, flags in enumerate(self.flags):
+            words[:, bit // 64] |= flags.astype(np.uint64) << np.uint64(bit % 64)
+        return words
+
+
+def score_history(df):
+    """
+    buy_score, sell_score, signals cho từng nến của frame chỉ báo (calculate_advanced_indicators)
+    -> (buy_score, sell_score, signal words (n x SIGNAL_WORDS)). Hai nến đầu luôn là 0
+    """
+    col = {name: df[name].to_numpy() for name in df.columns}
+    close = col['close']
+    n = len(close)
+    prev = {name: _prev(values) for name, values in col.items() if values.dtype.kind == 'f'}
+    prev_close = prev['close']
+
+    signals = _Signals(n)
+    buy = np.zeros(n)
+    sell = np.zeros(n)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        # === MARKET CONDITION ANALYSIS ===
+        adx = col['ADX']
+        adx_known = ~np.isnan(adx)
+        very_strong = adx_known & (adx > 30)
+        strong = adx_known & ~very_strong & (adx > 25)
+        moderate = adx_known & ~very_strong & ~strong & (adx > 20)
+        weak = adx_known & ~very_strong & ~strong & ~moderate
+        adx_strength = np.select([very_strong, strong, weak], [1.5, 1.3, 0.6], 1.0)
+        signals.set('very_strong_trend', very_strong)
+        signals.set('strong_trend', strong)
+        signals.set('weak_trend', weak)
+
+        bb_known = _known(col['BB_width'], col['BB_width_sma'])
+        bb_width_ratio = col['BB_width'] / col['BB_width_sma']
+        very_narrow = bb_known & (bb_width_ratio < 0.7)
+        narrow = bb_known & ~very_narrow & (bb_width_ratio < 0.8)
+        expanding = bb_known & ~very_narrow & ~narrow & (bb_width_ratio > 1.3)
+        sideway_penalty = np.select([very_narrow, narrow, expanding], [0.3, 0.5, 1.2], 1.0)
+        signals.set('very_narrow_range', very_narrow)
+        signals.set('narrow_range', narrow)
+        signals.set('expanding_range', expanding)
+
+        # === 1. ICHIMOKU CLOUD ANALYSIS ===
+        tenkan, kijun = col['tenkan_sen'], col['kijun_sen']
+        ichimoku_known = _known(tenkan, kijun)
+        bullish_cross = ichimoku_known & (tenkan > kijun) & (prev['tenkan_sen'] <= prev['kijun_sen'])
+        bearish_cross = ichimoku_known & ~bullish_cross & (tenkan < kijun) & (prev['tenkan_sen'] >= prev['kijun_sen'])
+        volume_ratio = col['volume_ratio']
+        volume_confirm = ~np.isnan(volume_ratio) & (volume_ratio > 1.2)
+        volume_boost = np.where(volume_confirm, 1.3, 1.0)
+        buy = np.where(bullish_cross, buy + 5 * adx_strength * volume_boost, buy)
+        sell = np.where(bearish_cross, sell + 5 * adx_strength, sell)
+        signals.set('ichimoku_bullish_cross', bullish_cross)
+        signals.set('ichimoku_bearish_cross', bearish_cross)
+
+        span_a, span_b = col['senkou_span_a'], col['senkou_span_b']
+        cloud_known = ichimoku_known & _known(span_a, span_b)
+        cloud_top = np.maximum(span_a, span_b)
+        cloud_bottom = np.minimum(span_a, span_b)
+        cloud_thickness = (cloud_top - cloud_bottom) / close
+        cloud_bonus = np.where(cloud_thickness > 0.02, 1.2, 1.0)
+        above_cloud = cloud_known & (close > cloud_top)
+        below_cloud = cloud_known & ~above_cloud & (close < cloud_bottom)
+        in_cloud = cloud_known & ~above_cloud & ~below_cloud & (cloud_bottom <= close) & (close <= cloud_top)
+        buy = np.where(above_cloud, buy + 4 * adx_strength * cloud_bonus, buy)
+        sell = np.where(below_cloud, sell + 4 * adx_strength * cloud_bonus, sell)
+        buy = np.where(in_cloud, buy * 0.7, buy)
+        sell = np.where(in_cloud, sell * 0.7, sell)
+        signals.set('price_above_cloud', above_cloud)
+        signals.set('price_below_cloud', below_cloud)
+        signals.set('price_in_cloud', in_cloud)
+
+        # === 2. WEIGHTED MULTI-TIMEFRAME EMA ANALYSIS ===
+        ema_10, ema_20, ema_50 = col['EMA_10'], col['EMA_20'], col['EMA_50']
+        ema_known = _known(ema_10, ema_20, ema_50)
+        ema_bullish = ema_known & (ema_10 > ema_20) & (prev['EMA_10'] <= prev['EMA_20'])
+        ema_bearish = ema_known & ~ema_bullish & (ema_10 < ema_20) & (prev['EMA_10'] >= prev['EMA_20'])
+        bullish_strength = np.minimum(((ema_10 - ema_20) / close) * 1000, 2.0)
+        bearish_strength = np.minimum(((ema_20 - ema_10) / close) * 1000, 2.0)
+        buy = np.where(ema_bullish, buy + 3.5 * adx_strength * (1 + bullish_strength), buy)
+        sell = np.where(ema_bearish, sell + 3.5 * adx_strength * (1 + bearish_strength), sell)
+        signals.set('EMA_bullish_cross', ema_bullish)
+        signals.set('EMA_bearish_cross', ema_bearish)
+
+        bullish_alignment = ema_known & (close > ema_10) & (ema_10 > ema_20) & (ema_20 > ema_50)
+        bearish_alignment = ema_known & ~bullish_alignment & (close < ema_10) & (ema_10 < ema_20) & (ema_20 < ema_50)
+        rising = (ema_10 > prev['EMA_10']) & (ema_20 > prev['EMA_20']) & (ema_50 > prev['EMA_50'])
+        falling = (ema_10 < prev['EMA_10']) & (ema_20 < prev['EMA_20']) & (ema_50 < prev['EMA_50'])
+        buy = np.where(bullish_alignment, buy + 3 * adx_strength * np.where(rising, 1.5, 1.0), buy)
+        sell = np.where(bearish_alignment, sell + 3 * adx_strength * np.where(falling, 1.5, 1.0), sell)
+        signals.set('perfect_bullish_alignment', bullish_alignment)
+        signals.set('perfect_bearish_alignment', bearish_alignment)
+
+        # === 3. ADVANCED STOCHASTIC OSCILLATOR ANALYSIS ===
+        stoch_k, stoch_d = col['stoch_k'], col['stoch_d']
+        stoch_known = _known(stoch_k, stoch_d)
+        stoch_bullish = stoch_known & (stoch_k > stoch_d) & (prev['stoch_k'] <= prev['stoch_d'])
+        stoch_bearish = stoch_known & ~stoch_bullish & (stoch_k < stoch_d) & (prev['stoch_k'] >= prev['stoch_d'])
+        bullish_level = np.select([stoch_k < 30, stoch_k < 50], [4, 3], 1.5)
+        bearish_level = np.select([stoch_k > 70, stoch_k > 50], [4, 3], 1.5)
+        buy = np.where(stoch_bullish, buy + bullish_level * adx_strength, buy)
+        sell = np.where(stoch_bearish, sell + bearish_level * adx_strength, sell)
+        signals.set('stoch_bullish_cross', stoch_bullish)
+        signals.set('stoch_bearish_cross', stoch_bearish)
+
+        # Divergence trên 10 nến (cần ít nhất 10 nến)
+        has_history = np.arange(n) >= 9
+        stoch_trend = stoch_k - _prev(stoch_k, 9)
+        price_trend = close - _prev(close, 9)
+        stoch_bull_div = (stoch_known & has_history & (price_trend < 0) & (stoch_trend > 0) & (stoch_k < 40))
+        stoch_bear_div = (stoch_known & has_history & ~stoch_bull_div &
+                          (price_trend > 0) & (stoch_trend < 0) & (stoch_k > 60))
+        buy = np.where(stoch_bull_div, buy + 2.5 * adx_strength, buy)
+        sell = np.where(stoch_bear_div, sell + 2.5 * adx_strength, sell)
+        signals.set('stoch_bullish_divergence', stoch_bull_div)
+        signals.set('stoch_bearish_divergence', stoch_bear_div)
+
+        # === 4. ENHANCED RSI WITH MULTI-LEVEL ANALYSIS ===
+        rsi = col['RSI']
+        rsi_momentum = rsi - prev['RSI']
+        rsi_known = _known(rsi, prev['RSI'])
+        rsi_cases = [
+            ('rsi_deep_oversold_recovery', (rsi < 25) & (rsi_momentum > 0), 3.5, True),
+            ('rsi_oversold_recovery', (rsi < 35) & (rsi_momentum > 1), 3, True),
+            ('rsi_neutral_bullish', (40 <= rsi) & (rsi <= 55) & (rsi_momentum > 0), 2, True),
+            ('rsi_overbought_decline', (rsi > 75) & (rsi_momentum < 0), 3.5, False),
+            ('rsi_strong_decline', (rsi > 65) & (rsi_momentum < -1), 3, False),
+        ]
+        remaining = rsi_known.copy()
+        for name, condition, weight, is_buy in rsi_cases:
+            hit = remaining & condition
+            remaining &= ~hit
+            if is_buy:
+                buy = np.where(hit, buy + weight * adx_strength, buy)
+            else:
+                sell = np.where(hit, sell + weight * adx_strength, sell)
+            signals.set(name, hit)
+
+        # === 5. ENHANCED VOLUME ANALYSIS WITH OBV ===
+        obv, obv_sma = col['OBV'], col['OBV_sma']
+        obv_known = _known(obv, obv_sma, prev['OBV'])
+        obv_momentum = obv - prev['OBV']
+        price_momentum = close - prev_close
+        both_rising = obv_known & (obv_momentum > 0) & (price_momentum > 0)
+        both_falling = obv_known & ~both_rising & (obv_momentum < 0) & (price_momentum < 0)
+        obv_bull_div = obv_known & ~both_rising & ~both_falling & (obv_momentum > 0) & (price_momentum < 0)
+        obv_bear_div = (obv_known & ~both_rising & ~both_falling & ~obv_bull_div &
+                        (obv_momentum < 0) & (price_momentum > 0))
+        buy = np.where(both_rising, buy + np.where(obv > obv_sma, 3, 2) * adx_strength, buy)
+        sell = np.where(both_falling, sell + np.where(obv < obv_sma, 3, 2) * adx_strength, sell)
+        buy = np.where(obv_bull_div, buy + 2 * adx_strength, buy)
+        sell = np.where(obv_bear_div, sell + 2 * adx_strength, sell)
+        signals.set('obv_price_bullish_confirm', both_rising & (obv > obv_sma))
+        signals.set('obv_price_mild_bullish', both_rising & ~(obv > obv_sma))
+        signals.set('obv_price_bearish_confirm', both_falling & (obv < obv_sma))
+        signals.set('obv_price_mild_bearish', both_falling & ~(obv < obv_sma))
+        signals.set('obv_bullish_divergence', obv_bull_div)
+        signals.set('obv_bearish_divergence', obv_bear_div)
+
+        # === 6. ENHANCED MACD ANALYSIS ===
+        macd, macd_signal, macd_hist = col['MACD'], col['MACD_signal'], col['MACD_hist']
+        macd_known = _known(macd, macd_signal, macd_hist, prev['MACD_hist'])
+        hist_momentum = macd_hist - prev['MACD_hist']
+        macd_bullish = macd_known & (macd > macd_signal) & (prev['MACD'] <= prev['MACD_signal'])
+        macd_bearish = macd_known & ~macd_bullish & (macd < macd_signal) & (prev['MACD'] >= prev['MACD_signal'])
+        zero_up = macd_known & ~macd_bullish & ~macd_bearish & (macd > 0) & (prev['MACD'] <= 0)
+        zero_down = macd_known & ~macd_bullish & ~macd_bearish & ~zero_up & (macd < 0) & (prev['MACD'] >= 0)
+
+        strong_bull = (macd_hist > 0) & (hist_momentum > 0)
+        improving = ~strong_bull & (hist_momentum > 0)
+        strong_bear = (macd_hist < 0) & (hist_momentum < 0)
+        deteriorating = ~strong_bear & (hist_momentum < 0)
+        buy = np.where(macd_bullish, buy + np.select([strong_bull, improving], [4, 3], 2) * adx_strength, buy)
+        sell = np.where(macd_bearish, sell + np.select([strong_bear, deteriorating], [4, 3], 2) * adx_strength, sell)
+        buy = np.where(zero_up, buy + 2.5 * adx_strength, buy)
+        sell = np.where(zero_down, sell + 2.5 * adx_strength, sell)
+        signals.set('macd_strong_bullish', macd_bullish & strong_bull)
+        signals.set('macd_bullish_improving', macd_bullish & improving)
+        signals.set('macd_weak_bullish', macd_bullish & ~strong_bull & ~improving)
+        signals.set('macd_strong_bearish', macd_bearish & strong_bear)
+        signals.set('macd_bearish_deteriorating', macd_bearish & deteriorating)
+        signals.set('macd_weak_bearish', macd_bearish & ~strong_bear & ~deteriorating)
+        signals.set('macd_above_zero', zero_up)
+        signals.set('macd_below_zero', zero_down)
+
+        # === 7. FIBONACCI RETRACEMENT ANALYSIS ===
+        fib = fibonacci_history(close, col['resistance_strong'], col['support_strong'])
+        remaining = _known(*fib.values())
+        price_up = close > prev_close
+        price_down = ~price_up & (close < prev_close)
+        for fib_name, _ in FIB_LEVELS:
+            # Mức đầu tiên trong 0.8% quyết định (break của bản scalar)
+            hit = remaining & ((np.abs(close - fib[fib_name]) / close) < 0.008)
+            remaining &= ~hit
+            weight = 2 if fib_name == '23.6%' else 3
+            suffix = '_mild' if fib_name == '23.6%' else ''
+            buy = np.where(hit & price_up, buy + weight * adx_strength, buy)
+            sell = np.where(hit & price_down, sell + weight * adx_strength, sell)
+            signals.set('fib_%s%s_bounce' % (fib_name, suffix), hit & price_up)
+            signals.set('fib_%s%s_rejection' % (fib_name, suffix), hit & price_down)
+
+        # === 8. ENHANCED CANDLESTICK PATTERN ANALYSIS ===
+        if 'candle_patterns' in col:
+            candle_patterns = col['candle_patterns']
+        else:
+            candle_patterns = np.zeros(n, dtype=np.int32)
+        support, resistance = col['support'], col['resistance']
+        at_support = ~np.isnan(support) & ((np.abs(close - support) / close) < 0.015)
+        at_resistance = ~np.isnan(resistance) & ((np.abs(close - resistance) / close) < 0.015)
+
+        candlestick_signal_strength = np.zeros(n)
+        for pattern in BULLISH_CANDLES:
+            found = candlestick_patterns.has_pattern(candle_patterns, pattern)
+            pattern_strength = np.where(at_support, 2.5 * 1.5, 2.5)
+            pattern_strength = np.where(volume_confirm, pattern_strength * 1.2, pattern_strength)
+            candlestick_signal_strength = np.where(
+                found, candlestick_signal_strength + pattern_strength * adx_strength, candlestick_signal_strength)
+            signals.set('%s_at_support' % pattern, found & at_support)
+            signals.set('%s_volume_confirm' % pattern, found & volume_confirm)
+            signals.set('bullish_%s' % pattern, found)
+        buy = np.where(candlestick_signal_strength > 0, buy + candlestick_signal_strength, buy)
+
+        candlestick_signal_strength = np.zeros(n)
+        for pattern in BEARISH_CANDLES:
+            found = candlestick_patterns.has_pattern(candle_patterns, pattern)
+            pattern_strength = np.where(at_resistance, 2.5 * 1.5, 2.5)
+            pattern_strength = np.where(volume_confirm, pattern_strength * 1.2, pattern_strength)
+            candlestick_signal_strength = np.where(
+                found, candlestick_signal_strength + pattern_strength * adx_strength, candlestick_signal_strength)
+            signals.set('%s_at_resistance' % pattern, found & at_resistance)
+            signals.set('bearish_%s' % pattern, found)
+        sell = np.where(candlestick_signal_strength > 0, sell + candlestick_signal_strength, sell)
+
+        doji = candlestick_patterns.has_pattern(candle_patterns, 'doji')
+        buy = np.where(doji, buy * 0.7, buy)
+        sell = np.where(doji, sell * 0.7, sell)
+        signals.set('doji_indecision', doji)
+
+        # === 9. PIVOT POINTS ANALYSIS ===
+        r1, s1 = col['r1'], col['s1']
+        pivot_prices = {
+            'R3': col['r3'] if 'r3' in col else r1 * 1.1,
+            'R2': col['r2'] if 'r2' in col else r1 * 1.05,
+            'R1': r1,
+            'PIVOT': col['pivot'],
+            'S1': s1,
+            'S2': col['s2'] if 's2' in col else s1 * 0.95,
+            'S3': col['s3'] if 's3' in col else s1 * 0.9,
+        }
+        remaining = _known(col['pivot'], r1, s1)
+        for level_name in PIVOT_LEVELS:
+            level_price = pivot_prices[level_name]
+            usable = ~np.isnan(level_price) & (level_price != 0)
+            hit = remaining & usable & ((np.abs(close - level_price) / close) < 0.01)
+            remaining &= ~hit
+            if level_name in ('S1', 'S2', 'S3', 'PIVOT'):
+                bounce = hit & price_up
+                buy = np.where(bounce, buy + 3 * adx_strength, buy)
+                signals.set('pivot_%s_bounce' % level_name, bounce)
+            if level_name in ('R1', 'R2', 'R3', 'PIVOT'):
+                rejection = hit & price_down
+                sell = np.where(rejection, sell + 3 * adx_strength, sell)
+                signals.set('pivot_%s_rejection' % level_name, rejection)
+
+        # === 10. MARKET STRUCTURE ANALYSIS ===
+        buy = buy * sideway_penalty
+        sell = sell * sideway_penalty
+        buy_leads = buy > sell
+        buy = np.where(very_strong & buy_leads, buy * 1.2, buy)
+        sell = np.where(very_strong & ~buy_leads, sell * 1.2, sell)
+
+        # === 11. FINAL SIGNAL CONSENSUS CHECK ===
+        bullish_consensus = sum(signals.get(name).astype(int) for name in STRONG_BULLISH_SIGNALS) >= 3
+        buy = np.where(bullish_consensus, buy * 1.15, buy)
+        signals.set('strong_bullish_consensus', bullish_consensus)
+        bearish_consensus = sum(signals.get(name).astype(int) for name in STRONG_BEARISH_SIGNALS) >= 3
+        sell = np.where(bearish_consensus, sell * 1.15, sell)
+        signals.set('strong_bearish_consensus', bearish_consensus)
+
+    # Bản scalar cần ít nhất 3 nến
+    buy[:2] = 0
+    sell[:2] = 0
+    signals.flags[:, :2] = False
+    return buy, sell, signals.pack()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Test đường tải klines của app (kho nến, prefetch song song) với server giả lập
+"""
+
+import numpy as np
+import pandas as pd
+import requests
+
+from binance_client import BinanceClient
+from candle_store import FRAME_COLUMNS, INT_COLUMNS, KLINE_COLUMNS, CandleStore
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+
+
+def make_app(server, tmp_path):
+    app = EnhancedCryptoPredictionAppV2()
+    app.http = BinanceClient({
+        'api_root': server.api_root,
+        'retry_attempts': 0,
+        'rate_limit_state_file': str(tmp_path / 'rate_limit.json'),
+    })
+    app.base_url = f"{server.api_root}/klines"
+    app.candle_store = CandleStore(app._request_klines, cache_dir=str(tmp_path / 'candles'))
+    return app
+
+
+def test_prefetch_fetches_each_base_series_once_in_pair_order(stub_server, tmp_path):
+    server = stub_server()
+    app = make_app(server, tmp_path)
+    pairs = ['SOLUSDT', 'NOPEUSDT', 'ETHUSDT', 'XRPJPY']
+
+    klines = app.prefetch_klines(pairs)
+
+    # 60m/4h/1d cần 15m, 1h, 4h, 1d - chỉ tải chuỗi base 15m và 4h, mỗi chuỗi một lần
+    fetched = [(params['symbol'], params['interval']) for params in server.requests_for('/klines')]
+    assert len(fetched) == len(set(fetched))
+    for symbol in ('SOLUSDT', 'ETHUSDT', 'XRPJPY'):
+        assert sorted(i for s, i in fetched if s == symbol) == ['15m', '4h'], symbol
+    # Base lỗi -> thử tải trực tiếp từng khung một lần
+    assert sorted(i for s, i in fetched if s == 'NOPEUSDT') == ['15m', '1d', '1h', '4h']
+
+    assert list(dict.fromkeys(symbol for symbol, _ in klines)) == pairs
+    for (symbol, interval), df in klines.items():
+        if symbol == 'NOPEUSDT':
+            # Lỗi của một symbol không ảnh hưởng các symbol khác
+            assert df is None, interval
+        else:
+            assert len(df) == (100 if interval == '1d' else 200), (symbol, interval)
+            assert df['timestamp'].is_monotonic_increasing
+    app.http.close()
+
+
+def test_kline_frame_has_typed_columns_matching_the_payload(stub_server, tmp_path):
+    server = stub_server()
+    app = make_app(server, tmp_path)
+
+    df = app.get_kline_data('ETHUSDT', '1h', 120)
+    raw = requests.get(f"{server.api_root}/klines",
+                       params={'symbol': 'ETHUSDT', 'interval': '1h', 'limit': 120}).json()
+    assert len(df) == 120
+
+    assert list(df.columns) == ['timestamp'] + FRAME_COLUMNS
+    assert pd.api.types.is_datetime64_any_dtype(df['timestamp'])
+    # Chỉ so các nến đã đóng có trong cả hai (nến đang chạy thay đổi theo thời gian)
+    closed = [row for row in raw[:-1] if pd.to_datetime(row[0], unit='ms') in set(df['timestamp'])]
+    df = df[df['timestamp'].isin(pd.to_datetime([row[0] for row in closed], unit='ms'))]
+    assert len(closed) >= 118
+    for col in FRAME_COLUMNS:
+        i = KLINE_COLUMNS.index(col)
+        expected = np.array([row[i] for row in closed], dtype=np.int64 if col in INT_COLUMNS else np.float64)
+        assert df[col].dtype == expected.dtype, col
+        np.testing.assert_array_equal(df[col], expected, err_msg=col)
+    assert app.get_kline_data('NOPEUSDT', '1h', 120) is None
+    app.http.close()
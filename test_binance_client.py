@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test HTTP client dùng chung (session pooled keep-alive, retry có giới hạn) với server giả lập
+"""
+
+import pytest
+import requests
+
+from binance_client import BinanceClient
+
+KLINES_PARAMS = {'symbol': 'ETHUSDT', 'interval': '1h', 'limit': 5}
+
+
+def make_client(tmp_path, **settings):
+    return BinanceClient(dict({
+        'retry_attempts': 2,
+        'rate_limit_delay': 0,
+        'rate_limit_state_file': str(tmp_path / 'rate_limit.json'),
+    }, **settings))
+
+
+def test_pooled_session_reuses_one_connection(stub_server, tmp_path):
+    server = stub_server()
+    client = make_client(tmp_path)
+    url = f"{server.api_root}/klines"
+
+    for _ in range(5):
+        assert len(client.get_json(url, params=KLINES_PARAMS)) == 5
+    client.get_json(f"{server.api_root}/exchangeInfo")
+
+    # Cùng một kết nối TCP cho mọi request (cùng cổng phía client)
+    assert len(server.requests) == 6
+    assert len({port for _, _, port in server.requests}) == 1
+    pools = client.session.get_adapter(url).poolmanager.pools
+    assert len(pools) == 1
+    assert pools[next(iter(pools.keys()))].num_connections == 1
+    client.close()
+
+
+def test_server_errors_are_retried_a_bounded_number_of_times(stub_server, tmp_path):
+    server = stub_server(error_rate=1.0)
+    client = make_client(tmp_path)
+
+    with pytest.raises(requests.exceptions.HTTPError) as excinfo:
+        client.get_json(f"{server.api_root}/klines", params=KLINES_PARAMS)
+    assert excinfo.value.response.status_code in (500, 502, 503)
+    # Lần đầu + retry_attempts lần thử lại, không hơn
+    assert len(server.requests_for('/klines')) == 3
+
+    server.settings['error_rate'] = 0.0
+    assert len(client.get_json(f"{server.api_root}/klines", params=KLINES_PARAMS)) == 5
+    assert len(server.requests_for('/klines')) == 4
+    client.close()
+
+
+def test_client_errors_are_not_retried(stub_server, tmp_path):
+    server = stub_server()
+    client = make_client(tmp_path)
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(f"{server.api_root}/klines", params=dict(KLINES_PARAMS, symbol='NOPEUSDT'))
+    assert len(server.requests) == 1
+    client.close()
+
+
+def count_calls(obj, name):
+    calls = []
+    original = getattr(obj, name)
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return original(*args, **kwargs)
+
+    setattr(obj, name, wrapper)
+    return calls
+
+
+def test_every_attempt_is_charged_with_one_state_round_trip(stub_server, tmp_path):
+    server = stub_server(error_rate=1.0)
+    client = make_client(tmp_path)
+    acquired = count_calls(client.limiter, 'acquire')
+    round_trips = count_calls(client.limiter, '_with_state')
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(f"{server.api_root}/klines", params=KLINES_PARAMS, weight=2)
+    # Cả các lần urllib3 tự thử lại cũng trừ weight
+    assert len(server.requests_for('/klines')) == 3
+    assert acquired == [(2,), (2,), (2,)]
+
+    server.settings['error_rate'] = 0.0
+    del acquired[:], round_trips[:]
+    client.get_json(f"{server.api_root}/klines", params=KLINES_PARAMS, weight=2)
+    # Đồng bộ weight header nằm chung lần khóa file với acquire
+    assert acquired == [(2,)] and len(round_trips) == 1
+    client.close()
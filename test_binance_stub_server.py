@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Test server giả lập: các khung thời gian của thị trường tổng hợp phải khớp nhau
+"""
+
+import numpy as np
+import pandas as pd
+
+from binance_stub_server import SyntheticMarket
+from candle_store import resample_ohlcv
+
+NOW_MS = 1_700_000_000_000
+
+
+def klines_frame(rows):
+    df = pd.DataFrame([row[:6] for row in rows], columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    df['timestamp'] = pd.to_datetime(df['timestamp'], unit='ms')
+    return df.astype({col: float for col in ['open', 'high', 'low', 'close', 'volume']})
+
+
+def test_higher_timeframes_are_aggregates_of_lower_ones():
+    market = SyntheticMarket(['BTC', 'ETH'], ['USDT'])
+    for base_interval, interval, base_limit in [('15m', '1h', 400), ('15m', '4h', 400), ('1h', '1d', 24 * 20)]:
+        base = klines_frame(market.klines('ETHUSDT', base_interval, base_limit, now_ms=NOW_MS))
+        resampled = resample_ohlcv(base, interval, base_interval)
+        direct = klines_frame(market.klines('ETHUSDT', interval, len(resampled), now_ms=NOW_MS))
+
+        np.testing.assert_array_equal(resampled['timestamp'].to_numpy(), direct['timestamp'].to_numpy())
+        for col in ['open', 'high', 'low', 'close', 'volume']:
+            np.testing.assert_allclose(resampled[col].to_numpy(), direct[col].to_numpy(), rtol=1e-7)
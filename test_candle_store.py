@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Test kho nến cục bộ với fetch_fn giả lập (không cần mạng)
+"""
+
+import time
+
+import numpy as np
+
+from candle_store import CandleStore, find_gaps, interval_to_ms, parse_klines
+
+INTERVAL = '15m'
+STEP = interval_to_ms(INTERVAL)
+
+
+class FakeBinance:
+    """fetch_fn giả lập /api/v3/klines trên chuỗi nến kết thúc ở nến hiện tại"""
+
+    def __init__(self, count=3000, fail_ranges=False):
+        now = int(time.time() * 1000)
+        last_open = now - now % STEP
+        self.open_times = list(range(last_open - (count - 1) * STEP, last_open + 1, STEP))
+        self.fail_ranges = fail_ranges
+        self.calls = []
+
+    def row(self, open_time):
+        price = float(open_time // STEP % 1000)
+        return [open_time, price, price + 1, price - 1, price + 0.5, 10.0,
+                open_time + STEP - 1, 100.0, 5, 4.0, 40.0, '0']
+
+    def __call__(self, symbol, interval, limit, start_time=None, end_time=None):
+        self.calls.append({'limit': limit, 'start_time': start_time, 'end_time': end_time})
+        if self.fail_ranges and start_time is not None and end_time is not None:
+            raise ConnectionError("simulated timeout")
+
+        times = self.open_times
+        if start_time is not None:
+            times = [t for t in times if t >= start_time]
+        if end_time is not None:
+            times = [t for t in times if t <= end_time]
+        times = times[:limit] if start_time is not None else times[-limit:]
+        return [self.row(t) for t in times]
+
+
+def test_top_up_fetches_only_missing_candles(tmp_path):
+    fake = FakeBinance()
+    store = CandleStore(fake, cache_dir=str(tmp_path))
+
+    first = store.get_klines('BTCUSDT', INTERVAL, 200)
+    assert len(first['timestamp']) == 200
+    assert fake.calls[-1]['limit'] == 200
+
+    again = store.get_klines('BTCUSDT', INTERVAL, 200)
+    # Chỉ tải lại nến cuối (có thể chưa đóng) thay vì cả cửa sổ
+    assert fake.calls[-1]['start_time'] == int(first['timestamp'][-1])
+    assert fake.calls[-1]['limit'] <= 3
+    np.testing.assert_array_equal(again['timestamp'], first['timestamp'])
+
+
+def test_merge_prefers_fresh_candles_and_sorts():
+    fake = FakeBinance(count=5)
+    store = CandleStore(fake)
+    rows = [fake.row(t) for t in fake.open_times]
+    old = parse_klines(rows[:3])
+    fresh = parse_klines(rows[2:])
+    fresh['close'][0] = -1.0
+
+    merged = store.merge(old, fresh)
+    assert list(merged['timestamp']) == fake.open_times
+    assert merged['close'][2] == -1.0
+
+
+def test_gaps_are_backfilled_with_range_requests(tmp_path):
+    fake = FakeBinance(count=300)
+    store = CandleStore(fake, cache_dir=str(tmp_path))
+    klines = store.get_klines('BTCUSDT', INTERVAL, 300)
+
+    holed = {col: np.delete(values, np.s_[100:110]) for col, values in klines.items()}
+    repaired = store.backfill_gaps('BTCUSDT', INTERVAL, holed)
+
+    assert len(find_gaps(repaired['timestamp'], STEP)) == 0
+    assert fake.calls[-1]['start_time'] == int(klines['timestamp'][100])
+    assert store.gap_stats('BTCUSDT', INTERVAL)[('BTCUSDT', INTERVAL)]['backfilled'] == 10
+
+
+def test_unfillable_gap_is_retried_after_ttl(tmp_path):
+    fake = FakeBinance(count=300)
+    store = CandleStore(fake, cache_dir=str(tmp_path), unfillable_ttl=60)
+    klines = store.get_klines('BTCUSDT', INTERVAL, 300)
+    hole = [int(t) for t in klines['timestamp'][100:110]]
+    fake.open_times = [t for t in fake.open_times if t not in hole]
+    holed = {col: np.delete(values, np.s_[100:110]) for col, values in klines.items()}
+
+    store.backfill_gaps('BTCUSDT', INTERVAL, holed)
+    calls = len(fake.calls)
+    store.backfill_gaps('BTCUSDT', INTERVAL, holed)
+    assert len(fake.calls) == calls  # còn trong TTL -> không gọi lại
+
+    for key in store._unfillable[('BTCUSDT', INTERVAL)]:
+        store._unfillable[('BTCUSDT', INTERVAL)][key] -= 61
+    store.backfill_gaps('BTCUSDT', INTERVAL, holed)
+    assert len(fake.calls) > calls
+
+
+def test_failed_gap_request_serves_merged_data(tmp_path):
+    fake = FakeBinance(count=300)
+    store = CandleStore(fake, cache_dir=str(tmp_path))
+    klines = store.get_klines('BTCUSDT', INTERVAL, 300)
+    holed = {col: np.delete(values, np.s_[100:110]) for col, values in klines.items()}
+
+    fake.fail_ranges = True
+    result = store.backfill_gaps('BTCUSDT', INTERVAL, holed)
+    assert len(result['timestamp']) == 290
+    # Lỗi tạm thời không bị ghi nhớ là khoảng không tải bù được
+    assert not store._unfillable[('BTCUSDT', INTERVAL)]
+
+
+def test_save_merges_history_written_by_another_worker(tmp_path):
+    fake = FakeBinance()
+    worker_a = CandleStore(fake, cache_dir=str(tmp_path))
+    worker_b = CandleStore(fake, cache_dir=str(tmp_path))
+
+    worker_a.get_klines('BTCUSDT', INTERVAL, 200)
+    deep = worker_b.get_history('BTCUSDT', INTERVAL, 2500)
+    assert len(deep['timestamp']) == 2500
+
+    # Worker A còn bản 200 nến trong bộ nhớ - lần top-up không được ghi đè lịch sử sâu
+    time.sleep(0.01)
+    worker_a.get_klines('BTCUSDT', INTERVAL, 200)
+    on_disk = CandleStore(fake, cache_dir=str(tmp_path)).load('BTCUSDT', INTERVAL)
+    assert len(on_disk['timestamp']) >= 2500
+    assert len(worker_a.load('BTCUSDT', INTERVAL)['timestamp']) >= 2500
+
+
+def test_store_is_trimmed_to_max_candles(tmp_path):
+    fake = FakeBinance()
+    store = CandleStore(fake, cache_dir=str(tmp_path), max_candles=500)
+
+    assert len(store.get_history('BTCUSDT', INTERVAL, 1500)['timestamp']) == 1500
+    store.get_klines('BTCUSDT', INTERVAL, 200)
+    assert len(store.load('BTCUSDT', INTERVAL)['timestamp']) == 500
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test nhận diện mô hình nến dạng bitmask trên các nến dựng tay
+"""
+
+import numpy as np
+import pandas as pd
+
+import candlestick_patterns as cp
+from enhanced_app_v2 import is_hammer
+
+
+def detect(candles):
+    """candles: list (open, high, low, close) -> bitmask từng nến"""
+    open_, high, low, close = (np.array(col, dtype=np.float64) for col in zip(*candles))
+    return cp.detect_patterns(open_, high, low, close)
+
+
+def names(candles):
+    return cp.pattern_names(detect(candles)[-1])
+
+
+def test_single_candle_patterns():
+    assert names([(10.0, 10.25, 9.0, 10.2)]) == ['hammer']
+    assert set(names([(10.2, 10.25, 9.0, 10.0)])) == {'hammer', 'hanging_man'}
+    assert names([(10.0, 10.5, 9.5, 10.01)]) == ['doji']
+    assert names([(10.0, 11.0, 9.9, 10.9)]) == []
+
+
+def test_two_and_three_candle_patterns():
+    assert 'engulfing_bullish' in names([(11.0, 11.1, 9.9, 10.0), (9.8, 11.3, 9.7, 11.2)])
+    assert 'harami_bullish' in names([(11.0, 11.1, 9.9, 10.0), (10.2, 10.9, 10.1, 10.8)])
+    assert 'harami_bearish' in names([(10.0, 11.1, 9.9, 11.0), (10.8, 10.9, 10.1, 10.2)])
+    soldiers = [(10.0, 11.1, 9.9, 11.0), (10.5, 12.1, 10.4, 12.0), (11.5, 13.1, 11.4, 13.0)]
+    assert 'three_white_soldiers' in names(soldiers)
+    crows = [(13.0, 13.1, 11.9, 12.0), (12.5, 12.6, 10.9, 11.0), (11.5, 11.6, 9.9, 10.0)]
+    assert 'three_black_crows' in names(crows)
+
+
+def test_first_candles_never_match_multi_candle_patterns():
+    mask = detect([(9.8, 11.3, 9.7, 11.2), (11.0, 11.1, 9.9, 10.0)])
+    multi = cp.pattern_mask('engulfing_bullish', 'harami_bullish', 'morning_star', 'three_white_soldiers')
+    assert mask[0] & multi == 0
+
+
+def test_bitmask_helpers_and_panel_shape():
+    mask = cp.pattern_mask('hammer', 'doji')
+    assert cp.has_pattern(mask, 'hammer') and cp.has_pattern(mask, 'doji')
+    assert not cp.has_pattern(mask, 'engulfing_bullish')
+    assert list(cp.pattern_signal(np.array([cp.PATTERN_BITS['hanging_man'], 0]), 'hanging_man')) == [-100, 0]
+
+    rng = np.random.default_rng(2)
+    panel = 100 + rng.normal(size=(3, 4, 50)).cumsum(axis=-1)
+    open_, close = panel[0], panel[1]
+    high = np.maximum(open_, close) + rng.random((4, 50))
+    low = np.minimum(open_, close) - rng.random((4, 50))
+    masks = cp.detect_patterns(open_, high, low, close)
+    for row in range(4):
+        np.testing.assert_array_equal(masks[row], cp.detect_patterns(open_[row], high[row], low[row], close[row]))
+
+
+def test_pattern_columns_are_not_always_zero():
+    # Hàm gốc dùng max() trên Series nên cột mô hình luôn là 0 - đảm bảo không tái diễn
+    rng = np.random.default_rng(4)
+    close = pd.Series(100 + rng.normal(size=500).cumsum())
+    open_ = close + rng.normal(scale=0.5, size=500)
+    high = np.maximum(open_, close) + rng.random(500)
+    low = np.minimum(open_, close) - rng.random(500) * 3
+    assert (is_hammer(open_, high, low, close) == 100).any()
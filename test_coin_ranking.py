@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Test xếp hạng coin theo base currency so với bản lọc theo tên symbol trước đây
+"""
+
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+from market_universe import SymbolIndex
+
+
+def ticker(symbol, price, volume, change=1.0):
+    return {'symbol': symbol, 'lastPrice': str(price), 'volume': str(volume), 'priceChangePercent': str(change)}
+
+
+TICKERS = [
+    ticker('ETHUSDT', 3000, 50000, 2.5),
+    ticker('BNBUSDT', 550, 90000, -1.2),
+    ticker('SOLUSDT', 150, 400000, 4.1),
+    ticker('XRPUSDT', 0.6, 90000000, 0.3),
+    ticker('ADAUSDT', 0.45, 90000000, 0.3),   # cùng money_traded với XRP -> giữ thứ tự
+    ticker('BTCUSDT', 65000, 20000),          # BTC bị loại
+    ticker('USDCUSDT', 1.0, 900000000),       # stablecoin
+    ticker('BTCUPUSDT', 10, 500000),          # leveraged token
+    ticker('ETHBEARUSDT', 0.01, 10000000),
+    ticker('SUPERUSDT', 1.2, 3000000),        # 'UP' trong tên nhưng không phải leveraged token
+    ticker('JUPUSDT', 0.9, 5000000),
+    ticker('LUNAUSDT', 0.5, 7000000),         # đã ngừng giao dịch
+    ticker('VERYLONGNAMECOINUSDT', 1, 1e9),   # tên base quá dài
+    ticker('ETHJPY', 450000, 300),
+    ticker('XRPJPY', 90, 2000000),
+    ticker('ETHBTC', 0.05, 60000),
+]
+
+EXCHANGE_INFO = {'symbols': [
+    {'symbol': t['symbol'], 'baseAsset': base, 'quoteAsset': quote,
+     'status': 'BREAK' if t['symbol'] == 'LUNAUSDT' else 'TRADING', 'filters': []}
+    for t, (base, quote) in zip(TICKERS, [
+        ('ETH', 'USDT'), ('BNB', 'USDT'), ('SOL', 'USDT'), ('XRP', 'USDT'), ('ADA', 'USDT'),
+        ('BTC', 'USDT'), ('USDC', 'USDT'), ('BTCUP', 'USDT'), ('ETHBEAR', 'USDT'), ('SUPER', 'USDT'),
+        ('JUP', 'USDT'), ('LUNA', 'USDT'), ('VERYLONGNAMECOIN', 'USDT'), ('ETH', 'JPY'), ('XRP', 'JPY'),
+        ('ETH', 'BTC'),
+    ])
+]}
+
+
+def legacy_top_coins(tickers, base_currency, limit):
+    """Phần lọc/xếp hạng của get_top_coins_by_base_currency trước khi có cache ticker và exchangeInfo"""
+    filtered_coins = []
+    for ticker in tickers:
+        symbol = ticker['symbol']
+        if symbol.endswith(base_currency):
+            base_coin = symbol.replace(base_currency, '')
+            if (len(base_coin) <= 10 and
+                not any(x in base_coin for x in ['UP', 'DOWN', 'BEAR', 'BULL']) and
+                base_coin not in ['BUSD', 'TUSD', 'USDC', 'DAI', 'PAX', 'BTC']):
+
+                price = float(ticker['lastPrice'])
+                volume = float(ticker['volume'])
+                filtered_coins.append({
+                    'symbol': symbol,
+                    'baseAsset': base_coin,
+                    'volume': volume,
+                    'priceChange': float(ticker['priceChangePercent']),
+                    'price': price,
+                    'money_traded': price * volume
+                })
+    filtered_coins.sort(key=lambda x: x['money_traded'], reverse=True)
+    return filtered_coins[:limit]
+
+
+def make_app(exchange_info=None):
+    app = EnhancedCryptoPredictionAppV2()
+
+    def fetch_exchange_info():
+        if exchange_info is None:
+            raise ConnectionError("exchangeInfo unavailable")
+        return exchange_info
+
+    app.symbol_index = SymbolIndex(fetch_exchange_info)
+    app.ticker_cache.fetch_fn = lambda: TICKERS
+    app.ticker_cache.invalidate()
+    return app
+
+
+def test_ranking_matches_previous_implementation_without_exchange_info():
+    app = make_app()
+    for base_currency in ('USDT', 'JPY'):
+        expected = legacy_top_coins(TICKERS, base_currency, 100)
+        assert app._rank_coins_by_base_currency(TICKERS, base_currency) == expected
+        assert app.get_top_coins_by_base_currency(base_currency, limit=5) == expected[:5]
+
+
+def test_exchange_info_only_changes_misclassified_symbols():
+    app = make_app(EXCHANGE_INFO)
+    ranked = app._rank_coins_by_base_currency(TICKERS, 'USDT')
+    symbols = [coin['symbol'] for coin in ranked]
+
+    # SUPER/JUP không còn bị loại nhầm vì chứa 'UP'; cặp ngừng giao dịch bị bỏ
+    assert {'SUPERUSDT', 'JUPUSDT'} <= set(symbols)
+    assert 'LUNAUSDT' not in symbols
+    legacy = legacy_top_coins([t for t in TICKERS if t['symbol'] != 'LUNAUSDT'], 'USDT', 100)
+    assert [coin for coin in ranked if coin['symbol'] not in ('SUPERUSDT', 'JUPUSDT')] == legacy
+
+    money = [coin['money_traded'] for coin in ranked]
+    assert money == sorted(money, reverse=True)
+    assert app._rank_coins_by_base_currency(TICKERS, 'JPY') == legacy_top_coins(TICKERS, 'JPY', 100)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Test ghi / phát lại response HTTP của Binance (không cần mạng)
+"""
+
+import json
+
+import pytest
+import requests
+
+from binance_client import BinanceClient
+from http_fixtures import FixtureRecorder, FixtureReplayer
+
+KLINES_URL = "https://api.binance.com/api/v3/klines"
+
+
+def make_response(body, status=200, headers=None):
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps(body).encode('utf-8')
+    response.headers.update(headers or {})
+    response.url = KLINES_URL
+    return response
+
+
+@pytest.fixture
+def fixture_file(tmp_path):
+    path = str(tmp_path / 'fixtures' / 'binance.jsonl.gz')
+    recorder = FixtureRecorder(path)
+    params = {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': 2}
+    recorder.record(KLINES_URL, params, make_response([[1]], headers={'X-MBX-USED-WEIGHT-1M': '7'}), 0.01)
+    recorder.record(KLINES_URL, params, make_response([[2]]), 0.01)
+    recorder.record(KLINES_URL, {'symbol': 'ETHUSDT', 'interval': '1h', 'limit': 2},
+                    make_response({'code': -1003}, status=429), 0.01)
+    return path
+
+
+def test_replay_serves_recorded_responses_in_order(fixture_file):
+    replayer = FixtureReplayer(fixture_file)
+    params = {'limit': 2, 'interval': '1h', 'symbol': 'BTCUSDT'}  # thứ tự tham số không quan trọng
+
+    first = replayer.get(KLINES_URL, params)
+    assert first.json() == [[1]]
+    assert first.headers['x-mbx-used-weight-1m'] == '7'
+    assert replayer.get(KLINES_URL, params).json() == [[2]]
+    assert replayer.get(KLINES_URL, params).json() == [[2]]  # hết thì lặp lại response cuối
+    assert len(replayer) == 3
+
+
+def test_replay_falls_back_to_latest_response_for_time_dependent_params(fixture_file):
+    replayer = FixtureReplayer(fixture_file)
+    params = {'symbol': 'BTCUSDT', 'interval': '1h', 'limit': 5, 'startTime': 1700000000000}
+    assert replayer.get(KLINES_URL, params).json() == [[2]]
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        replayer.get(KLINES_URL, {'symbol': 'SOLUSDT', 'interval': '1h'})
+
+
+def test_client_in_replay_mode_needs_no_network(fixture_file, tmp_path):
+    client = BinanceClient({
+        'fixture_mode': 'replay',
+        'fixture_file': fixture_file,
+        'rate_limit_state_file': str(tmp_path / 'rate_limit.json'),
+    })
+    assert client.get_json(KLINES_URL, params={'symbol': 'BTCUSDT', 'interval': '1h', 'limit': 2}) == [[1]]
+
+    with pytest.raises(requests.exceptions.HTTPError):
+        client.get_json(KLINES_URL, params={'symbol': 'ETHUSDT', 'interval': '1h', 'limit': 2})
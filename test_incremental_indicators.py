@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test engine chỉ báo tăng dần: giá trị sau mỗi nến phải khớp bản batch trên cùng chuỗi nến
+"""
+
+import copy
+import math
+
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+from incremental_indicators import IncrementalIndicatorEngine
+
+
+def same(a, b):
+    return a == b or (math.isnan(a) and math.isnan(b))
+
+
+def close_to(a, b):
+    """Khớp batch tới sai số làm tròn - engine cộng dồn kiểu pandas, kernel batch cộng trực tiếp"""
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9) or (math.isnan(a) and math.isnan(b))
+
+
+def test_every_candle_matches_batch_indicators(make_frame):
+    raw = make_frame(n=250, seed=5)
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    batch = app.calculate_advanced_indicators(raw)
+    engine = IncrementalIndicatorEngine()
+
+    columns = None
+    for i, row in enumerate(raw.itertuples()):
+        values = engine.append(row.open, row.high, row.low, row.close, row.volume, row.timestamp)
+        columns = columns or [col for col in values if col in batch]
+        for col in columns:
+            assert close_to(values[col], float(batch[col].iloc[i])), (i, col)
+    assert 'RSI' in columns and 'ADX' in columns and 'senkou_span_b' in columns
+
+
+def test_preview_does_not_change_state(make_frame):
+    raw = make_frame(n=80, seed=5)
+    engine = IncrementalIndicatorEngine()
+    engine.seed(raw.iloc[:-1])
+    before = copy.deepcopy(engine.values)
+
+    last = raw.iloc[-1]
+    preview = engine.preview(last['open'], last['high'], last['low'], last['close'], last['volume'])
+    assert all(same(engine.values[k], before[k]) for k in before)
+    appended = engine.append(last['open'], last['high'], last['low'], last['close'], last['volume'])
+    assert all(same(preview[k], appended[k]) for k in appended)
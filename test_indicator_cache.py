@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Test cache frame chỉ báo (hit/miss, nến mới, giới hạn dung lượng, digest) và frame compact
+"""
+
+import numpy as np
+
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+from indicator_cache import (COMPACT_DROP_COLUMNS, FIB_COLUMNS, FLOAT32_COLUMNS, IndicatorFrameCache,
+                             compact_frame, frame_nbytes, frame_row)
+
+
+def cached_lookup(cache, df, symbol='BTCUSDT', columns=None, params=None):
+    """lookup rồi put một frame giả khi miss, như _calculate_indicator_frame -> (frame, hit?)"""
+    frame, key = cache.lookup(symbol, '15m', df, columns, params)
+    if frame is not None:
+        return frame, True
+    frame = df.copy()
+    cache.put(key, frame)
+    return frame, False
+
+
+def test_cache_hit_and_miss(make_frame):
+    cache = IndicatorFrameCache()
+    raw = make_frame(exchange_columns=True)
+
+    first, hit = cached_lookup(cache, raw)
+    assert not hit
+    again, hit = cached_lookup(cache, raw.copy())
+    assert hit and again is first
+    # Khác symbol, khác tham số pattern -> entry riêng
+    assert not cached_lookup(cache, raw, symbol='ETHUSDT')[1]
+    assert not cached_lookup(cache, raw, params={'rsi_period': 7})[1]
+    # Yêu cầu một phần cột dùng lại frame đầy đủ đã có
+    assert cached_lookup(cache, raw, columns=['RSI'])[0] is first
+    assert cache.stats()['hits'] == 2 and cache.stats()['misses'] == 3
+
+
+def test_new_candle_invalidates_older_frames(make_frame):
+    cache = IndicatorFrameCache()
+    raw = make_frame(exchange_columns=True)
+    cached_lookup(cache, raw.iloc[:-1])
+    cached_lookup(cache, raw.iloc[:-1], params={'rsi_period': 7})
+    assert cache.stats()['entries'] == 2
+
+    cached_lookup(cache, raw)
+    assert cache.stats()['entries'] == 1
+    assert not cached_lookup(cache, raw.iloc[:-1])[1]
+    # Frame của nến cũ đến trễ không được giữ lại
+    assert cache.stats()['entries'] == 1
+
+
+def test_changed_running_candle_with_same_open_time_misses(make_frame):
+    cache = IndicatorFrameCache()
+    raw = make_frame(exchange_columns=True)
+    first, _ = cached_lookup(cache, raw)
+
+    ticked = raw.copy()
+    ticked.loc[ticked.index[-1], 'close'] += 0.5
+    fresh, hit = cached_lookup(cache, ticked)
+    assert not hit and fresh is not first
+    # Snapshot cũ của nến đang chạy bị bỏ
+    assert cache.stats()['entries'] == 1
+    assert not cached_lookup(cache, raw)[1]
+
+
+def test_byte_budget_evicts_least_recently_used(make_frame):
+    raw = make_frame(exchange_columns=True)
+    frame_size = frame_nbytes(raw)
+    cache = IndicatorFrameCache(max_bytes=int(frame_size * 2.5))
+
+    cached_lookup(cache, raw, symbol='A')
+    cached_lookup(cache, raw, symbol='B')
+    assert cached_lookup(cache, raw, symbol='A')[1]   # A mới dùng lại -> B cũ nhất
+    cached_lookup(cache, raw, symbol='C')
+
+    assert cache.stats()['entries'] == 2
+    assert cache.stats()['bytes'] <= cache.max_bytes
+    assert cached_lookup(cache, raw, symbol='A')[1]
+    assert not cached_lookup(cache, raw, symbol='B')[1]
+
+    # Frame lớn hơn cả giới hạn không được cache
+    tiny = IndicatorFrameCache(max_bytes=frame_size - 1)
+    cached_lookup(tiny, raw)
+    assert tiny.stats()['entries'] == 0
+
+
+def test_compact_frame_layout(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    full = app.calculate_advanced_indicators(make_frame(exchange_columns=True))
+    compact = compact_frame(full)
+
+    assert frame_nbytes(compact) < 0.8 * frame_nbytes(full)
+    assert not set(COMPACT_DROP_COLUMNS + FIB_COLUMNS).intersection(compact.columns)
+    for col in FLOAT32_COLUMNS:
+        assert compact[col].dtype == np.float32, col
+    for col in ('close', 'support', 'resistance', 'EMA_20', 'ATR', 'OBV'):
+        assert compact[col].dtype == np.float64, col
+
+    assert compact.attrs['fibonacci'] == {col: float(full[col].iloc[-1]) for col in FIB_COLUMNS}
+    assert app.get_fibonacci_levels(compact) == app.get_fibonacci_levels(full)
+
+
+def test_frame_row_returns_python_floats(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    compact = compact_frame(app.calculate_advanced_indicators(make_frame(exchange_columns=True)))
+    latest = frame_row(compact)
+    for col in FLOAT32_COLUMNS:
+        assert type(latest[col]) is float, col
+    assert latest['RSI'] == float(compact['RSI'].iloc[-1])
+
+
+def test_signal_scores_unchanged_on_compact_frame(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    for seed in range(5):
+        raw = make_frame(seed=seed, exchange_columns=True)
+        for end in range(120, len(raw) + 1, 10):
+            full = app.calculate_advanced_indicators(raw.iloc[:end])
+            expected = app.calculate_enhanced_signal_score(full)
+            assert app.calculate_enhanced_signal_score(compact_frame(full)) == expected, (seed, end)
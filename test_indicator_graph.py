@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test tính chỉ báo lười theo đồ thị phụ thuộc
+"""
+
+import numpy as np
+
+import indicator_graph
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+
+
+def test_partially_present_node_outputs_are_not_duplicated(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    df = app.calculate_indicator_columns(make_frame(n=200, freq='15min'), ['BB_upper'])
+    df = df.drop(columns=['BB_middle', 'BB_lower'])
+
+    result = app.calculate_indicator_columns(df, ['BB_upper', 'BB_lower'])
+    assert not result.columns.duplicated().any()
+    assert 'BB_lower' in result
+
+
+def test_columns_match_full_calculation(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    raw = make_frame(n=200, freq='15min')
+    full = app.calculate_advanced_indicators(raw)
+    columns = ['RSI', 'MACD_signal', 'ATR', 'stoch_d', 'BB_width_sma']
+    lazy = app.calculate_indicator_columns(raw, columns)
+
+    for col in columns:
+        np.testing.assert_array_equal(lazy[col].to_numpy(), full[col].to_numpy(), err_msg=col)
+
+
+def test_plan_skips_nodes_with_all_outputs_available():
+    available = {'open', 'high', 'low', 'close', 'volume', 'BB_upper', 'BB_middle', 'BB_lower'}
+    assert indicator_graph.plan(['BB_upper', 'BB_lower'], available) == []
+
+
+def test_each_column_alone_matches_full_calculation(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    raw = make_frame(n=200, seed=3, freq='15min')
+    full = app.calculate_advanced_indicators(raw)
+
+    for col in indicator_graph.ALL_COLUMNS:
+        lazy = app.calculate_indicator_columns(raw, [col])
+        np.testing.assert_array_equal(lazy[col].to_numpy(), full[col].to_numpy(), err_msg=col)
+
+
+def test_only_requested_dependencies_are_computed(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    lazy = app.calculate_indicator_columns(make_frame(n=200, freq='15min'), ['MACD_hist'])
+    assert {'MACD', 'MACD_signal', 'MACD_hist'} <= set(lazy.columns)
+    assert not {'RSI', 'ADX', 'ATR', 'senkou_span_b'} & set(lazy.columns)
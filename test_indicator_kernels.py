@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Test kernel NumPy so với pandas Series.rolling/ewm trên dữ liệu ngẫu nhiên
+"""
+
+import numpy as np
+import pandas as pd
+import indicator_kernels as kernels
+from incremental_indicators import EMAState
+
+
+def random_walk(n=600, seed=1):
+    rng = np.random.default_rng(seed)
+    return 100 + np.cumsum(rng.normal(size=n))
+
+
+def pandas_reference():
+    close = pd.Series(random_walk())
+    return close, {
+        'mean': (lambda x: kernels.rolling_mean(x, 14), close.rolling(14).mean()),
+        'std': (lambda x: kernels.rolling_std(x, 20), close.rolling(20).std()),
+        'sum': (lambda x: kernels.rolling_sum(x, 9), close.rolling(9).sum()),
+        'ema': (lambda x: kernels.ema(x, 12), close.ewm(span=12, adjust=False).mean()),
+    }
+
+
+def assert_close(actual, expected, err_msg=''):
+    """Khớp pandas tới sai số làm tròn - kernel không cộng dồn Kahan như pandas"""
+    np.testing.assert_allclose(actual, expected, rtol=1e-10, atol=1e-9, err_msg=err_msg)
+
+
+def test_kernels_match_pandas():
+    close, cases = pandas_reference()
+    for name, (kernel, expected) in cases.items():
+        assert_close(kernel(close.to_numpy()), expected.to_numpy(), err_msg=name)
+
+
+def test_ema_nan_handling_matches_incremental_state():
+    values = random_walk(seed=5)
+    values[:7] = np.nan
+    values[[200, 201, 350]] = np.nan
+
+    state = EMAState(26)
+    expected = np.array([state.update(x) for x in values])
+    result = kernels.ema(values, 26)
+    assert np.isnan(result[:7]).all()
+    assert_close(result, expected)
+
+    # Panel: mỗi symbol bắt đầu ở nến khác nhau
+    panel = np.vstack([values, random_walk(seed=6), np.full(len(values), np.nan)])
+    rows = kernels.ema(panel, 26)
+    assert_close(rows[0], result)
+    assert_close(rows[1], kernels.ema(panel[1], 26))
+    assert np.isnan(rows[2]).all()
+
+
+def test_rolling_extrema_match_pandas():
+    close = pd.Series(random_walk(seed=3))
+    windows = (9, 14, 20, 26, 52)
+    highs = kernels.rolling_extrema(close.to_numpy(), windows, is_max=True)
+    lows = kernels.rolling_extrema(close.to_numpy(), windows, is_max=False)
+    for window in windows:
+        np.testing.assert_array_equal(highs[window], close.rolling(window).max().to_numpy())
+        np.testing.assert_array_equal(lows[window], close.rolling(window).min().to_numpy())
+
+
+def test_panel_rows_match_single_series():
+    panel = np.vstack([random_walk(seed=s) for s in range(4)])
+    result = kernels.rsi(panel, 14)
+    for row, values in zip(result, panel):
+        np.testing.assert_array_equal(row, kernels.rsi(values, 14))
+
+
+def ohlcv(n=400, seed=11):
+    rng = np.random.default_rng(seed)
+    close = pd.Series(100 + np.cumsum(rng.normal(size=n)))
+    high = close + rng.random(n)
+    low = close - rng.random(n)
+    volume = pd.Series(rng.random(n) * 1000)
+    return high, low, close, volume
+
+
+def test_indicators_match_original_pandas_formulas():
+    high, low, close, volume = ohlcv()
+
+    # Công thức pandas gốc của RSI / ATR / Stochastic / OBV
+    delta = close.diff()
+    gain = delta.where(delta > 0, 0).rolling(14).mean()
+    loss = (-delta.where(delta < 0, 0)).rolling(14).mean()
+    expected_rsi = 100 - (100 / (1 + gain / loss))
+
+    tr = pd.concat([high - low, (high - close.shift(1)).abs(), (low - close.shift(1)).abs()], axis=1).max(axis=1)
+    expected_atr = tr.rolling(14).mean()
+
+    lowest, highest = low.rolling(14).min(), high.rolling(14).max()
+    expected_k = 100 * ((close - lowest) / (highest - lowest))
+
+    expected_obv = (np.sign(close.diff()) * volume).fillna(0).cumsum()
+
+    fast, slow = close.ewm(span=12, adjust=False).mean(), close.ewm(span=26, adjust=False).mean()
+    expected_macd = fast - slow
+
+    assert_close(kernels.rsi(close), expected_rsi.to_numpy())
+    assert_close(kernels.atr(high, low, close), expected_atr.to_numpy())
+    k, d = kernels.stochastic(high, low, close)
+    assert_close(k, expected_k.to_numpy())
+    assert_close(d, expected_k.rolling(3).mean().to_numpy())
+    assert_close(kernels.obv(close, volume), expected_obv.to_numpy())
+    line, signal, _ = kernels.macd(close)
+    assert_close(line, expected_macd.to_numpy())
+    assert_close(signal, expected_macd.ewm(span=9, adjust=False).mean().to_numpy())
+
+    upper, middle, lower = kernels.bollinger_bands(close)
+    std = close.rolling(20).std()
+    assert_close(upper, (close.rolling(20).mean() + std * 2).to_numpy())
+    assert_close(lower, (close.rolling(20).mean() - std * 2).to_numpy())
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Test bộ tải klines song song với fetch_fn giả lập
+"""
+
+import asyncio
+import threading
+import time
+
+from kline_fetcher import AsyncKlineFetcher
+
+
+class SlowFetch:
+    """fetch_fn ghi lại số lần gọi và số lần gọi chạy đồng thời tối đa"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.calls = []
+        self.active = 0
+        self.peak = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, symbol, interval, limit):
+        with self._lock:
+            self.calls.append((symbol, interval, limit))
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self._lock:
+            self.active -= 1
+        if symbol == 'BROKEN':
+            raise ConnectionError("simulated network error")
+        return f"{symbol}-{interval}-{limit}"
+
+
+def test_jobs_run_concurrently_within_the_limit():
+    fetch = SlowFetch()
+    fetcher = AsyncKlineFetcher(fetch, max_concurrency=4)
+    jobs = [(f"C{i}USDT", '15m', 200) for i in range(12)]
+
+    started = time.perf_counter()
+    frames = fetcher.fetch_all(jobs)
+    elapsed = time.perf_counter() - started
+
+    assert frames == {job: f"{job[0]}-15m-200" for job in jobs}
+    assert fetch.peak == 4
+    assert elapsed < 12 * fetch.delay / 2
+    fetcher.shutdown()
+
+
+def test_duplicate_jobs_are_fetched_once_and_errors_become_none():
+    fetch = SlowFetch(delay=0)
+    fetcher = AsyncKlineFetcher(fetch, max_concurrency=2)
+    jobs = [('BTCUSDT', '1h', 100), ('BTCUSDT', '1h', 100), ('BROKEN', '1h', 100)]
+
+    frames = fetcher.fetch_all(jobs)
+    assert fetch.calls.count(('BTCUSDT', '1h', 100)) == 1
+    assert frames[('BROKEN', '1h', 100)] is None
+    fetcher.shutdown()
+
+
+def test_fetch_all_works_inside_a_running_event_loop():
+    fetcher = AsyncKlineFetcher(SlowFetch(delay=0), max_concurrency=2)
+
+    async def main():
+        return fetcher.fetch_all([('ETHUSDT', '4h', 50)])
+
+    assert asyncio.run(main()) == {('ETHUSDT', '4h', 50): 'ETHUSDT-4h-50'}
+    fetcher.shutdown()
+
+
+def test_results_keep_job_order_when_later_jobs_finish_first():
+    delays = {f"C{i}USDT": 0.01 * (6 - i) for i in range(6)}
+
+    def fetch(symbol, interval, limit):
+        time.sleep(delays[symbol])
+        return symbol
+
+    fetcher = AsyncKlineFetcher(fetch, max_concurrency=6)
+    jobs = [(symbol, '1h', 100) for symbol in delays]
+    frames = fetcher.fetch_all(jobs)
+    assert list(frames) == jobs
+    assert list(frames.values()) == list(delays)
+    fetcher.shutdown()
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+"""
+Test chế độ streaming: tải bù nến bị lỡ và chỉ chạy handler khi có nến mới đóng
+"""
+
+import math
+
+import numpy as np
+import pandas as pd
+
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+from incremental_indicators import IncrementalIndicatorEngine
+from kline_stream import RECONNECT_EVENT, KlineStreamConsumer, ReplayKlineSource, StreamAnalysisRunner
+
+STEP = 15 * 60_000
+START = 1_700_000_000_000 // STEP * STEP
+# Nến 15m bắt đầu từ START (make_frame trong conftest.py)
+STREAM_FRAME = {'freq': '15min', 'start': pd.to_datetime(START, unit='ms')}
+
+
+def candle_index(event):
+    return (event['k']['t'] - START) // STEP
+
+
+def reference_values(df):
+    engine = IncrementalIndicatorEngine()
+    for row in df.itertuples():
+        engine.append(row.open, row.high, row.low, row.close, row.volume, int(row.timestamp.value // 10**6))
+    return engine.values
+
+
+def assert_same_values(actual, expected):
+    for name, value in expected.items():
+        assert actual[name] == value or (math.isnan(actual[name]) and math.isnan(value)), name
+
+
+def run_stream(df, skip, before_event=None):
+    """Phát lại df từ nến 100, bỏ các sự kiện mà skip(index, event) trả về True"""
+    served = {'upto': 0}
+
+    def rest(symbol, interval, limit):
+        return df.iloc[max(0, served['upto'] - limit):served['upto']].reset_index(drop=True)
+
+    consumer = KlineStreamConsumer(window=300, backfill_fn=rest)
+    closes = []
+    consumer.on_candle_close(lambda symbol, interval, c: closes.append(c.buffer(symbol, interval).last_timestamp()))
+    consumer.seed('BTCUSDT', '15m', df.iloc[:101])
+
+    for event in ReplayKlineSource({('BTCUSDT', '15m'): df.iloc[100:]}):
+        index = candle_index(event)
+        served['upto'] = index + 1
+        if before_event is not None:
+            before_event(consumer, index, event)
+        if not skip(index, event):
+            consumer.process(event)
+    return consumer, closes
+
+
+def test_gap_is_backfilled_and_indicators_match_rest(make_frame):
+    df = make_frame(n=260, **STREAM_FRAME)
+    consumer, closes = run_stream(df, lambda index, event: 150 <= index <= 155)
+
+    assert_same_values(consumer.indicators('BTCUSDT', '15m'), reference_values(df))
+    assert consumer.backfill_stats[('BTCUSDT', '15m')]['candles'] > 0
+    # Nến tải bù không kích hoạt handler, mọi nến còn lại mỗi nến đúng một lần
+    assert len(closes) == len(df) - 100 - 6
+    assert len(set(closes)) == len(closes)
+
+
+def test_missed_close_is_refreshed_after_reconnect(make_frame):
+    df = make_frame(n=260, **STREAM_FRAME)
+
+    def reconnect(consumer, index, event):
+        if index == 171 and not event['k']['x']:
+            consumer.process({'e': RECONNECT_EVENT})
+
+    consumer, _ = run_stream(df, lambda index, event: index == 170 and event['k']['x'], reconnect)
+    assert_same_values(consumer.indicators('BTCUSDT', '15m'), reference_values(df))
+
+
+def test_duplicate_and_stale_closes_do_not_fire_handler(make_frame):
+    df = make_frame(n=120, **STREAM_FRAME)
+    consumer = KlineStreamConsumer(window=200)
+    closes = []
+    consumer.on_candle_close(lambda symbol, interval, c: closes.append(symbol))
+    consumer.seed('BTCUSDT', '15m', df.iloc[:101])
+
+    events = [e for e in ReplayKlineSource({('BTCUSDT', '15m'): df.iloc[100:110]}) if e['k']['x']]
+    for event in events:
+        consumer.process(event)
+    consumer.process(events[-1])   # đóng trùng lặp
+    consumer.process(events[0])    # sự kiện cũ đến trễ
+
+    assert len(closes) == len(events)
+
+
+def test_engine_frame_scores_like_batch_indicators(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    for seed in range(3):
+        df = make_frame(n=260, seed=seed, **STREAM_FRAME)
+        consumer = KlineStreamConsumer(window=300)
+        consumer.seed('BTCUSDT', '15m', df)
+        frame = consumer.indicator_frame('BTCUSDT', '15m')
+        # Nến cuối từ REST coi như chưa đóng -> engine dừng ở nến áp chót
+        batch = app.calculate_advanced_indicators(df.iloc[:-1])
+
+        for col in frame.columns:
+            np.testing.assert_allclose(frame[col], batch[col].iloc[-len(frame):], rtol=1e-9, err_msg=col)
+        np.testing.assert_allclose(list(frame.attrs['fibonacci'].values()),
+                                   list(app.get_fibonacci_levels(batch).values()), rtol=1e-12)
+        assert app.calculate_enhanced_signal_score(frame) == app.calculate_enhanced_signal_score(batch)
+
+
+class LoadCounter:
+    def __init__(self):
+        self.loads = 0
+
+    def get(self, background=False):
+        self.loads += 1
+
+
+class FakeApp:
+    """Chỉ ghi lại memo mà runner truyền vào bước phân tích"""
+
+    investment_types = {'60m': {'timeframe': '15m', 'analysis_timeframes': ['1h']}}
+
+    def __init__(self):
+        self.symbol_index = LoadCounter()
+        self.memos = []
+
+    def indicator_params(self):
+        return None
+
+    def get_kline_data(self, symbol, interval, limit):
+        raise AssertionError("callback must not call REST")
+
+    def analyze_single_pair_by_investment_type(self, symbol, investment_type, run_memo=None):
+        self.memos.append(run_memo)
+        return {'symbol': symbol}
+
+
+def test_runner_analyzes_engine_frames_without_rest_calls(make_frame):
+    df = make_frame(n=130, **STREAM_FRAME)
+    app = FakeApp()
+    results = []
+    runner = StreamAnalysisRunner(app, ['BTCUSDT'], window=300, on_result=results.append)
+    runner.consumer.seed('BTCUSDT', '15m', df.iloc[:101])
+
+    runner.run(ReplayKlineSource({('BTCUSDT', '15m'): df.iloc[100:]}), seed=False)
+
+    assert app.symbol_index.loads == 1
+    assert len(results) == len(app.memos) == len(df) - 100
+    memo = app.memos[-1]
+    assert memo.frames[('BTCUSDT', '1h')] is None
+    assert_same_values(memo.frames[('BTCUSDT', '15m')].iloc[-1].to_dict(), reference_values(df))
+
+
+if __name__ == "__main__":
+    test_gap_is_backfilled_and_indicators_match_rest()
+    test_missed_close_is_refreshed_after_reconnect()
+    test_duplicate_and_stale_closes_do_not_fire_handler()
+    test_engine_frame_scores_like_batch_indicators()
+    test_runner_analyzes_engine_frames_without_rest_calls()
+    print("✅ kline stream tests passed")
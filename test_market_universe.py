@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Test cache single-flight cho dữ liệu toàn thị trường
+"""
+
+import threading
+import time
+
+import pytest
+
+from market_universe import SingleFlightCache
+
+
+class FlakyLoader:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise ConnectionError("exchangeInfo unavailable")
+        return self.calls
+
+
+def test_stale_value_is_served_without_retry_during_backoff():
+    loader = FlakyLoader()
+    cache = SingleFlightCache(loader, ttl=0, error_backoff=60)
+    assert cache.get() == 1
+
+    loader.fail = True
+    assert cache.get() == 1   # refresh lỗi -> giá trị cũ
+    for _ in range(5):
+        assert cache.get() == 1
+    assert loader.calls == 2  # không tải lại trong error_backoff
+
+
+def test_refresh_resumes_after_backoff():
+    loader = FlakyLoader()
+    cache = SingleFlightCache(loader, ttl=0, error_backoff=60)
+    cache.get()
+    loader.fail = True
+    cache.get()
+
+    loader.fail = False
+    cache._failed_at -= 61
+    assert cache.get() == 3
+
+
+def test_error_without_value_raises_and_backs_off():
+    loader = FlakyLoader()
+    loader.fail = True
+    cache = SingleFlightCache(loader, ttl=60, error_backoff=60)
+
+    with pytest.raises(ConnectionError):
+        cache.get()
+    with pytest.raises(RuntimeError):
+        cache.get()
+    assert loader.calls == 1
+
+
+def test_background_get_serves_stale_value_while_refreshing():
+    release = threading.Event()
+    calls = []
+
+    def slow_loader():
+        calls.append(1)
+        if len(calls) > 1:
+            release.wait(5)
+        return len(calls)
+
+    cache = SingleFlightCache(slow_loader, ttl=60)
+    assert cache.get() == 1
+    cache.invalidate()
+
+    # Lần tải lại đang chờ ở thread nền - get(background=True) không bị chặn
+    assert cache.get(background=True) == 1
+    assert cache.get(background=True) == 1
+    release.set()
+    for _ in range(100):
+        if cache.get(background=True) == 2:
+            break
+        time.sleep(0.01)
+    assert cache.get() == 2
+    assert len(calls) == 2
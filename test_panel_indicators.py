@@ -0,0 +1,36 @@
+#!/usr/bin/env python3
+"""
+Test tính chỉ báo theo panel (symbols x time): mỗi symbol phải giống calculate_advanced_indicators
+"""
+
+import numpy as np
+import pandas as pd
+
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+
+
+def test_panel_matches_single_symbol_indicators(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    frames = {f'COIN{i}USDT': make_frame(n=200, seed=i, freq='15min') for i in range(5)}
+    # Lệch nến -> panel riêng; quá ngắn -> bỏ qua
+    frames['LATEUSDT'] = make_frame(n=200, seed=9, freq='15min', start='2024-01-02')
+    frames['SHORTUSDT'] = make_frame(n=30, seed=10, freq='15min')
+
+    result = app.calculate_panel_indicators(frames)
+
+    assert set(result) == set(frames) - {'SHORTUSDT'}
+    for symbol, df in result.items():
+        expected = app.calculate_advanced_indicators(frames[symbol])
+        pd.testing.assert_frame_equal(df, expected, check_exact=False, rtol=1e-10, obj=symbol)
+
+
+def test_panel_columns_subset(make_frame):
+    app = EnhancedCryptoPredictionAppV2.__new__(EnhancedCryptoPredictionAppV2)
+    frames = {f'COIN{i}USDT': make_frame(n=200, seed=i, freq='15min') for i in range(3)}
+
+    result = app.calculate_panel_indicators(frames, ['RSI', 'stoch_d'])
+    for symbol, df in result.items():
+        expected = app.calculate_advanced_indicators(frames[symbol])
+        assert 'ADX' not in df
+        for col in ('RSI', 'stoch_k', 'stoch_d'):
+            np.testing.assert_allclose(df[col], expected[col], rtol=1e-10, err_msg=f'{symbol} {col}')
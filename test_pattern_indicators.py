@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Test tham số market pattern trên đường phân tích live (indicator_graph, cache, engine tăng dần)
+"""
+
+import numpy as np
+import pandas as pd
+
+import indicator_kernels as k
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+from incremental_indicators import IncrementalIndicatorEngine
+from pattern_indicators import DEFAULT_PATTERN_PARAMS, PatternIndicatorSet, pattern_params
+
+PATTERN_COLUMNS = ['RSI', 'ATR', 'MACD', 'MACD_signal', 'BB_upper', 'BB_middle', 'BB_lower', 'BB_width']
+OTHER_COLUMNS = ['EMA_10', 'EMA_50', 'stoch_k', 'ADX', 'OBV', 'senkou_span_b', 'volume_ratio']
+
+
+def test_default_pattern_reproduces_current_columns(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    assert app.indicator_params() == DEFAULT_PATTERN_PARAMS
+    raw = make_frame(freq='15min')
+    df = app.calculate_advanced_indicators(raw, app.indicator_params())
+    pd.testing.assert_frame_equal(df, app.calculate_advanced_indicators(raw))
+
+    high, low, close = (raw[col].to_numpy() for col in ('high', 'low', 'close'))
+    upper, middle, lower = k.bollinger_bands(close, 20, 2)
+    np.testing.assert_array_equal(df['RSI'], k.rsi(close, 14))
+    np.testing.assert_array_equal(df['ATR'], k.atr(high, low, close, 14))
+    np.testing.assert_array_equal(df['MACD'], k.macd(close, 12, 26)[0])
+    np.testing.assert_array_equal(df['BB_upper'], upper)
+    np.testing.assert_array_equal(df['BB_lower'], lower)
+
+
+def test_non_default_pattern_changes_pattern_columns_only(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    raw = make_frame(seed=1, freq='15min')
+    default = app.calculate_advanced_indicators(raw, app.indicator_params())
+
+    assert app.set_market_pattern('bear_market')
+    df = app.calculate_advanced_indicators(raw, app.indicator_params())
+    view = PatternIndicatorSet(raw['high'], raw['low'], raw['close'], app.market_patterns).view('bear_market')
+
+    for col in ('RSI', 'ATR', 'BB_upper', 'BB_middle', 'BB_lower'):
+        np.testing.assert_array_equal(df[col], view[col], err_msg=col)
+    np.testing.assert_array_equal(df['MACD'], view['ema_fast'] - view['ema_slow'])
+    for col in PATTERN_COLUMNS:
+        assert not np.allclose(df[col], default[col], equal_nan=True), col
+    for col in OTHER_COLUMNS:
+        np.testing.assert_array_equal(df[col], default[col], err_msg=col)
+
+
+def test_cached_frames_are_keyed_by_pattern(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    app.indicator_cache.clear()
+    raw = make_frame(seed=2, freq='15min')
+
+    default = app._calculate_indicator_frame('BTCUSDT', '15m', raw)
+    app.set_market_pattern('scalping')
+    scalping = app._calculate_indicator_frame('BTCUSDT', '15m', raw)
+    assert not np.allclose(scalping['RSI'], default['RSI'], equal_nan=True)
+
+    app.set_market_pattern('default')
+    assert app._calculate_indicator_frame('BTCUSDT', '15m', raw) is default
+
+
+def test_incremental_engine_follows_pattern_params(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    raw = make_frame(seed=3, freq='15min')
+    params = pattern_params(app.market_patterns['high_volatility'])
+
+    engine = IncrementalIndicatorEngine(params)
+    engine.seed(raw)
+    batch = app.calculate_advanced_indicators(raw, params).iloc[-1]
+    for col in PATTERN_COLUMNS + OTHER_COLUMNS:
+        np.testing.assert_allclose(engine.values[col], batch[col], rtol=1e-9, err_msg=col)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test rate limiter theo weight của Binance (trạng thái dùng chung qua file)
+"""
+
+import json
+import time
+
+import pytest
+
+from rate_limiter import WeightRateLimiter, klines_weight
+
+
+@pytest.mark.parametrize('limit, weight', [
+    (1, 1), (99, 1), (100, 2), (499, 2), (500, 5), (1000, 5), (1001, 10),
+])
+def test_klines_weight_brackets(limit, weight):
+    assert klines_weight(limit) == weight
+
+
+def make_limiter(tmp_path, weight_limit=100):
+    # 100 * (1 - 0.1) = 90 token, nạp lại 90 token / 1s
+    return WeightRateLimiter(weight_limit=weight_limit, window_seconds=1,
+                             state_file=str(tmp_path / 'rate_limit.json'))
+
+
+def test_acquire_does_not_wait_within_budget(tmp_path):
+    limiter = make_limiter(tmp_path)
+    started = time.perf_counter()
+    for _ in range(9):
+        limiter.acquire(10)
+    assert time.perf_counter() - started < 0.05
+
+
+def test_acquire_waits_for_refill_when_budget_is_spent(tmp_path):
+    limiter = make_limiter(tmp_path)
+    limiter.acquire(90)
+    started = time.perf_counter()
+    limiter.acquire(45)  # cần ~0.5s để nạp lại 45 token
+    assert 0.4 < time.perf_counter() - started < 1.0
+
+
+def test_budget_is_shared_between_limiters_on_the_same_file(tmp_path):
+    first = make_limiter(tmp_path)
+    second = make_limiter(tmp_path)
+    first.acquire(90)
+    started = time.perf_counter()
+    second.acquire(18)
+    assert time.perf_counter() - started > 0.15
+
+
+def test_used_weight_header_and_block_reduce_budget(tmp_path):
+    limiter = make_limiter(tmp_path)
+    limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '80'})
+    started = time.perf_counter()
+    limiter.acquire(20)  # chỉ còn 10 token
+    assert time.perf_counter() - started > 0.08
+
+    limiter.block_for(0.3)
+    started = time.perf_counter()
+    limiter.acquire(1)
+    assert time.perf_counter() - started > 0.25
+
+
+def test_header_sync_is_applied_in_the_next_acquire(tmp_path):
+    limiter = make_limiter(tmp_path)
+    limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '50'})
+    limiter.update_from_headers({'X-MBX-USED-WEIGHT-1M': '80'})
+    # Chỉ ghi nhận trong bộ nhớ - chưa đụng tới file trạng thái
+    assert not (tmp_path / 'rate_limit.json').exists()
+
+    limiter.acquire(5)
+    assert json.loads((tmp_path / 'rate_limit.json').read_text())['tokens'] == pytest.approx(5, abs=0.5)
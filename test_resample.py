@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Test resample nến khung nhỏ thành khung lớn
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from candle_store import resample_ohlcv
+
+HOUR = pd.Timedelta(hours=1)
+
+
+def frame(start, n, freq='15min'):
+    values = np.arange(n, dtype=np.float64)
+    return pd.DataFrame({
+        'timestamp': pd.date_range(start, periods=n, freq=freq),
+        'open': values,
+        'high': values + 10,
+        'low': values - 10,
+        'close': values + 0.5,
+        'volume': np.ones(n),
+    })
+
+
+def test_buckets_aggregate_ohlcv():
+    result = resample_ohlcv(frame('2024-01-01 00:00', 8), '1h', '15m')
+
+    assert list(result['timestamp']) == [pd.Timestamp('2024-01-01 00:00'), pd.Timestamp('2024-01-01 01:00')]
+    assert list(result['open']) == [0, 4]
+    assert list(result['high']) == [13, 17]
+    assert list(result['low']) == [-10, -6]
+    assert list(result['close']) == [3.5, 7.5]
+    assert list(result['volume']) == [4, 4]
+
+
+def test_leading_partial_bucket_is_dropped_and_trailing_one_kept():
+    # Bắt đầu 00:30 -> giờ 00:00 thiếu nến đầu; kết thúc 02:15 -> giờ 02:00 đang chạy
+    result = resample_ohlcv(frame('2024-01-01 00:30', 8), '1h', '15m')
+
+    assert result['timestamp'].iloc[0] == pd.Timestamp('2024-01-01 01:00')
+    assert result['timestamp'].iloc[-1] == pd.Timestamp('2024-01-01 02:00')
+    assert result['volume'].iloc[-1] == 2
+
+
+def test_buckets_align_to_utc_day_boundaries():
+    result = resample_ohlcv(frame('2024-01-01 00:00', 48, freq='1h'), '4h', '1h')
+    assert (result['timestamp'].diff().dropna() == 4 * HOUR).all()
+    assert (result['timestamp'].dt.hour % 4 == 0).all()
+
+
+def test_invalid_combinations_raise():
+    with pytest.raises(ValueError):
+        resample_ohlcv(frame('2024-01-01', 4), '15m', '1h')
+    with pytest.raises(ValueError):
+        resample_ohlcv(frame('2024-01-01', 4), '1w', '1d')
@@ -0,0 +1,28 @@
+#!/usr/bin/env python3
+"""
+Test chấm điểm tín hiệu vector hóa: nến i phải khớp bản scalar chạy trên chuỗi nến tới i
+"""
+
+import signal_scoring
+from enhanced_app_v2 import EnhancedCryptoPredictionAppV2
+
+
+def test_score_history_matches_scalar_score_on_every_prefix(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    raw = make_frame()
+    buy, sell, words = app.calculate_signal_score_history(app.calculate_advanced_indicators(raw))
+
+    for i in range(60, len(raw)):
+        # Fibonacci của frame lấy theo nến cuối -> tính lại chỉ báo trên chuỗi nến tới i
+        prefix = app.calculate_advanced_indicators(raw.iloc[:i + 1])
+        buy_score, sell_score, signals = app.calculate_enhanced_signal_score(prefix)
+        assert buy[i] == buy_score, i
+        assert sell[i] == sell_score, i
+        assert set(signal_scoring.signal_dict(words[i])) == set(signals), i
+
+
+def test_short_frames_score_zero(make_frame):
+    app = EnhancedCryptoPredictionAppV2()
+    buy, sell, words = app.calculate_signal_score_history(make_frame(n=2))
+    assert list(buy) == [0, 0] and list(sell) == [0, 0]
+    assert words.shape == (2, signal_scoring.SIGNAL_WORDS)